@@ -0,0 +1,194 @@
+from graph import GraphListener, is_number
+
+"""
+Program: aggregates.py
+
+Analytics aggregates kept up to date as the graph changes, so dashboards can
+read them without rescanning the graph. The store subscribes to the graph
+and maintains the total gross by age, the number of co-actor connections of
+every actor and every actor's total gross, updating each in time
+proportional to the degree of the vertex that changed. Like FrozenGraph,
+the aggregates leave out movies' neighbors which have no vertex, such as
+actors removed with Graph.delete_vertex while movies still list them.
+"""
+
+
+class Aggregates(GraphListener):
+    def __init__(self, graph):
+        """
+        Compute the aggregates over the graph's current vertices and subscribe to its changes
+        :param graph: The graph to aggregate
+        """
+        self.graph = graph
+        # Key ids with a vertex
+        self.live = set()
+        # Every neighbor id of every movie, and the number of them with a vertex
+        self.casts = {}
+        self.cast_sizes = {}
+        # The movies listing each key id, whether it has a vertex or not
+        self.listings = {}
+        # Co-actor connections of every actor with a vertex listed by a movie
+        self.connections = {}
+        # (age, gross, movies) an actor currently adds to the age buckets
+        self.counted = {}
+        self.age_gross = {}
+        self.age_links = {}
+        # Sum of the weights of every actor's edges
+        self.totals = {}
+        for vertex in graph:
+            self.vertex_added(graph.get_id(vertex.get_key()), vertex)
+        graph.subscribe(self)
+
+    def vertex_added(self, key_id, vertex):
+        # Movies already listing the key id now have one more member with a vertex
+        self.live.add(key_id)
+        for movie_id in self.listings.get(key_id, ()):
+            self.join(movie_id, key_id)
+
+        group = vertex.get_group()
+        if group == "Movie":
+            self.casts[key_id] = set()
+            self.cast_sizes[key_id] = 0
+            for actor_id in set(vertex.neighbor_ids):
+                self.list_actor(key_id, actor_id)
+        elif group == "Actor":
+            self.totals[key_id] = sum(vertex.weights)
+        self.recount(key_id, vertex)
+
+    def vertex_removed(self, key_id, vertex):
+        cast = self.casts.get(key_id)
+        if cast is not None:
+            for actor_id in list(cast):
+                self.unlist_actor(key_id, actor_id)
+            del self.casts[key_id]
+            del self.cast_sizes[key_id]
+        self.totals.pop(key_id, None)
+
+        # Movies still listing the key id lose a member with a vertex
+        for movie_id in self.listings.get(key_id, ()):
+            self.leave(movie_id, key_id)
+        self.live.discard(key_id)
+        self.connections.pop(key_id, None)
+        self.recount(key_id, None)
+
+    def value_changed(self, key_id, vertex, field, old_value):
+        self.recount(key_id, vertex)
+
+    def edge_changed(self, key_id, vertex, neighbor_id, old_weight, weight):
+        if key_id in self.totals:
+            # Summed again rather than adjusted, so float weights do not drift
+            self.totals[key_id] = sum(vertex.weights)
+
+        if key_id not in self.casts or (old_weight is None) == (weight is None):
+            return
+        if weight is not None:
+            self.list_actor(key_id, neighbor_id)
+        else:
+            self.unlist_actor(key_id, neighbor_id)
+
+    def list_actor(self, movie_id, actor_id):
+        """
+        Add a neighbor to a movie's cast
+        :param movie_id: The key id of the movie
+        :param actor_id: The key id of the neighbor
+        :return: None
+        """
+        self.casts[movie_id].add(actor_id)
+        self.listings.setdefault(actor_id, set()).add(movie_id)
+        if actor_id in self.live:
+            self.join(movie_id, actor_id)
+        self.recount(actor_id, self.graph.get_vertex_by_id(actor_id))
+
+    def unlist_actor(self, movie_id, actor_id):
+        """
+        Remove a neighbor from a movie's cast
+        :param movie_id: The key id of the movie
+        :param actor_id: The key id of the neighbor
+        :return: None
+        """
+        if actor_id in self.live:
+            self.leave(movie_id, actor_id)
+        self.casts[movie_id].discard(actor_id)
+        movie_ids = self.listings[actor_id]
+        movie_ids.discard(movie_id)
+        if not movie_ids:
+            # Not starring in any movie any more, so no longer an actor with connections
+            del self.listings[actor_id]
+            self.connections.pop(actor_id, None)
+        self.recount(actor_id, self.graph.get_vertex_by_id(actor_id))
+
+    def join(self, movie_id, actor_id):
+        """
+        Count an actor with a vertex in among a movie's cast
+        :param movie_id: The key id of the movie
+        :param actor_id: The key id of the actor
+        :return: None
+        """
+        for co_actor_id in self.casts[movie_id]:
+            if co_actor_id != actor_id and co_actor_id in self.live:
+                self.connections[co_actor_id] += 1
+        self.connections[actor_id] = self.connections.get(actor_id, 0) + self.cast_sizes[movie_id]
+        self.cast_sizes[movie_id] += 1
+
+    def leave(self, movie_id, actor_id):
+        """
+        Count an actor out of a movie's cast, when it leaves it or loses its vertex
+        :param movie_id: The key id of the movie
+        :param actor_id: The key id of the actor
+        :return: None
+        """
+        self.cast_sizes[movie_id] -= 1
+        for co_actor_id in self.casts[movie_id]:
+            if co_actor_id != actor_id and co_actor_id in self.live:
+                self.connections[co_actor_id] -= 1
+        self.connections[actor_id] -= self.cast_sizes[movie_id]
+
+    def recount(self, key_id, vertex):
+        """
+        Move an actor's share of the gross by age to its current age, gross and number of movies
+        :param key_id: The key id of the actor
+        :param vertex: The actor's vertex, None if it was deleted
+        :return: None
+        """
+        old = self.counted.pop(key_id, None)
+        if old is not None:
+            age, gross, links = old
+            self.add_age(age, -gross * links, -links)
+
+        links = len(self.listings.get(key_id, ()))
+        if vertex is not None and key_id in self.live and links and is_number(vertex.get_value2()):
+            age, gross = vertex.get_value1(), vertex.get_value2()
+            self.counted[key_id] = (age, gross, links)
+            self.add_age(age, gross * links, links)
+
+    def add_age(self, age, gross, links):
+        count = self.age_links.get(age, 0) + links
+        if count:
+            self.age_links[age] = count
+            self.age_gross[age] = self.age_gross.get(age, 0) + gross
+        else:
+            del self.age_links[age]
+            del self.age_gross[age]
+
+    def get_gross_age(self):
+        """
+        Get the gross of the actors of every age, counted once per movie they starred in
+        :return: Dictionary of age to gross
+        """
+        return dict(self.age_gross)
+
+    def get_connections(self):
+        """
+        Get the number of co-actor connections of every actor starring in a movie
+        :return: Dictionary of actor to connections
+        """
+        get_key = self.graph.table.get_key
+        return {get_key(actor_id): connections for actor_id, connections in self.connections.items()}
+
+    def get_total_gross(self):
+        """
+        Get the total gross of every actor, as the sum of its edge weights
+        :return: Dictionary of actor to total gross
+        """
+        get_key = self.graph.table.get_key
+        return {get_key(actor_id): total for actor_id, total in self.totals.items()}
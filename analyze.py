@@ -1,9 +1,18 @@
-from utils import get_actor_num_connections, get_coactor_count
+import numpy as np
+from scipy import sparse
 
 
 class Analyze:
-    def __init__(self, graph):
+    def __init__(self, graph, aggregates=None):
+        """
+        Initialize the Analyze object
+        :param graph: The graph to analyze
+        :param aggregates: Aggregates kept up to date over the graph, read instead of rescanning it if given
+        """
         self.graph = graph
+        self.aggregates = aggregates
+        # (graph version, actors, co-actor count matrix) of the last computation
+        self.coactors = None
 
     def get_hub_actors(self, num=10):
         """
@@ -11,24 +20,63 @@ class Analyze:
         :param num: The number of actors to display
         :return: The dictionary actor/connection values and the number of actors
         """
-        actor_connections = {}
+        if self.aggregates is not None:
+            return self.aggregates.get_connections(), num
 
-        for vertex in self.graph:
-            if vertex.get_group() == "Movie":
-                actors = vertex.get_neighbors()
-                get_coactor_count(actor_connections, actors)
-
-        actor_num_connections = {}
-        get_actor_num_connections(actor_connections, actor_num_connections)
+        actors, coactors = self.get_coactor_matrix()
+        connections = np.asarray(coactors.sum(axis=1)).ravel()
+        actor_num_connections = dict(zip(actors, connections.tolist()))
 
         return actor_num_connections, num
 
+    def get_top_hub_actors(self, num=10):
+        """
+        Get the num actors with the most connections to other actors, without sorting every actor
+        :param num: The number of actors to return
+        :return: List of (actor, connections) pairs, most connected first
+        """
+        actors, coactors = self.get_coactor_matrix()
+        connections = np.asarray(coactors.sum(axis=1)).ravel()
+        return [(actors[i], int(connections[i])) for i in top_indices(connections, num)]
+
+    def get_coactor_matrix(self):
+        """
+        Count how many movies every pair of actors starred in together, as
+        B^T B over the sparse movie-actor incidence matrix B, with the diagonal
+        (movies per actor) removed
+        :return: The list of actors, in matrix order, and the sparse count matrix
+        """
+        frozen = self.graph.freeze()
+        if self.coactors is not None and self.coactors[0] == frozen.version:
+            return self.coactors[1], self.coactors[2]
+
+        movies = np.flatnonzero(frozen.group_mask("Movie"))
+        starts, ends = frozen.offsets[movies], frozen.offsets[movies + 1]
+        rows = np.repeat(np.arange(len(movies)), ends - starts)
+        cast = np.concatenate([frozen.neighbor_indices(i) for i in movies]) if len(movies) else \
+            np.zeros(0, dtype=np.int32)
+
+        # Number the actors starring in at least one movie
+        positions, columns = np.unique(cast, return_inverse=True)
+        incidence = sparse.csr_matrix((np.ones(len(cast), dtype=np.int64), (rows, columns)),
+                                      shape=(len(movies), len(positions)))
+        coactors = (incidence.T @ incidence).tocsr()
+        coactors.setdiag(0)
+        coactors.eliminate_zeros()
+
+        actors = [frozen.get_key(i) for i in positions.tolist()]
+        self.coactors = (frozen.version, actors, coactors)
+        return actors, coactors
+
     def get_gross_age(self, num=10):
         """
         Get the total gross for all ages and display the top num age groups
         :param num: The number of age groups to display
         :return: The dictionary age/gross values and the number of of age groups
         """
+        if self.aggregates is not None:
+            return self.aggregates.get_gross_age(), num
+
         age_gross = {}
 
         for vertex in self.graph:
@@ -36,6 +84,9 @@ class Analyze:
                 actors = vertex.get_neighbors()
                 for actor in actors:
                     info = self.graph.get_vertex(actor)
+                    if info is None:
+                        # Deleted actors are still listed by their movies
+                        continue
                     age = info.get_value1()
                     gross = info.get_value2()
                     if age not in age_gross:
@@ -44,3 +95,17 @@ class Analyze:
                         age_gross[age] += gross
 
         return age_gross, num
+
+
+def top_indices(values, num):
+    """
+    Find the indices of the num largest values with a partial sort
+    :param values: Array of values
+    :param num: The number of indices to return
+    :return: Array of indices, largest value first
+    """
+    num = min(max(num, 0), len(values))
+    if not num:
+        return np.zeros(0, dtype=np.intp)
+    top = np.argpartition(-values, num - 1)[:num]
+    return top[np.lexsort((top, -values[top]))]
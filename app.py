@@ -1,15 +1,87 @@
-from flask import Flask, jsonify, request, make_response, abort
+from flask import Flask, Response, jsonify, request, make_response, abort, g
+from werkzeug.exceptions import HTTPException
+from functools import wraps
+import itertools
+import json
+import os
+from aggregates import Aggregates
+from analyze import Analyze
+from mutation_log import MutationLog
+from query import Query
+from response_cache import ResponseCache
+from rw_lock import ReadWriteLock
+from search_index import NameIndex
+from topk import top_k
 import utils
 
 app = Flask(__name__)
 
-graph = utils.parse('data.json')
+# Request handlers run on several threads: GET handlers hold the lock for
+# reading and PUT/POST/DELETE handlers for writing
+lock = ReadWriteLock()
+
+# Changes are only logged to disk when MUTATION_LOG names the log directory
+mutations = MutationLog(os.environ['MUTATION_LOG']) if os.environ.get('MUTATION_LOG') else None
+graph = mutations.load('data.json') if mutations else utils.load_graph('data.json', utils.parse)
+names = NameIndex(graph)
+responses = ResponseCache(graph)
+# Analytics kept up to date by every change, so the analytics endpoints never rescan the graph
+aggregates = Aggregates(graph)
+analyzer = Analyze(graph, aggregates)
+query = Query(graph, aggregates)
+
+# Names of the value1 and value2 fields of each group in requests and responses
+FIELDS = {'Actor': ('age', 'gross'), 'Movie': ('year', 'gross')}
+
+
+def mutating(view):
+    """
+    Decorate a view changing the graph, so it runs holding the lock for
+    writing and, when the mutation log is enabled, responds only once the
+    changes it recorded are durable
+    :param view: The Flask view function
+    :return: The decorated view function
+    """
+    @wraps(view)
+    def logged_view(*args, **kwargs):
+        g.mutations = []
+        sequence = None
+        lock.acquire_write()
+        try:
+            try:
+                response = view(*args, **kwargs)
+            finally:
+                if mutations and g.mutations:
+                    sequence = mutations.append(g.mutations)
+                    if mutations.should_compact():
+                        mutations.compact(graph)
+        finally:
+            # A failed log write or compaction must not leave every later request waiting
+            lock.release_write()
+
+        # Waiting outside the lock lets concurrent requests share one fsync
+        if sequence is not None:
+            mutations.sync(sequence)
+        return response
+
+    return logged_view
+
+
+def record_mutation(mutation):
+    """
+    Record a change made by the current request for the mutation log
+    :param mutation: The mutation record, see mutation_log.apply_mutation
+    :return: None
+    """
+    g.mutations.append(mutation)
 
 
 """ GET METHODS """
 
 
 @app.route('/actors', methods=['GET'])
+@responses.cached
+@lock.reading
 def get_filtered_actors():
     """
     Filter out actors who do not match some chosen attributes
@@ -18,27 +90,14 @@ def get_filtered_actors():
     filter_names = request.args.getlist('name')
     filter_ages = request.args.getlist('age', type=int)
     filter_gross = request.args.getlist('gross', type=int)
+    ranges = get_ranges((('value1', 'age_min', 'age_max'), ('value2', 'gross_min', 'gross_max')))
 
-    actors = {}
-    for vertex in graph:
-        name = vertex.get_key()
-        age = vertex.get_value1()
-        gross = vertex.get_value2()
-        if vertex.get_group() == 'Actor' and \
-                does_match_filters(name, age, gross, filter_names, filter_ages, filter_gross):
-            actor = dict()
-            actor['name'] = name
-            actor['age'] = age
-            actor['gross'] = gross
-            actors[vertex.get_key()] = actor
-
-    if not actors:
-        abort(400)
-
-    return jsonify(actors)
+    return filter_response('Actor', filter_names, filter_ages, filter_gross, ranges, actor_record)
 
 
 @app.route('/movies', methods=['GET'])
+@responses.cached
+@lock.reading
 def get_filtered_movies():
     """
     Filter out movies who do not match some chosen attributes
@@ -47,24 +106,200 @@ def get_filtered_movies():
     filter_names = request.args.getlist('name')
     filter_gross = request.args.getlist('gross', type=int)
     filter_years = request.args.getlist('year', type=int)
+    ranges = get_ranges((('value1', 'year_from', 'year_to'), ('value2', 'gross_min', 'gross_max')))
+
+    return filter_response('Movie', filter_names, filter_years, filter_gross, ranges, movie_record)
+
+
+def get_ranges(parameters):
+    """
+    Read the range filters of a request
+    :param parameters: Tuples of a field and the names of its lower and upper bound parameters
+    :return: List of (field, low, high) tuples for the fields with a bound given
+    """
+    ranges = []
+    for field, low_name, high_name in parameters:
+        low = request.args.get(low_name, type=float)
+        high = request.args.get(high_name, type=float)
+        if low is not None or high is not None:
+            ranges.append((field, low, high))
+    return ranges
 
-    movies = {}
-    for vertex in graph:
-        title = vertex.get_key()
-        gross = vertex.get_value1()
-        year = vertex.get_value2()
-        if vertex.get_group() == 'Movie' and \
-                does_match_filters(title, gross, year, filter_names, filter_years, filter_gross):
-            movie = dict()
-            movie['name'] = title
-            movie['gross'] = gross
-            movie['year'] = year
-            movies[vertex.get_key()] = movie
-
-    if not movies:
+
+def actor_record(vertex):
+    actor = dict()
+    actor['name'] = vertex.get_key()
+    actor['age'] = vertex.get_value1()
+    actor['gross'] = vertex.get_value2()
+    return actor
+
+
+def movie_record(vertex):
+    movie = dict()
+    movie['name'] = vertex.get_key()
+    movie['year'] = vertex.get_value1()
+    movie['gross'] = vertex.get_value2()
+    return movie
+
+
+def filter_response(group, filter_names, filter_value1, filter_value2, ranges, make_record):
+    """
+    Build the response for a filter request, one page at a time. The optional
+    query parameters are 'limit' (records per page), 'cursor' (the value of the
+    X-Next-Cursor header of the previous page), 'fields' (comma separated
+    record fields to return), 'match' ('all', the default, or 'any' of the
+    range filters and the exact filters) and 'format=ndjson' to stream one
+    JSON record per line as the records are found. A streamed page ends with a
+    {"cursor": ...} line when more records remain
+    :param group: The group of vertices, 'Actor' or 'Movie'
+    :param filter_names: The movies/actors to be filtered
+    :param filter_value1: The ages/years to be filtered
+    :param filter_value2: The gross' to be filtered
+    :param ranges: The (field, low, high) range filters
+    :param make_record: Function building the record of a vertex
+    :return:
+    """
+    match = request.args.get('match', 'all')
+    if match not in ('all', 'any'):
+        abort(400)
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor', -1, type=int)
+    fields = [field for field in request.args.get('fields', '').split(',') if field]
+    stream = request.args.get('format') == 'ndjson' or \
+        request.accept_mimetypes.best == 'application/x-ndjson'
+    if limit is not None and limit <= 0:
         abort(400)
 
-    return jsonify(movies)
+    matches = find_matches(group, filter_names, filter_value1, filter_value2, ranges,
+                           match == 'all', cursor)
+    first = next(matches, None)
+    if first is None:
+        abort(400)
+    matches = itertools.chain([first], matches)
+    page = PageIterator(matches, limit, make_record, fields)
+
+    if stream:
+        return Response(page.ndjson(), mimetype='application/x-ndjson')
+
+    records = {key: record for key, record in page}
+    response = jsonify(records)
+    if page.next_cursor is not None:
+        response.headers['X-Next-Cursor'] = str(page.next_cursor)
+    return response
+
+
+class PageIterator:
+    def __init__(self, matches, limit, make_record, fields):
+        """
+        Iterate over one page of (key, record) pairs of the matching vertices
+        :param matches: Iterator of the (key id, vertex) pairs matching the filters
+        :param limit: The maximum number of records in the page, unlimited if None
+        :param make_record: Function building the record of a vertex
+        :param fields: The record fields to keep, all fields if empty
+        """
+        self.matches = matches
+        self.limit = limit
+        self.make_record = make_record
+        self.fields = fields
+        self.next_cursor = None
+
+    def __iter__(self):
+        count = 0
+        last_id = None
+        for key_id, vertex in self.matches:
+            if self.limit is not None and count == self.limit:
+                self.next_cursor = last_id
+                break
+            record = self.make_record(vertex)
+            if self.fields:
+                record = {field: record[field] for field in self.fields if field in record}
+            yield vertex.get_key(), record
+            count += 1
+            last_id = key_id
+
+    def ndjson(self):
+        # The stream outlives the request handler, so the lock is taken again
+        # for each record rather than held while the client reads
+        records = iter(self)
+        while True:
+            with lock.read_locked():
+                item = next(records, None)
+            if item is None:
+                break
+            key, record = item
+            yield json.dumps(record) + '\n'
+        if self.next_cursor is not None:
+            yield json.dumps({'cursor': str(self.next_cursor)}) + '\n'
+
+
+def find_matches(group, filter_names, filter_value1, filter_value2, ranges=(), match_all=True,
+                 cursor=-1):
+    """
+    Find the vertices of a group matching the given filters. Range filters are
+    answered by binary search over the graph's sorted value indexes, and are
+    combined with each other and with the exact filters by AND or OR
+    :param group: The group of vertices, 'Actor' or 'Movie'
+    :param filter_names: The movies/actors to be filtered
+    :param filter_value1: The values of value1 to be filtered
+    :param filter_value2: The values of value2 to be filtered
+    :param ranges: The (field, low, high) range filters
+    :param match_all: If vertices must match every filter, rather than any
+    :param cursor: Only vertices with a key id greater than the cursor are found
+    :return: Iterator of (key id, vertex) pairs in key id order
+    """
+    if not ranges:
+        yield from find_exact_matches(group, filter_names, filter_value1, filter_value2, cursor)
+        return
+
+    exact = bool(filter_names or filter_value1 or filter_value2)
+    range_ids = sorted((graph.find_ids_range(group, field, low, high) for field, low, high in ranges),
+                       key=len)
+    if match_all:
+        key_ids = set(range_ids[0]).intersection(*range_ids[1:])
+    else:
+        key_ids = set().union(*range_ids)
+        if exact:
+            key_ids.update(key_id for key_id, vertex in
+                           find_exact_matches(group, filter_names, filter_value1, filter_value2, cursor))
+
+    for key_id in sorted(key_id for key_id in key_ids if key_id > cursor):
+        vertex = graph.get_vertex_by_id(key_id)
+        if vertex is None:
+            continue
+        if match_all and exact and \
+                not does_match_filters(vertex.get_key(), vertex.get_value1(), vertex.get_value2(),
+                                       filter_names, filter_value1, filter_value2):
+            continue
+        yield key_id, vertex
+
+
+def find_exact_matches(group, filter_names, filter_value1, filter_value2, cursor=-1):
+    """
+    Find the vertices of a group matching the exact filters, using the name
+    search index and the graph's secondary indexes
+    :param group: The group of vertices, 'Actor' or 'Movie'
+    :param filter_names: The movies/actors to be filtered
+    :param filter_value1: The values of value1 to be filtered
+    :param filter_value2: The values of value2 to be filtered
+    :param cursor: Only vertices with a key id greater than the cursor are found
+    :return: Iterator of (key id, vertex) pairs in key id order
+    """
+    matches = {}
+    for filter_name in filter_names:
+        for key_id in names.find(filter_name, group):
+            if key_id > cursor:
+                matches[key_id] = graph.get_vertex_by_id(key_id)
+    for field, values in (('value1', filter_value1), ('value2', filter_value2)):
+        for value in values:
+            for vertex in graph.find_vertices(group, field, value):
+                key_id = graph.get_id(vertex.get_key())
+                if key_id > cursor:
+                    matches[key_id] = vertex
+
+    for key_id, vertex in sorted(matches.items(), key=lambda match: match[0]):
+        if does_match_filters(vertex.get_key(), vertex.get_value1(), vertex.get_value2(),
+                              filter_names, filter_value1, filter_value2):
+            yield key_id, vertex
 
 
 def does_match_filters(name, value_1, value_2, filter_names, filter_value1, filter_value2):
@@ -96,70 +331,148 @@ def does_match_filters(name, value_1, value_2, filter_names, filter_value1, filt
     return match_name or match_value_1 or match_value_2
 
 
+@app.route('/search', methods=['GET'])
+@responses.cached
+@lock.reading
+def search_names():
+    """
+    Autocomplete actor and movie names, best matches first. The query
+    parameters are 'q' (the text typed so far), 'group' ('Actor' or 'Movie',
+    both if absent) and 'limit' (default 10)
+    :return:
+    """
+    text = request.args.get('q', '')
+    group = request.args.get('group')
+    limit = request.args.get('limit', 10, type=int)
+    if not text or limit <= 0:
+        abort(400)
+
+    results = [{'name': vertex.get_key(), 'group': vertex.get_group()}
+               for vertex in names.search(text, group, limit)]
+
+    return jsonify(results)
+
+
+def get_entity(key, group, missing=404):
+    """
+    Look up a vertex of the given group directly by key, aborting if it does not exist
+    :param key: The name of the actor/movie
+    :param group: The group the vertex must belong to, 'Actor' or 'Movie'
+    :param missing: The status code to abort with when no vertex has the key
+    :return: The vertex
+    """
+    vertex = graph.get_vertex(key, group)
+    if vertex is None:
+        abort(missing if graph.get_vertex(key) is None else 404)
+    return vertex
+
+
 @app.route('/actors/<actor_name>', methods=['GET'])
+@responses.cached
+@lock.reading
 def get_actor(actor_name):
     """
     Retrive the first actor meta-info who matches with the given actor name
     :return:
     """
-    actor_meta = {}
-    for vertex in graph:
-        if vertex.get_group() == 'Actor' and vertex.get_key() == actor_name:
-            actor = dict()
-            actor['name'] = vertex.get_key()
-            actor['age'] = vertex.get_value1()
-            actor['gross'] = vertex.get_value2()
-            actor_meta[actor_name] = actor
+    vertex = get_entity(actor_name, 'Actor')
 
-    if not actor_meta:
-        abort(404)
+    actor = dict()
+    actor['name'] = vertex.get_key()
+    actor['age'] = vertex.get_value1()
+    actor['gross'] = vertex.get_value2()
 
-    return jsonify(actor_meta)
+    return jsonify({actor_name: actor})
 
 
 @app.route('/movies/<movie_title>', methods=['GET'])
+@responses.cached
+@lock.reading
 def get_movie(movie_title):
     """
     Retrive the first movie meta-info who matches with the given movie name
     :return:
     """
-    movie_meta = {}
-    for vertex in graph:
-        if vertex.get_group() == 'Movie' and vertex.get_key() == movie_title:
-            movie = dict()
-            movie['title'] = vertex.get_key()
-            movie['year'] = vertex.get_value1()
-            movie['gross'] = vertex.get_value2()
-            movie_meta[movie_title] = movie
+    vertex = get_entity(movie_title, 'Movie')
+
+    movie = dict()
+    movie['title'] = vertex.get_key()
+    movie['year'] = vertex.get_value1()
+    movie['gross'] = vertex.get_value2()
+
+    return jsonify({movie_title: movie})
+
+
+def get_limit():
+    """
+    Read the 'limit' query parameter of an analytics request, aborting if it is not positive
+    :return: The number of results to return, default 10
+    """
+    limit = request.args.get('limit', 10, type=int)
+    if limit <= 0:
+        abort(400)
+    return limit
+
+
+@app.route('/analytics/hub_actors', methods=['GET'])
+@responses.cached
+@lock.reading
+def get_hub_actors():
+    """
+    Retrieve the actors with the most connections to other actors, most
+    connected first. The query parameter is 'limit' (default 10)
+    :return:
+    """
+    limit = get_limit()
+    connections, num = analyzer.get_hub_actors(limit)
+    hub = [{'name': actor, 'connections': count} for actor, count in top_k(connections.items(), num)]
+
+    return jsonify(hub)
+
+
+@app.route('/analytics/gross_age', methods=['GET'])
+@responses.cached
+@lock.reading
+def get_gross_age():
+    """
+    Retrieve the ages with the highest total gross, highest first. The query
+    parameter is 'limit' (default 10)
+    :return:
+    """
+    limit = get_limit()
+    age_gross, num = analyzer.get_gross_age(limit)
+    ages = [{'age': age, 'gross': gross} for age, gross in top_k(age_gross.items(), num)]
+
+    return jsonify(ages)
 
-    if not movie_meta:
-        abort(404)
 
-    return jsonify(movie_meta)
+@app.route('/analytics/top_actors', methods=['GET'])
+@responses.cached
+@lock.reading
+def get_top_actors():
+    """
+    Retrieve the top grossing actors, by the sum of their movie edges. The
+    query parameter is 'limit' (default 10)
+    :return:
+    """
+    actors = [{'name': actor, 'gross': gross} for actor, gross in query.get_top_actors(get_limit())]
+
+    return jsonify(actors)
 
 
 """ PUT METHODS """
 
 
 @app.route('/api/a/actors/<string:actor_name>', methods=['PUT'])
+@mutating
 def update_actor(actor_name):
     """
     Update the given actor's meta-info, if valid
     :param actor_name: The name of the actor whose meta-info should be updated
     :return:
     """
-    if actor_name not in graph.get_vertices():
-        abort(404)
-    if not request.json:
-        abort(400)
-
-    actor_meta = graph.get_vertex(actor_name)
-
-    age = request.json.get('age', actor_meta.get_value1())
-    actor_meta.set_value1(age)
-
-    gross = request.json.get('gross', actor_meta.get_value2())
-    actor_meta.set_value2(gross)
+    actor_meta = get_entity(actor_name, 'Actor')
+    age, gross = update_entity(actor_meta, request.get_json(silent=True))
 
     actor = dict()
     actor['name'] = actor_name
@@ -170,24 +483,15 @@ def update_actor(actor_name):
 
 
 @app.route('/api/a/movies/<string:movie_name>', methods=['PUT'])
+@mutating
 def update_movie(movie_name):
     """
     Update the given movies's meta-info, if valid
     :param movie_name: The name of the movie whose meta-info should be updated
     :return:
     """
-    if movie_name not in graph.get_vertices():
-        abort(404)
-    if not request.json:
-        abort(400)
-
-    movie_meta = graph.get_vertex(movie_name)
-
-    year = request.json.get('year', movie_meta.get_value1())
-    movie_meta.set_value1(year)
-
-    gross = request.json.get('gross', movie_meta.get_value2())
-    movie_meta.set_value2(gross)
+    movie_meta = get_entity(movie_name, 'Movie')
+    year, gross = update_entity(movie_meta, request.get_json(silent=True))
 
     movie = dict()
     movie['title'] = movie_name
@@ -201,82 +505,199 @@ def update_movie(movie_name):
 
 
 @app.route('/api/a/actors/', methods=['POST'])
+@mutating
 def create_actor():
     """
     Create an actor object with given attributes, if valid
     :return:
     """
-    if not request.json or 'name' not in request.json:
-        abort(400)
-
-    name = request.json['name']
-    age = request.json.get('age', -1)
-    gross = request.json.get('gross', 0)
-
-    graph.add_vertex('Actor', name, age, gross)
+    create_entity('Actor', request.get_json(silent=True))
 
     return jsonify({'result': 'Created Actor'}), 201
 
 
 @app.route('/api/a/movies/', methods=['POST'])
+@mutating
 def create_movie():
     """
     Create a movie object with given attributes, if valid
     :return:
     """
-    if not request.json or 'name' not in request.json:
+    create_entity('Movie', request.get_json(silent=True))
+
+    return jsonify({'result': 'Created Movie'}), 201
+
+
+@app.route('/api/a/batch', methods=['POST'])
+@mutating
+def apply_batch():
+    """
+    Apply a batch of operations in a single graph transaction. The body is a
+    JSON array, or NDJSON with one operation per line, of objects such as
+    {"op": "update", "group": "Actor", "name": "Bruce Willis", "age": 62},
+    where op is 'create', 'update' or 'delete'. Each operation gets its own
+    result, so a failed operation does not stop the rest of the batch
+    :return:
+    """
+    operations = read_operations()
+
+    results = []
+    deletes = []
+    pending_names = set()
+    with graph.transaction():
+        for index, operation in enumerate(operations):
+            try:
+                if not isinstance(operation, dict) or operation.get('group') not in FIELDS or \
+                        not isinstance(operation.get('name'), str):
+                    abort(400)
+                if operation.get('op') == 'delete':
+                    # Consecutive deletes are applied together, fixing up shared neighbors once
+                    name = operation.get('name')
+                    get_entity(name, operation['group'], missing=400)
+                    if name in pending_names:
+                        abort(400)
+                    deletes.append((index, name))
+                    pending_names.add(name)
+                    continue
+                apply_deletes(deletes, pending_names, results)
+                status, result = apply_operation(operation)
+                results.append({'index': index, 'status': status, 'result': result})
+            except HTTPException as error:
+                results.append({'index': index, 'status': error.code, 'error': error.name})
+        apply_deletes(deletes, pending_names, results)
+
+    results.sort(key=lambda result: result['index'])
+
+    return jsonify({'results': results})
+
+
+def read_operations():
+    """
+    Read the operations of a batch request
+    :return: List of the operations
+    """
+    if request.mimetype == 'application/x-ndjson':
+        try:
+            return [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        except ValueError:
+            abort(400)
+
+    operations = request.get_json(silent=True)
+    if not isinstance(operations, list):
         abort(400)
+    return operations
+
 
-    name = request.json['name']
-    year = request.json.get('year', -1)
-    gross = request.json.get('gross', 0)
+def apply_operation(operation):
+    """
+    Apply a create or update operation of a batch
+    :param operation: The operation, with its op, group, name and fields
+    :return: The status code and result of the operation
+    """
+    group = operation['group']
+    if operation.get('op') == 'create':
+        create_entity(group, operation)
+        return 201, f'Created {group}'
+    if operation.get('op') == 'update':
+        value1, value2 = update_entity(get_entity(operation.get('name'), group), operation)
+        value1_name, value2_name = FIELDS[group]
+        return 200, {'name': operation['name'], value1_name: value1, value2_name: value2}
+    abort(400)
+
+
+def apply_deletes(deletes, pending_names, results):
+    """
+    Delete the vertices of a run of delete operations at once
+    :param deletes: List of the (index, name) of the pending delete operations, emptied
+    :param pending_names: Set of the names of the pending delete operations, emptied
+    :param results: List the results of the operations are added to
+    :return: None
+    """
+    if not deletes:
+        return
+    delete_entities([name for index, name in deletes])
+    results.extend({'index': index, 'status': 200, 'result': f'Deleted {name}'} for index, name in deletes)
+    deletes.clear()
+    pending_names.clear()
 
-    graph.add_vertex('Movie', name, year, gross)
 
-    return jsonify({'result': 'Created Movie'}), 201
+def create_entity(group, data):
+    """
+    Create an actor or movie object from the given attributes, if valid
+    :param group: The group of the new vertex, 'Actor' or 'Movie'
+    :param data: The attributes, with at least the name
+    :return: The new vertex
+    """
+    # Vertex keys are strings, the name index and key table rely on it
+    if not data or not isinstance(data.get('name'), str):
+        abort(400)
+
+    value1_name, value2_name = FIELDS[group]
+    vertex = graph.add_vertex(group, data['name'], data.get(value1_name, -1), data.get(value2_name, 0))
+    record_mutation({'op': 'create', 'group': group, 'name': vertex.get_key(),
+                     'value1': vertex.get_value1(), 'value2': vertex.get_value2()})
+    return vertex
+
+
+def update_entity(vertex, data):
+    """
+    Update an actor or movie object's attributes, keeping those not given
+    :param vertex: The vertex to update
+    :param data: The new attributes
+    :return: The updated value1 and value2
+    """
+    if not data:
+        abort(400)
+
+    value1_name, value2_name = FIELDS[vertex.get_group()]
+    value1 = data.get(value1_name, vertex.get_value1())
+    vertex.set_value1(value1)
+
+    value2 = data.get(value2_name, vertex.get_value2())
+    vertex.set_value2(value2)
+    record_mutation({'op': 'update', 'group': vertex.get_group(), 'name': vertex.get_key(),
+                     'value1': value1, 'value2': value2})
+
+    return value1, value2
+
+
+def delete_entities(names):
+    """
+    Delete actor or movie objects along with their edges
+    :param names: The names of the actors/movies, which must exist
+    :return: None
+    """
+    graph.delete_vertices(names)
+    record_mutation({'op': 'delete', 'names': names})
 
 
 """ DELETE METHODS """
 
 
 @app.route('/api/a/actors/<string:actor_name>', methods=['DELETE'])
+@mutating
 def delete_actor(actor_name):
     """
     Delete an actor object, if it exists
     :param actor_name: The name of the actor whose meta-info will be deleted
     :return:
     """
-    if actor_name not in graph.get_vertices():
-        abort(400)
-
-    actor_meta = graph.get_vertex(actor_name)
-
-    for movies in actor_meta.get_neighbors():
-        actors = graph.get_vertex(movies).get_neighbors()
-        del actors[actor_name]
-
-    graph.delete_vertex(actor_name)
+    get_entity(actor_name, 'Actor', missing=400)
+    delete_entities([actor_name])
 
     return jsonify({'result': f'Deleted {actor_name}'})
 
 
 @app.route('/api/a/movies/<string:movie_name>', methods=['DELETE'])
+@mutating
 def delete_movie(movie_name):
     """
     Delete a movie object, if it exists
     :param movie_name: The name of the movie whose meta-info will be deleted
     :return:
     """
-    if movie_name not in graph.get_vertices():
-        abort(400)
-
-    movie_meta = graph.get_vertex(movie_name)
-
-    for actors in movie_meta.get_neighbors():
-        movies = graph.get_vertex(actors).get_neighbors()
-        del movies[movie_name]
-
-    graph.delete_vertex(movie_name)
+    get_entity(movie_name, 'Movie', missing=400)
+    delete_entities([movie_name])
 
     return jsonify({'result': f'Deleted {movie_name}'})
 
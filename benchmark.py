@@ -0,0 +1,85 @@
+from bs4 import BeautifulSoup
+from time import perf_counter
+import argparse
+import logging
+import glob
+import os
+import scraper
+
+"""
+Program: benchmark.py
+
+Compare the per-page parse time of the BeautifulSoup extraction functions
+with the single pass infobox extractor on saved Wikipedia pages. Pages are
+named actor_*.html or movie_*.html so the benchmark knows how to parse them.
+"""
+
+FIXTURE_DIR = 'fixtures'
+REPEAT = 20
+
+
+def parse_soup(raw_page, group):
+    """
+    Extract a record the way the scraper did before the single pass extractor
+    :param raw_page: The raw bytes of the Wikipedia page
+    :param group: The type of the page
+    :return: The extracted actor or movie record, if available
+    """
+    soup = BeautifulSoup(raw_page, 'html.parser')
+    if group == scraper.ACTOR:
+        return scraper.extract_actor(soup)
+    return scraper.extract_movie(soup)
+
+
+def time_parse(function, raw_page, group, repeat):
+    """
+    Time a parse function on a single page
+    :param function: The parse function to be timed
+    :param raw_page: The raw bytes of the Wikipedia page
+    :param group: The type of the page
+    :param repeat: The number of times the page is parsed
+    :return: The record returned, the mean parse time in milliseconds
+    """
+    start = perf_counter()
+    for _ in range(repeat):
+        record = function(raw_page, group)
+    return record, (perf_counter() - start) / repeat * 1000
+
+
+def benchmark(directory=FIXTURE_DIR, repeat=REPEAT):
+    """
+    Benchmark both extractors on every saved page in the directory
+    :param directory: The directory of saved Wikipedia pages
+    :param repeat: The number of times each page is parsed
+    :return: The rows of (page, soup ms, single pass ms, records match)
+    """
+    rows = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+        name = os.path.basename(path)
+        group = scraper.ACTOR if name.startswith('actor') else scraper.MOVIE
+        with open(path, 'rb') as page_file:
+            raw_page = page_file.read()
+
+        soup_record, soup_time = time_parse(parse_soup, raw_page, group, repeat)
+        fast_record, fast_time = time_parse(scraper.extract_page, raw_page, group, repeat)
+        rows.append((name, soup_time, fast_time, soup_record == fast_record))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Wikipedia page extraction')
+    parser.add_argument('directory', nargs='?', default=FIXTURE_DIR)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    args = parser.parse_args()
+
+    # The scraper logs every step, which would dominate the timings
+    logging.disable(logging.CRITICAL)
+    rows = benchmark(args.directory, args.repeat)
+
+    print(f'{"page":<36}{"soup ms":>10}{"1-pass ms":>12}{"speedup":>10}  match')
+    for name, soup_time, fast_time, match in rows:
+        print(f'{name:<36}{soup_time:>10.2f}{fast_time:>12.2f}{soup_time / fast_time:>9.1f}x  {match}')
+
+
+if __name__ == '__main__':
+    main()
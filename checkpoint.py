@@ -0,0 +1,114 @@
+from graph import Graph
+import logging.config
+import json
+import yaml
+import os
+
+"""
+Program: checkpoint.py
+
+Periodic crawl checkpoints. The frontier, visited urls and counters are
+rewritten atomically to state.json, while the graph is only ever appended
+to graph.jsonl as the vertices, values and edges changed since the last
+checkpoint.
+"""
+
+CHECKPOINT_DIR = 'checkpoint'
+INTERVAL = 50
+
+with open('config.yaml', 'r') as f:
+    config = yaml.safe_load(f.read())
+    logging.config.dictConfig(config)
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    def __init__(self, directory=CHECKPOINT_DIR, interval=INTERVAL):
+        """
+        Initialize the Checkpoint object
+        :param directory: The directory holding the checkpoint files
+        :param interval: The number of scraped pages between checkpoints
+        """
+        self.directory = directory
+        self.interval = interval
+        self.state_path = os.path.join(directory, 'state.json')
+        self.graph_path = os.path.join(directory, 'graph.jsonl')
+        self.graph_records = 0
+
+    def exists(self):
+        """
+        Determine if a checkpoint has been saved
+        :return: If a checkpoint can be resumed from
+        """
+        return os.path.exists(self.state_path)
+
+    def clear(self):
+        """
+        Remove any saved checkpoint so a fresh crawl can start
+        :return: None
+        """
+        for path in (self.state_path, self.graph_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.graph_records = 0
+
+    def save(self, state, delta):
+        """
+        Append the graph delta, then atomically replace the crawl state
+        :param state: The frontier, visited urls and counters of the crawl
+        :param delta: The vertex, value and edge records since the last checkpoint
+        :return: None
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.graph_path, 'a') as graph_file:
+            for record in delta:
+                print(json.dumps(record), file=graph_file)
+            graph_file.flush()
+            os.fsync(graph_file.fileno())
+        self.graph_records += len(delta)
+
+        state = dict(state, graph_records=self.graph_records)
+        with open(self.state_path + '.tmp', 'w') as state_file:
+            json.dump(state, state_file)
+            state_file.flush()
+            os.fsync(state_file.fileno())
+        os.replace(self.state_path + '.tmp', self.state_path)
+        logger.info(f'Checkpoint saved, {self.graph_records} graph records')
+
+    def load(self):
+        """
+        Load the last checkpoint, rebuilding the graph from its delta records.
+        Records appended after the last state was written are discarded
+        :return: The crawl state and the rebuilt graph
+        """
+        with open(self.state_path, 'r') as state_file:
+            state = json.load(state_file)
+
+        graph = Graph()
+        self.graph_records = state['graph_records']
+        with open(self.graph_path, 'r+') as graph_file:
+            for _ in range(self.graph_records):
+                apply_record(graph, json.loads(graph_file.readline()))
+            graph_file.truncate(graph_file.tell())
+
+        logger.info(f'Checkpoint loaded, {len(graph.get_vertices())} vertices')
+        return state, graph
+
+
+def apply_record(graph, record):
+    """
+    Apply a single vertex, value or edge record to the graph
+    :param graph: The graph to be updated
+    :param record: The record to be applied
+    :return: None
+    """
+    if 'vertex' in record:
+        graph.add_vertex(*record['vertex'])
+    elif 'value' in record:
+        key, value1, value2 = record['value']
+        vertex = graph.get_vertex(key)
+        vertex.set_value1(value1)
+        vertex.set_value2(value2)
+    else:
+        graph.add_edge(*record['edge'])
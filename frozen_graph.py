@@ -0,0 +1,168 @@
+import numpy as np
+
+"""
+Program: frozen_graph.py
+
+Immutable compressed sparse row (CSR) snapshot of a Graph. Vertices are
+numbered 0..n-1 in graph order; the neighbors of vertex i are
+neighbors[offsets[i]:offsets[i + 1]] with matching weights, and the
+group, value1 and value2 of every vertex are stored as columns so they
+can be scanned with vectorized NumPy operations. Edges to keys without a
+vertex of their own are left out.
+"""
+
+
+class FrozenGraph:
+    def __init__(self, graph):
+        """
+        Build the snapshot of the graph's current state
+        :param graph: The graph to be frozen
+        """
+        vertices = list(graph)
+        self.version = graph.version
+        self.keys = [vertex.get_key() for vertex in vertices]
+        self.index = {key: i for i, key in enumerate(self.keys)}
+
+        # Map the graph's key ids to snapshot positions
+        position = np.full(len(graph.table), -1, dtype=np.int64)
+        for i, vertex in enumerate(vertices):
+            position[graph.table.get_id(vertex.get_key())] = i
+
+        degrees = np.array([len(vertex.neighbor_ids) for vertex in vertices], dtype=np.int64)
+        if vertices:
+            neighbor_ids = np.concatenate([np.frombuffer(vertex.neighbor_ids, dtype=np.int32)
+                                           for vertex in vertices])
+            weights = np.concatenate([np.asarray(vertex.weights, dtype=np.float64)
+                                      for vertex in vertices])
+        else:
+            neighbor_ids = np.zeros(0, dtype=np.int32)
+            weights = np.zeros(0, dtype=np.float64)
+        neighbors = position[neighbor_ids]
+
+        # Neighbors without a vertex, such as deleted ones, have no position and their edges are dropped
+        live = neighbors >= 0
+        if not live.all():
+            owners = np.repeat(np.arange(len(vertices)), degrees)
+            degrees = np.bincount(owners[live], minlength=len(vertices))
+            neighbors = neighbors[live]
+            weights = weights[live]
+
+        self.offsets = np.zeros(len(vertices) + 1, dtype=np.int64)
+        np.cumsum(degrees, out=self.offsets[1:])
+        self.neighbors = neighbors.astype(np.int32)
+        self.weights = weights
+
+        self.group_names = sorted({vertex.get_group() for vertex in vertices}, key=str)
+        group_codes = {group: code for code, group in enumerate(self.group_names)}
+        self.groups = np.array([group_codes[vertex.get_group()] for vertex in vertices], dtype=np.int16)
+        self.value1 = np.array([numeric(vertex.get_value1()) for vertex in vertices], dtype=np.float64)
+        self.value2 = np.array([numeric(vertex.get_value2()) for vertex in vertices], dtype=np.float64)
+
+        for column in (self.offsets, self.neighbors, self.weights, self.groups, self.value1, self.value2):
+            column.setflags(write=False)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def is_current(self, graph):
+        """
+        Determine if the graph changed since this snapshot was taken
+        :param graph: The graph this snapshot was taken from
+        :return: If the snapshot still matches the graph
+        """
+        return graph.version == self.version
+
+    def get_index(self, key):
+        """
+        Obtain the snapshot position of a vertex
+        :param key: The key of the vertex
+        :return: The position of the vertex, None if not in the snapshot
+        """
+        return self.index.get(key)
+
+    def get_key(self, i):
+        return self.keys[i]
+
+    def get_group(self, i):
+        return self.group_names[self.groups[i]]
+
+    def neighbor_indices(self, i):
+        """
+        Obtain the positions of a vertex's neighbors without copying
+        :param i: The position of the vertex
+        :return: Read-only array of neighbor positions
+        """
+        return self.neighbors[self.offsets[i]:self.offsets[i + 1]]
+
+    def neighbor_weights(self, i):
+        """
+        Obtain the weights of a vertex's edges without copying
+        :param i: The position of the vertex
+        :return: Read-only array of edge weights, in neighbor order
+        """
+        return self.weights[self.offsets[i]:self.offsets[i + 1]]
+
+    def get_neighbors(self, key):
+        """
+        Retrieve a vertex's neighbors and edge weights
+        :param key: The key of the vertex
+        :return: Dictionary of neighbor keys to weights, None if the vertex is not in the snapshot
+        """
+        i = self.get_index(key)
+        if i is None:
+            return None
+        return {self.keys[j]: weight for j, weight in zip(self.neighbor_indices(i).tolist(),
+                                                          self.neighbor_weights(i).tolist())}
+
+    def degrees(self):
+        """
+        Obtain the number of edges of every vertex
+        :return: Array of degrees, by position
+        """
+        return np.diff(self.offsets)
+
+    def group_mask(self, group):
+        """
+        Obtain a mask of the vertices belonging to a group
+        :param group: The group of vertices
+        :return: Boolean array, by position
+        """
+        if group not in self.group_names:
+            return np.zeros(len(self.keys), dtype=bool)
+        return self.groups == self.group_names.index(group)
+
+    def select(self, group=None, column=None, low=None, high=None):
+        """
+        Find the vertices of a group whose value column lies within a range
+        :param group: The group of vertices, any group if None
+        :param column: 'value1' or 'value2', no value filter if None
+        :param low: The inclusive lower bound, unbounded if None
+        :param high: The inclusive upper bound, unbounded if None
+        :return: Array of matching positions
+        """
+        mask = self.group_mask(group) if group is not None else np.ones(len(self.keys), dtype=bool)
+        if column is not None:
+            values = getattr(self, column)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        return np.flatnonzero(mask)
+
+    def edge_sources(self):
+        """
+        Obtain the position of the source vertex of every stored edge
+        :return: Array parallel to the neighbors and weights arrays
+        """
+        return np.repeat(np.arange(len(self.keys)), self.degrees())
+
+
+def numeric(value):
+    """
+    Convert a vertex value to a float for the value columns
+    :param value: The vertex value
+    :return: The value as a float, NaN if it is not a number
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return float('nan')
@@ -1,27 +1,466 @@
-from vertex import Vertex
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Mapping
+from contextlib import contextmanager
+from vertex import Vertex, KeyTable
+
+# Vertex fields kept in secondary indexes, per group
+INDEXED_FIELDS = ('value1', 'value2')
+
+
+class VertexMap(Mapping):
+    """
+    Read-only dictionary view of a graph's vertices keyed by vertex key
+    """
+    __slots__ = ('graph',)
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, key):
+        vertex = self.graph.get_vertex(key)
+        if vertex is None:
+            raise KeyError(key)
+        return vertex
+
+    def __contains__(self, key):
+        return self.graph.get_vertex(key) is not None
+
+    def __iter__(self):
+        return (vertex.key for vertex in self.graph)
+
+    def __len__(self):
+        return self.graph.count
+
+
+class GraphListener:
+    """
+    Base class of the objects subscribed to a graph's changes, see Graph.subscribe.
+    Every event is called after the change was made
+    """
+
+    def vertex_added(self, key_id, vertex):
+        pass
+
+    def vertex_removed(self, key_id, vertex):
+        pass
+
+    def value_changed(self, key_id, vertex, field, old_value):
+        pass
+
+    def edge_changed(self, key_id, vertex, neighbor_id, old_weight, weight):
+        """
+        Called when one direction of an edge is added, re-weighted or removed
+        :param key_id: The key id of the vertex whose neighbors changed
+        :param vertex: The vertex whose neighbors changed
+        :param neighbor_id: The key id of the neighbor
+        :param old_weight: The weight before, None if the edge is new
+        :param weight: The weight after, None if the edge was removed
+        :return: None
+        """
+        pass
+
+
+class ValueIndex:
+    """
+    Secondary index of one vertex field within a group: vertex ids by exact
+    value, and a sorted (value, id) list of the numeric values for range and
+    top-n lookups. Entries are appended and the list is only sorted again by
+    the next lookup, so loading n vertices costs one sort instead of n inserts
+    """
+    __slots__ = ('equal', 'order', 'dirty')
+
+    def __init__(self):
+        self.equal = {}
+        self.order = []
+        self.dirty = False
+
+    def add(self, key_id, value):
+        try:
+            self.equal.setdefault(value, {})[key_id] = None
+        except TypeError:
+            return
+        if is_number(value):
+            if self.order and (value, key_id) < self.order[-1]:
+                self.dirty = True
+            self.order.append((value, key_id))
+
+    def sort(self):
+        if self.dirty:
+            self.order.sort()
+            self.dirty = False
+
+    def remove(self, key_id, value):
+        try:
+            ids = self.equal.get(value)
+        except TypeError:
+            return
+        if ids is None or key_id not in ids:
+            return
+        del ids[key_id]
+        if not ids:
+            del self.equal[value]
+        if is_number(value):
+            self.sort()
+            del self.order[bisect_left(self.order, (value, key_id))]
+
+    def find(self, value):
+        try:
+            return list(self.equal.get(value, ()))
+        except TypeError:
+            return []
+
+    def find_range(self, low=None, high=None):
+        self.sort()
+        start = bisect_left(self.order, (low,)) if low is not None else 0
+        end = bisect_left(self.order, (high, float('inf'))) if high is not None else len(self.order)
+        return [key_id for value, key_id in self.order[start:end]]
+
+    def largest(self, num):
+        if num <= 0:
+            return []
+        self.sort()
+        start = max(len(self.order) - num, 0)
+        # Take in every entry tied with the smallest value kept, so ties come out in id order
+        if start:
+            start = bisect_left(self.order, (self.order[start][0],))
+        entries = sorted(self.order[start:], key=lambda entry: -entry[0])
+        return [key_id for value, key_id in entries[:num]]
 
 
 class Graph:
     def __init__(self):
-        self.vertices = {}
+        # Vertices are stored by interned key id, None marks a deleted key
+        self.table = KeyTable()
+        self.records = []
+        self.count = 0
+        # Bumped on every change, so snapshots can tell when they are stale
+        self.version = 0
+        self.frozen = None
+        # Secondary indexes: sorted vertex ids by group, and a ValueIndex per (group, field)
+        self.groups = {}
+        self.indexes = {}
+        # Objects told about vertices being added and removed, see subscribe
+        self.listeners = []
+        self.transactions = 0
+        self.pending = False
 
     def add_vertex(self, group, key, value1, value2=-1):
-        vertex = Vertex(group, key, value1, value2)
-        self.vertices[key] = vertex
+        vertex = Vertex(group, key, value1, value2, self.table)
+        self.put_record(self.table.intern(key), vertex)
         return vertex
 
+    def put_record(self, key_id, vertex):
+        if key_id >= len(self.records):
+            self.records.extend([None] * (key_id + 1 - len(self.records)))
+        old_vertex = self.records[key_id]
+        if old_vertex is None:
+            self.count += 1
+        else:
+            self.unindex(key_id, old_vertex)
+            old_vertex.graph = None
+            for listener in self.listeners:
+                listener.vertex_removed(key_id, old_vertex)
+        self.records[key_id] = vertex
+        vertex.graph = self
+        self.index(key_id, vertex)
+        self.changed()
+        for listener in self.listeners:
+            listener.vertex_added(key_id, vertex)
+
     def delete_vertex(self, key):
-        del self.vertices[key]
+        key_id = self.get_id(key)
+        if key_id is None:
+            raise KeyError(key)
+        vertex = self.records[key_id]
+        self.unindex(key_id, vertex)
+        vertex.graph = None
+        self.records[key_id] = None
+        self.count -= 1
+        self.changed()
+        for listener in self.listeners:
+            listener.vertex_removed(key_id, vertex)
 
-    def get_vertex(self, key):
-        return self.vertices[key] if key in self.vertices else None
+    def delete_vertices(self, keys):
+        """
+        Delete vertices along with their edges, fixing up each remaining
+        neighbor only once however many of its neighbors are deleted
+        :param keys: The keys of the vertices to delete
+        :return: None
+        """
+        key_ids = set()
+        for key in keys:
+            key_id = self.get_id(key)
+            if key_id is None:
+                raise KeyError(key)
+            key_ids.add(key_id)
 
-    def add_edge(self, key1, key2, weight):
-        self.vertices[key1].add_neighbor(key2, weight)
-        self.vertices[key2].add_neighbor(key1, weight)
+        neighbor_ids = set()
+        for key_id in key_ids:
+            neighbor_ids.update(self.records[key_id].neighbor_ids)
+        for neighbor_id in neighbor_ids - key_ids:
+            neighbor = self.get_vertex_by_id(neighbor_id)
+            if neighbor is not None:
+                neighbor.remove_neighbor_ids(key_ids)
+
+        for key_id in key_ids:
+            self.delete_vertex(self.table.get_key(key_id))
+
+    @contextmanager
+    def transaction(self):
+        """
+        Group several changes so the graph's version moves on only once for
+        all of them, and caches keyed on the version are invalidated once
+        :return: Context manager yielding the graph
+        """
+        self.transactions += 1
+        try:
+            yield self
+        finally:
+            self.transactions -= 1
+            if not self.transactions and self.pending:
+                self.pending = False
+                self.version += 1
+
+    def changed(self):
+        if self.transactions:
+            self.pending = True
+        else:
+            self.version += 1
+
+    def get_id(self, key):
+        key_id = self.table.get_id(key)
+        if key_id is None or key_id >= len(self.records) or self.records[key_id] is None:
+            return None
+        return key_id
+
+    def get_vertex_by_id(self, key_id):
+        return self.records[key_id] if key_id < len(self.records) else None
+
+    def get_vertex(self, key, group=None):
+        """
+        Retrieve a vertex by key in constant time
+        :param key: The key of the vertex
+        :param group: The group the vertex must belong to, any group if None
+        :return: The vertex, None if there is no such vertex in the group
+        """
+        key_id = self.get_id(key)
+        if key_id is None:
+            return None
+        vertex = self.records[key_id]
+        if group is not None and vertex.get_group() != group:
+            return None
+        return vertex
+
+    def add_edge(self, key1, key2, weight, new=False):
+        """
+        Add an edge in both directions, or set its weight if it exists
+        :param key1: The key of one vertex
+        :param key2: The key of the other vertex
+        :param weight: The weight of the edge
+        :param new: If the caller knows the edge does not exist yet, so it is appended without a lookup
+        :return: None
+        """
+        vertex1 = self.get_vertex(key1)
+        vertex2 = self.get_vertex(key2)
+        if vertex1 is None or vertex2 is None:
+            raise KeyError(key1 if vertex1 is None else key2)
+        if new:
+            vertex1.append_neighbor_id(self.table.get_id(key2), weight)
+            vertex2.append_neighbor_id(self.table.get_id(key1), weight)
+        else:
+            vertex1.add_neighbor_id(self.table.get_id(key2), weight)
+            vertex2.add_neighbor_id(self.table.get_id(key1), weight)
 
     def get_vertices(self):
         return self.vertices.keys()
 
+    @property
+    def vertices(self):
+        return VertexMap(self)
+
+    @vertices.setter
+    def vertices(self, vertices):
+        # Used when decoding graphs saved before vertices were stored by id
+        self.table = KeyTable()
+        self.records = []
+        self.count = 0
+        self.version = 0
+        self.frozen = None
+        self.groups = {}
+        self.indexes = {}
+        self.listeners = []
+        self.transactions = 0
+        self.pending = False
+        for key, vertex in vertices.items():
+            vertex.move_to(self.table)
+            self.put_record(self.table.intern(key), vertex)
+
+    def subscribe(self, listener):
+        """
+        Register an object to be told about changes to the graph's vertices,
+        values and edges
+        :param listener: The GraphListener to notify
+        :return: None
+        """
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def index(self, key_id, vertex):
+        group = vertex.get_group()
+        key_ids = self.groups.setdefault(group, [])
+        # Ids mostly come in increasing order, only a reused id is inserted
+        if not key_ids or key_id > key_ids[-1]:
+            key_ids.append(key_id)
+        else:
+            insort(key_ids, key_id)
+        for field in INDEXED_FIELDS:
+            value_index = self.indexes.get((group, field))
+            if value_index is None:
+                value_index = self.indexes[(group, field)] = ValueIndex()
+            value_index.add(key_id, getattr(vertex, field))
+
+    def unindex(self, key_id, vertex):
+        group = vertex.get_group()
+        key_ids = self.groups[group]
+        index = bisect_left(key_ids, key_id)
+        if index < len(key_ids) and key_ids[index] == key_id:
+            del key_ids[index]
+        for field in INDEXED_FIELDS:
+            self.indexes[(group, field)].remove(key_id, getattr(vertex, field))
+
+    def value_changed(self, vertex, field, old_value):
+        """
+        Update the secondary indexes and tell the listeners after one of a
+        vertex's fields was set
+        :param vertex: The vertex that changed
+        :param field: The name of the field, 'value1' or 'value2'
+        :param old_value: The value the field held before
+        :return: None
+        """
+        key_id = self.get_id(vertex.get_key())
+        if key_id is None or self.records[key_id] is not vertex:
+            return
+        value_index = self.indexes[(vertex.get_group(), field)]
+        value_index.remove(key_id, old_value)
+        value_index.add(key_id, getattr(vertex, field))
+        for listener in self.listeners:
+            listener.value_changed(key_id, vertex, field, old_value)
+
+    def edge_changed(self, vertex, neighbor_id, old_weight, weight):
+        """
+        Tell the listeners about a change to one of a vertex's edges
+        :param vertex: The vertex whose neighbors changed
+        :param neighbor_id: The key id of the neighbor
+        :param old_weight: The weight before, None if the edge is new
+        :param weight: The weight after, None if the edge was removed
+        :return: None
+        """
+        if not self.listeners:
+            return
+        key_id = self.get_id(vertex.get_key())
+        if key_id is None or self.records[key_id] is not vertex:
+            return
+        for listener in self.listeners:
+            listener.edge_changed(key_id, vertex, neighbor_id, old_weight, weight)
+
+    def get_group_vertices(self, group):
+        """
+        Retrieve the vertices of a group, in key id order
+        :param group: The group of vertices, e.g. 'Actor' or 'Movie'
+        :return: List of the group's vertices
+        """
+        return [self.records[key_id] for key_id in self.groups.get(group, ())]
+
+    def iter_group(self, group, after=-1):
+        """
+        Iterate over the vertices of a group in key id order
+        :param group: The group of vertices
+        :param after: Only vertices with a key id greater than this are returned
+        :return: Iterator of (key id, vertex) pairs
+        """
+        key_ids = self.groups.get(group, [])
+        # A copy of the ids, so the graph may change while a page is streamed
+        for key_id in key_ids[bisect_right(key_ids, after):]:
+            vertex = self.records[key_id]
+            if vertex is not None:
+                yield key_id, vertex
+
+    def find_vertices(self, group, field, value):
+        """
+        Retrieve the vertices of a group whose field equals a value
+        :param group: The group of vertices
+        :param field: The field compared, 'value1' or 'value2'
+        :param value: The value the field should be equal to
+        :return: List of matching vertices, in the order they were added
+        """
+        value_index = self.indexes.get((group, field))
+        if value_index is None:
+            return []
+        return [self.records[key_id] for key_id in value_index.find(value)]
+
+    def find_vertices_range(self, group, field, low=None, high=None):
+        """
+        Retrieve the vertices of a group whose numeric field lies within a range
+        :param group: The group of vertices
+        :param field: The field compared, 'value1' or 'value2'
+        :param low: The inclusive lower bound, unbounded if None
+        :param high: The inclusive upper bound, unbounded if None
+        :return: List of matching vertices, in increasing order of the field
+        """
+        return [self.records[key_id] for key_id in self.find_ids_range(group, field, low, high)]
+
+    def find_ids_range(self, group, field, low=None, high=None):
+        """
+        Retrieve the key ids of the vertices of a group whose numeric field lies within a range
+        :param group: The group of vertices
+        :param field: The field compared, 'value1' or 'value2'
+        :param low: The inclusive lower bound, unbounded if None
+        :param high: The inclusive upper bound, unbounded if None
+        :return: List of key ids, in increasing order of the field
+        """
+        value_index = self.indexes.get((group, field))
+        if value_index is None:
+            return []
+        return value_index.find_range(low, high)
+
+    def get_largest(self, group, field, num):
+        """
+        Retrieve the vertices of a group with the largest numeric field
+        :param group: The group of vertices
+        :param field: The field compared, 'value1' or 'value2'
+        :param num: The number of vertices to return
+        :return: List of at most num vertices, in decreasing order of the field
+        """
+        value_index = self.indexes.get((group, field))
+        if value_index is None:
+            return []
+        return [self.records[key_id] for key_id in value_index.largest(num)]
+
+    def freeze(self):
+        """
+        Obtain an immutable compressed sparse row snapshot of the graph. The
+        snapshot is rebuilt only if the graph changed since the last call
+        :return: The FrozenGraph snapshot of the current graph
+        """
+        from frozen_graph import FrozenGraph
+        if self.transactions and self.pending:
+            # The version only moves on once the transaction ends
+            return FrozenGraph(self)
+        if self.frozen is None or self.frozen.version != self.version:
+            self.frozen = FrozenGraph(self)
+        return self.frozen
+
     def __iter__(self):
-        return iter(self.vertices.values())
+        return (vertex for vertex in self.records if vertex is not None)
+
+    def __getstate__(self):
+        return {'vertices': dict(self.vertices.items())}
+
+    def __setstate__(self, state):
+        self.vertices = state['vertices']
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value == value
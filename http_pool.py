@@ -0,0 +1,187 @@
+from urllib.error import URLError, HTTPError
+from urllib.parse import urlsplit, urljoin
+from http.client import HTTPConnection, HTTPSConnection, HTTPException
+from email.message import Message
+from threading import Condition
+from time import time
+import logging.config
+import yaml
+
+"""
+Program: http_pool.py
+
+Keep-alive HTTP connection pool used by the scraper, so consecutive
+requests to the same host reuse one TCP+TLS connection.
+"""
+
+MAX_PER_HOST = 8
+MAX_REDIRECTS = 5
+TIMEOUT = 30
+USER_AGENT = 'wiki_scraping_api/1.0 (movie and actor scraper)'
+
+with open('config.yaml', 'r') as f:
+    config = yaml.safe_load(f.read())
+    logging.config.dictConfig(config)
+
+logger = logging.getLogger(__name__)
+
+
+class Response:
+    def __init__(self, url, status, headers, body):
+        """
+        Initialize a fully read HTTP response
+        :param url: The final url of the response, after redirects
+        :param status: The HTTP status code
+        :param headers: The response headers
+        :param body: The raw bytes of the response body
+        """
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+class ConnectionPool:
+    def __init__(self, max_per_host=MAX_PER_HOST, timeout=TIMEOUT):
+        """
+        Initialize the ConnectionPool object
+        :param max_per_host: The maximum number of open connections per host
+        :param timeout: The socket timeout of each connection, in seconds
+        """
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.idle = {}
+        self.open = {}
+        self.condition = Condition()
+        self.stats = {'requests': 0, 'hits': 0, 'new_connections': 0, 'wait_time': 0.0}
+
+    def request(self, url, headers=None):
+        """
+        Send a GET request over a pooled connection, following redirects
+        :param url: The url to be requested
+        :param headers: Any extra request headers
+        :return: The fully read Response
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self.send(url, headers)
+            location = response.headers.get('Location')
+            if response.status not in (301, 302, 303, 307, 308) or location is None:
+                break
+            url = urljoin(url, location)
+        else:
+            raise URLError(f'Too many redirects: {url}')
+
+        if response.status >= 400:
+            raise HTTPError(url, response.status, f'HTTP {response.status}', response.headers, None)
+
+        return response
+
+    def send(self, url, headers):
+        """
+        Send a single GET request, retrying once if a reused connection went stale
+        :param url: The url to be requested
+        :param headers: Any extra request headers
+        :return: The fully read Response
+        """
+        parts = urlsplit(url)
+        host = (parts.scheme, parts.netloc)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        request_headers = {'User-Agent': USER_AGENT}
+        request_headers.update(headers or {})
+
+        for attempt in range(2):
+            connection, reused = self.acquire(host)
+            try:
+                connection.request('GET', path, headers=request_headers)
+                raw = connection.getresponse()
+                body = raw.read()
+            except (HTTPException, OSError) as e:
+                self.discard(host, connection)
+                if reused and attempt == 0:
+                    logger.debug(f'Stale connection to {parts.netloc}, retrying')
+                    continue
+                raise URLError(e)
+
+            response_headers = Message()
+            for key, value in raw.getheaders():
+                response_headers[key] = value
+
+            if raw.will_close:
+                self.discard(host, connection)
+            else:
+                self.release(host, connection)
+            return Response(url, raw.status, response_headers, body)
+
+    def acquire(self, host):
+        """
+        Obtain an idle connection to the host, opening a new one if under
+        the per-host limit, otherwise wait for one to be released
+        :param host: The (scheme, netloc) pair of the host
+        :return: The connection, whether it was reused from the pool
+        """
+        start = time()
+        with self.condition:
+            self.stats['requests'] += 1
+            while True:
+                idle = self.idle.get(host)
+                if idle:
+                    self.stats['hits'] += 1
+                    self.stats['wait_time'] += time() - start
+                    return idle.pop(), True
+                if self.open.get(host, 0) < self.max_per_host:
+                    self.open[host] = self.open.get(host, 0) + 1
+                    self.stats['new_connections'] += 1
+                    self.stats['wait_time'] += time() - start
+                    break
+                self.condition.wait()
+
+        scheme, netloc = host
+        connection_class = HTTPSConnection if scheme == 'https' else HTTPConnection
+        return connection_class(netloc, timeout=self.timeout), False
+
+    def release(self, host, connection):
+        """
+        Return a connection to the pool so it can be reused
+        :param host: The (scheme, netloc) pair of the host
+        :param connection: The connection to be returned
+        :return: None
+        """
+        with self.condition:
+            self.idle.setdefault(host, []).append(connection)
+            self.condition.notify()
+
+    def discard(self, host, connection):
+        """
+        Close a connection and free its slot in the per-host limit
+        :param host: The (scheme, netloc) pair of the host
+        :param connection: The connection to be closed
+        :return: None
+        """
+        connection.close()
+        with self.condition:
+            self.open[host] -= 1
+            self.condition.notify()
+
+    def close(self):
+        """
+        Close every idle connection in the pool
+        :return: None
+        """
+        with self.condition:
+            for host, connections in self.idle.items():
+                for connection in connections:
+                    connection.close()
+                self.open[host] -= len(connections)
+            self.idle = {}
+            self.condition.notify_all()
+
+    def get_stats(self):
+        """
+        Retrieve the pool statistics
+        :return: The number of requests, pool hits, new connections and total wait time
+        """
+        with self.condition:
+            return dict(self.stats)
@@ -0,0 +1,209 @@
+from html.parser import HTMLParser
+import re
+
+"""
+Program: infobox.py
+
+Single pass extraction of the Wikipedia page fields the scraper needs.
+Instead of building a BeautifulSoup tree and searching it once per field,
+the page is streamed through the standard library's HTML tokenizer and
+every field is picked up on the way through.
+"""
+
+WIKI_URL = 'https://en.wikipedia.org'
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+             'link', 'meta', 'param', 'source', 'track', 'wbr'}
+INFOBOX_LABELS = {'Box office', 'Release date', 'Starring'}
+
+
+class Capture:
+    def __init__(self, name, depth):
+        """
+        Initialize a capture of the text inside an element
+        :param name: The field the text belongs to
+        :param depth: The depth of the captured element in the tag stack
+        """
+        self.name = name
+        self.depth = depth
+        self.text = []
+
+
+class InfoboxParser(HTMLParser):
+    def __init__(self):
+        """
+        Initialize the InfoboxParser object
+        """
+        super().__init__()
+        self.stack = []
+        self.captures = []
+        self.fields = {
+            'title': None,
+            'age': None,
+            'box_office': None,
+            'release_date': None,
+            'starring': [],
+            'filmography_div': [],
+            'filmography_table': [],
+        }
+        # Label of the last closed infobox header, waiting for its sibling cell
+        self.label = None
+        self.label_depth = None
+        self.cell = None
+        self.seen_labels = set()
+        self.release_ul = None
+        self.release_done = False
+        self.div_depth = None
+        self.film_heading = False
+        self.table_depth = None
+        self.table_cell = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        depth = len(self.stack)
+        classes = attrs.get('class') or ''
+
+        # The cell right after a labelled header holds the label's value
+        if self.label is not None and depth == self.label_depth:
+            if tag == 'td':
+                self.cell = (self.label, depth)
+                if self.label == 'Box office':
+                    self.captures.append(Capture('box_office', depth))
+            self.label = None
+
+        if tag == 'h1' and self.fields['title'] is None and 'firstHeading' in classes.split():
+            self.captures.append(Capture('title', depth))
+        elif tag == 'span' and self.fields['age'] is None and classes == 'noprint ForceAgeToShow':
+            self.captures.append(Capture('age', depth))
+        elif tag == 'span' and attrs.get('id') == 'Film' and 'mw-headline' in classes.split():
+            self.film_heading = True
+        elif tag == 'th':
+            self.captures.append(Capture('th', depth))
+        elif tag == 'div' and self.div_depth is None and classes == 'div-col columns column-width':
+            self.div_depth = depth
+        elif tag == 'table' and self.film_heading:
+            # Only the first table after the filmography heading is considered
+            self.film_heading = False
+            if classes.split()[:1] == ['wikitable']:
+                self.table_depth = depth
+        elif tag == 'ul' and self.cell is not None and self.cell[0] == 'Release date' \
+                and self.release_ul is None and not self.release_done:
+            # Only the first list of the first release date cell is read
+            self.release_ul = depth
+        elif tag == 'li' and self.release_ul == depth - 1 and self.fields['release_date'] is None:
+            self.captures.append(Capture('release_date', depth))
+        elif tag == 'td' and self.table_depth is not None:
+            self.table_cell = False
+        elif tag == 'a' and 'href' in attrs:
+            self.handle_link(attrs['href'])
+
+        if tag not in VOID_TAGS:
+            self.stack.append(tag)
+
+    def handle_link(self, href):
+        """
+        Collect a link if it is part of the cast or the filmography
+        :param href: The link target
+        :return: None
+        """
+        url = WIKI_URL + href
+        if self.cell is not None and self.cell[0] == 'Starring':
+            self.fields['starring'].append(url)
+        if self.div_depth is not None:
+            self.fields['filmography_div'].append(url)
+        if self.table_cell is False:
+            # Only the first link of each table cell names a film
+            self.table_cell = True
+            self.fields['filmography_table'].append(url)
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS or tag not in self.stack:
+            return
+
+        # Close every element left open inside the one being closed
+        while self.stack:
+            closed = self.stack.pop()
+            self.close_element(closed, len(self.stack))
+            if closed == tag:
+                break
+
+    def close_element(self, tag, depth):
+        """
+        Finish any state tied to the element being closed
+        :param tag: The tag of the element
+        :param depth: The depth of the element in the tag stack
+        :return: None
+        """
+        while self.captures and self.captures[-1].depth >= depth:
+            self.finish(self.captures.pop())
+
+        if self.label is not None and depth < self.label_depth:
+            self.label = None
+        if self.cell is not None and depth <= self.cell[1]:
+            self.cell = None
+        if self.release_ul is not None and depth <= self.release_ul:
+            self.release_ul = None
+            self.release_done = True
+        if self.div_depth is not None and depth <= self.div_depth:
+            self.div_depth = None
+        if self.table_depth is not None and depth <= self.table_depth:
+            self.table_depth = None
+        if tag == 'td':
+            self.table_cell = None
+
+    def finish(self, capture):
+        """
+        Store the text of a completed capture
+        :param capture: The completed capture
+        :return: None
+        """
+        text = ''.join(capture.text)
+        if capture.name == 'th':
+            label = text
+            # Only the first header with a given label is used, like a tree search would
+            if label in INFOBOX_LABELS and (label == 'Starring' or label not in self.seen_labels):
+                self.seen_labels.add(label)
+                self.label = label
+                self.label_depth = capture.depth
+        elif self.fields[capture.name] is None:
+            self.fields[capture.name] = text
+
+    def handle_data(self, data):
+        for capture in self.captures:
+            capture.text.append(data)
+
+    def close_document(self):
+        """
+        Flush the tokenizer and finish any element left open by malformed html
+        :return: The extracted fields
+        """
+        self.close()
+        while self.stack:
+            self.close_element(self.stack.pop(), len(self.stack))
+        return self.fields
+
+
+def extract_fields(raw_page):
+    """
+    Extract the title, age, box office, release date, cast links and
+    filmography links from a Wikipedia page in one pass
+    :param raw_page: The raw bytes or text of the Wikipedia page
+    :return: Dictionary of the raw field values found in the page
+    """
+    if isinstance(raw_page, bytes):
+        raw_page = raw_page.decode('utf-8', errors='replace')
+
+    parser = InfoboxParser()
+    parser.feed(raw_page)
+    return parser.close_document()
+
+
+def get_year(release_date):
+    """
+    Obtain the year from the release date text
+    :param release_date: The text of the first release date entry
+    :return: The first four digit number found, if any
+    """
+    if release_date is None:
+        return None
+    text = re.findall('[0-9]{4}', release_date)
+    return int(text[0]) if text else None
@@ -0,0 +1,225 @@
+from collections import OrderedDict
+from collections.abc import Mapping
+from array import array
+import numpy as np
+
+from snapshot import Snapshot, INT, FLOAT
+from vertex import Vertex
+
+"""
+Program: lazy_graph.py
+
+Read-only graph over a binary snapshot which decodes vertices only when
+they are looked up or iterated over. Materialized vertices are kept in a
+least recently used cache, so point lookups against a large crawl only pay
+for the vertices they touch. The vertices are read-only too, since a change
+to a cached vertex would be lost once it is evicted.
+"""
+
+CACHE_SIZE = 4096
+FIELDS = {'value1': 0, 'value2': 1}
+
+
+class SnapshotKeys:
+    """
+    Key table of a snapshot, used by lazily built vertices to name their neighbors
+    """
+    __slots__ = ('snapshot',)
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def intern(self, key):
+        key_id = self.snapshot.find(key)
+        if key_id is None:
+            raise KeyError(f'{key} is not in the snapshot, which is read-only')
+        return key_id
+
+    def get_id(self, key):
+        return self.snapshot.find(key)
+
+    def get_key(self, key_id):
+        return self.snapshot.get_key(key_id)
+
+    def __len__(self):
+        return self.snapshot.key_count
+
+
+class SnapshotVertex(Vertex):
+    """
+    Vertex decoded from a snapshot, whose setters raise instead of changing a cached copy
+    """
+    __slots__ = ()
+
+    def read_only(self, *args):
+        raise TypeError(f'{self.key} was decoded from a snapshot, which is read-only')
+
+    set_key = set_value1 = set_value2 = read_only
+    add_neighbor = add_neighbor_id = append_neighbor_id = read_only
+    remove_neighbor = remove_neighbor_ids = read_only
+
+
+class LazyVertexMap(Mapping):
+    """
+    Read-only dictionary view of a lazy graph's vertices keyed by vertex key
+    """
+    __slots__ = ('graph',)
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, key):
+        vertex = self.graph.get_vertex(key)
+        if vertex is None:
+            raise KeyError(key)
+        return vertex
+
+    def __contains__(self, key):
+        return self.graph.get_id(key) is not None
+
+    def __iter__(self):
+        snapshot = self.graph.snapshot
+        return (snapshot.get_key(i) for i in self.graph.positions())
+
+    def __len__(self):
+        return self.graph.count
+
+
+class LazyGraph:
+    def __init__(self, filename, cache_size=CACHE_SIZE):
+        """
+        Open a snapshot without decoding any vertex
+        :param filename: The snapshot file
+        :param cache_size: The number of materialized vertices kept
+        """
+        self.snapshot = Snapshot(filename)
+        self.table = SnapshotKeys(self.snapshot)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.count = self.snapshot.vertex_count
+        # A snapshot never changes, so neither does the version caches are keyed on
+        self.version = 0
+
+    def get_id(self, key):
+        key_id = self.snapshot.find(key)
+        if key_id is None or not self.snapshot.has_vertex(key_id):
+            return None
+        return key_id
+
+    def get_vertex(self, key, group=None):
+        """
+        Retrieve a vertex by key, decoding it from the snapshot if it is not cached
+        :param key: The key of the vertex
+        :param group: The group the vertex must belong to, any group if None
+        :return: The vertex, None if there is no such vertex in the group
+        """
+        key_id = self.get_id(key)
+        if key_id is None:
+            return None
+        vertex = self.get_vertex_by_id(key_id)
+        if group is not None and vertex.get_group() != group:
+            return None
+        return vertex
+
+    def get_vertex_by_id(self, key_id):
+        vertex = self.cache.get(key_id)
+        if vertex is not None:
+            self.cache.move_to_end(key_id)
+            return vertex
+        if not self.snapshot.has_vertex(key_id):
+            return None
+
+        vertex = self.materialize(key_id)
+        self.cache[key_id] = vertex
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return vertex
+
+    def materialize(self, key_id):
+        """
+        Decode a vertex and its adjacency from the snapshot
+        :param key_id: The position of the vertex in the snapshot
+        :return: The read-only vertex
+        """
+        snapshot = self.snapshot
+        vertex = SnapshotVertex(snapshot.get_group(key_id), snapshot.get_key(key_id),
+                                snapshot.get_value(key_id, 0), snapshot.get_value(key_id, 1), self.table)
+        start, end = int(snapshot.offsets[key_id]), int(snapshot.offsets[key_id + 1])
+        neighbor_ids = array('i', snapshot.neighbors[start:end].astype(np.intc).tobytes())
+        if snapshot.weights.dtype.kind == 'i':
+            weights = array('q', snapshot.weights[start:end].astype(np.int64).tobytes())
+        else:
+            weights = array('d', snapshot.weights[start:end].astype(np.float64).tobytes())
+        vertex.set_edges(neighbor_ids, weights)
+        return vertex
+
+    def positions(self, group=None):
+        """
+        Find the snapshot positions of the vertices, without decoding them
+        :param group: The group of vertices, any group if None
+        :return: Array of positions, in key id order
+        """
+        groups = self.snapshot.groups
+        if group is None:
+            return np.flatnonzero(groups != 0xFFFF)
+        if group not in self.snapshot.group_names:
+            return np.zeros(0, dtype=np.intp)
+        return np.flatnonzero(groups == self.snapshot.group_names.index(group))
+
+    def numeric(self, field):
+        """
+        Obtain a field of every vertex as floats, NaN where it is not a number
+        :param field: 'value1' or 'value2'
+        :return: Array of the values, by position
+        """
+        column = FIELDS[field]
+        kinds = self.snapshot.kinds[:, column]
+        slots = self.snapshot.values[:, column]
+        values = np.full(len(slots), np.nan)
+        values[kinds == INT] = slots[kinds == INT]
+        values[kinds == FLOAT] = slots.view('<f8')[kinds == FLOAT]
+        return values
+
+    def get_group_vertices(self, group):
+        return [self.get_vertex_by_id(int(i)) for i in self.positions(group)]
+
+    def find_vertices(self, group, field, value):
+        """
+        Retrieve the vertices of a group whose numeric field equals a value
+        :param group: The group of vertices
+        :param field: The field compared, 'value1' or 'value2'
+        :param value: The value the field should be equal to
+        :return: List of matching vertices, in key id order
+        """
+        positions = self.positions(group)
+        matches = positions[self.numeric(field)[positions] == value]
+        return [self.get_vertex_by_id(int(i)) for i in matches]
+
+    def get_largest(self, group, field, num):
+        """
+        Retrieve the vertices of a group with the largest numeric field
+        :param group: The group of vertices
+        :param field: The field compared, 'value1' or 'value2'
+        :param num: The number of vertices to return
+        :return: List of at most num vertices, in decreasing order of the field
+        """
+        positions = self.positions(group)
+        values = self.numeric(field)[positions]
+        positions = positions[~np.isnan(values)]
+        values = values[~np.isnan(values)]
+        order = np.argsort(-values, kind='stable')[:max(num, 0)]
+        return [self.get_vertex_by_id(int(i)) for i in positions[order]]
+
+    def get_vertices(self):
+        return self.vertices.keys()
+
+    @property
+    def vertices(self):
+        return LazyVertexMap(self)
+
+    def __iter__(self):
+        return (self.get_vertex_by_id(int(i)) for i in self.positions())
+
+    def close(self):
+        self.cache.clear()
+        self.snapshot.close()
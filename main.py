@@ -1,21 +1,52 @@
-from utils import load, save, parse, analyze_plot
+from utils import load, load_graph, save, parse, analyze_plot
 from query import Query
 from analyze import Analyze
-from scraper import Scraper
+from aggregates import Aggregates
+from scraper import Scraper, CONCURRENCY
+from page_cache import PageCache
+from checkpoint import Checkpoint
 from visualization import Visualization
+import argparse
 
 URL = "https://en.wikipedia.org/wiki/Morgan_Freeman"
 TYPE = "Actor"
 
 
-def main():
-    scraper = Scraper()
-    scraper.scrape(URL, TYPE)
+def main(concurrency=None, resume=False, processes=None):
+    checkpoint = Checkpoint()
+    scraper = Scraper(cache=PageCache(), checkpoint=checkpoint)
+    url, group = URL, TYPE
+    if resume and checkpoint.exists():
+        url, group = scraper.resume()
+        if url is None:
+            # scrape would wait forever for a url from the empty queues
+            print('The crawl frontier is exhausted, nothing left to scrape')
+            return
+    else:
+        checkpoint.clear()
+
+    if concurrency is None:
+        scraper.scrape(url, group)
+    else:
+        scraper.scrape_concurrent(url, group, concurrency, processes)
+    save("scraper_data.json", scraper.get_graph())
+
+
+def refresh(concurrency=None):
+    checkpoint = Checkpoint()
+    if not checkpoint.exists():
+        print('No crawl checkpoint to refresh, run a scrape first')
+        return
+
+    scraper = Scraper(cache=PageCache(), checkpoint=checkpoint)
+    url, group = scraper.resume()
+    scraper.refresh(concurrency or CONCURRENCY)
+    scraper.save_checkpoint([url], group, force=True)
     save("scraper_data.json", scraper.get_graph())
 
 
 def load_query():
-    graph = load('scraper_data.json')
+    graph = load_graph('scraper_data.json', load, lazy=True)
     query = Query(graph)
     query_year = 2008
     query_gross_movie = "The Dark Knight (film)"
@@ -32,17 +63,43 @@ def load_query():
 
 
 def part2():
-    graph = parse('data.json')
-    analyzer = Analyze(graph)
+    graph = load_graph('data.json', parse)
+    analyzer = Analyze(graph, Aggregates(graph))
     actor_connections, num = analyzer.get_hub_actors()
     age_gross, num = analyzer.get_gross_age()
     analyze_plot(actor_connections, num, xlabel='Actors',
                  ylabel='Num of Connections', title='Connections per Actor')
     analyze_plot(age_gross, num, xlabel='Age',
                  ylabel='Total Gross', title='Total Gross per Age')
-    parse_graph = load('scraper_data.json')
+    parse_graph = load_graph('scraper_data.json', load)
     visual = Visualization(parse_graph, switch=True)
     visual.visualize('visual.html')
 
 
-part2()
+def parse_args():
+    parser = argparse.ArgumentParser(description='Scrape, query and analyze Wikipedia movie and actor data')
+    subparsers = parser.add_subparsers(dest='command')
+    scrape_parser = subparsers.add_parser('scrape', help='crawl Wikipedia into scraper_data.json')
+    scrape_parser.add_argument('--concurrency', type=int, default=None,
+                               help='number of pages fetched at once, crawl serially if not given')
+    scrape_parser.add_argument('--processes', type=int, default=None,
+                               help='number of processes parsing pages during a concurrent crawl')
+    scrape_parser.add_argument('--resume', action='store_true',
+                               help='continue the crawl from the last checkpoint')
+    refresh_parser = subparsers.add_parser('refresh', help='re-fetch changed pages of the last crawl')
+    refresh_parser.add_argument('--concurrency', type=int, default=None,
+                                help='number of pages revalidated at once')
+    subparsers.add_parser('query', help='run the sample queries against scraper_data.json')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.command == 'scrape':
+        main(args.concurrency, args.resume, args.processes)
+    elif args.command == 'refresh':
+        refresh(args.concurrency)
+    elif args.command == 'query':
+        load_query()
+    else:
+        part2()
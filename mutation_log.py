@@ -0,0 +1,191 @@
+from threading import Condition
+import logging.config
+import json
+import yaml
+import os
+
+"""
+Program: mutation_log.py
+
+Write-ahead log of the API's changes to the graph. Each request appends its
+mutations as one JSON line, and requests waiting for their line to be
+durable share a single fsync (group commit). Every so often the graph is
+compacted into snapshot.json, in the format of data.json, and the log is
+emptied; on startup the snapshot is loaded and the log replayed over it.
+"""
+
+LOG_DIR = 'mutation_log'
+COMPACT_EVERY = 1000
+
+with open('config.yaml', 'r') as f:
+    config = yaml.safe_load(f.read())
+    logging.config.dictConfig(config)
+
+logger = logging.getLogger(__name__)
+
+
+class MutationLog:
+    def __init__(self, directory=LOG_DIR, compact_every=COMPACT_EVERY):
+        """
+        Initialize the MutationLog object
+        :param directory: The directory holding the snapshot and the log
+        :param compact_every: The number of logged lines after which the graph is compacted
+        """
+        self.directory = directory
+        self.compact_every = compact_every
+        self.log_path = os.path.join(directory, 'mutations.jsonl')
+        self.snapshot_path = os.path.join(directory, 'snapshot.json')
+        os.makedirs(directory, exist_ok=True)
+        self.log_file = open(self.log_path, 'a')
+        self.condition = Condition()
+        self.written = 0
+        self.synced = 0
+        self.syncing = False
+        self.lines = 0
+
+    def load(self, filename):
+        """
+        Load the graph from the latest snapshot, or the given data file if
+        there is none yet, and replay the logged mutations over it
+        :param filename: The data file to start from without a snapshot
+        :return: The graph
+        """
+        from utils import parse
+        graph = parse(self.snapshot_path if os.path.exists(self.snapshot_path) else filename)
+
+        # Offset just past the last complete line
+        end = 0
+        with open(self.log_path, 'rb') as log_file:
+            for line in log_file:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('missing newline')
+                    mutations = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash was never acknowledged
+                    logger.warning('Ignoring incomplete mutation log line')
+                    break
+                with graph.transaction():
+                    for mutation in mutations:
+                        apply_mutation(graph, mutation)
+                self.lines += 1
+                end += len(line)
+
+        if end < os.path.getsize(self.log_path):
+            # Cut the torn line off, or the next append would be glued onto it and lost
+            with self.condition:
+                self.log_file.truncate(end)
+                os.fsync(self.log_file.fileno())
+
+        logger.info(f'Replayed {self.lines} mutation log lines')
+        return graph
+
+    def append(self, mutations):
+        """
+        Append the mutations of one request to the log, without waiting for them to be durable
+        :param mutations: List of mutation records
+        :return: The sequence number to pass to sync
+        """
+        with self.condition:
+            print(json.dumps(mutations), file=self.log_file)
+            self.written += 1
+            self.lines += 1
+            return self.written
+
+    def sync(self, sequence):
+        """
+        Block until the log is durable up to the given sequence number. The
+        first caller to arrive syncs the file for everything written so far,
+        while callers arriving meanwhile wait for it and usually find their
+        lines already synced
+        :param sequence: The sequence number returned by append
+        :return: None
+        """
+        with self.condition:
+            while self.synced < sequence:
+                if self.syncing:
+                    self.condition.wait()
+                    continue
+                self.syncing = True
+                target = self.written
+                self.log_file.flush()
+                self.condition.release()
+                try:
+                    os.fsync(self.log_file.fileno())
+                finally:
+                    self.condition.acquire()
+                    self.syncing = False
+                self.synced = max(self.synced, target)
+                self.condition.notify_all()
+
+    def should_compact(self):
+        return self.lines >= self.compact_every
+
+    def compact(self, graph):
+        """
+        Atomically write the graph to the snapshot and empty the log. The
+        caller must keep the graph from changing meanwhile
+        :param graph: The graph the log has been applied to
+        :return: None
+        """
+        with open(self.snapshot_path + '.tmp', 'w') as snapshot_file:
+            json.dump(graph_data(graph), snapshot_file)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(self.snapshot_path + '.tmp', self.snapshot_path)
+
+        with self.condition:
+            while self.syncing:
+                self.condition.wait()
+            self.log_file.close()
+            self.log_file = open(self.log_path, 'w')
+            self.synced = self.written
+            self.lines = 0
+        logger.info('Compacted the mutation log into a snapshot')
+
+    def close(self):
+        with self.condition:
+            self.log_file.flush()
+            os.fsync(self.log_file.fileno())
+            self.log_file.close()
+
+
+def apply_mutation(graph, mutation):
+    """
+    Apply a logged mutation to the graph
+    :param graph: The graph being restored
+    :param mutation: The mutation record
+    :return: None
+    """
+    op = mutation['op']
+    if op == 'create':
+        graph.add_vertex(mutation['group'], mutation['name'], mutation['value1'], mutation['value2'])
+    elif op == 'update':
+        vertex = graph.get_vertex(mutation['name'], mutation['group'])
+        if vertex is not None:
+            vertex.set_value1(mutation['value1'])
+            vertex.set_value2(mutation['value2'])
+    elif op == 'delete':
+        graph.delete_vertices([name for name in mutation['names'] if graph.get_vertex(name) is not None])
+
+
+def graph_data(graph):
+    """
+    Convert the graph to the actor and movie dictionaries of data.json, with
+    the movies' edge weights added
+    :param graph: The graph to convert
+    :return: List of the actor and movie dictionaries
+    """
+    actors = {}
+    movies = {}
+    for vertex in graph.get_group_vertices('Actor'):
+        actors[vertex.get_key()] = {'json_class': 'Actor', 'name': vertex.get_key(),
+                                    'age': vertex.get_value1(), 'total_gross': vertex.get_value2(),
+                                    'movies': list(vertex.get_neighbors())}
+    for vertex in graph.get_group_vertices('Movie'):
+        # The weights are kept as they are, parse would otherwise derive them from the current values
+        movies[vertex.get_key()] = {'json_class': 'Movie', 'name': vertex.get_key(), 'wiki_page': '',
+                                    'box_office': vertex.get_value2(), 'year': vertex.get_value1(),
+                                    'actors': list(vertex.get_neighbors()),
+                                    'weights': dict(vertex.get_neighbors().items())}
+    return [actors, movies]
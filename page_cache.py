@@ -0,0 +1,260 @@
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote, unquote
+from hashlib import sha256
+from threading import Lock
+from time import time
+import logging.config
+import sqlite3
+import zlib
+import yaml
+import os
+
+"""
+Program: page_cache.py
+
+On-disk cache of downloaded Wikipedia pages. Bodies are stored zlib
+compressed under the digest of their content, so pages reached through
+several urls (e.g. redirects) are only stored once, and an index maps
+each normalized url to its body and fetch time.
+"""
+
+CACHE_DIR = 'page_cache'
+TTL = 7 * 24 * 60 * 60
+MAX_BYTES = 512 * 1024 * 1024
+SCHEMA_VERSION = 2
+
+with open('config.yaml', 'r') as f:
+    config = yaml.safe_load(f.read())
+    logging.config.dictConfig(config)
+
+logger = logging.getLogger(__name__)
+
+
+class PageCache:
+    def __init__(self, directory=CACHE_DIR, ttl=TTL, max_bytes=MAX_BYTES):
+        """
+        Initialize the PageCache object, creating the cache directory if needed
+        :param directory: The directory holding the index and the page bodies
+        :param ttl: The number of seconds a cached page stays fresh, None to never expire
+        :param max_bytes: The maximum compressed size of all stored bodies
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        self.create_schema()
+
+    def create_schema(self):
+        """
+        Create the index tables, discarding an index written by an older schema
+        :return: None
+        """
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            logger.info(f'Resetting page cache index from schema {version} to {SCHEMA_VERSION}')
+            self.db.execute('DROP TABLE IF EXISTS pages')
+            self.db.execute('DROP TABLE IF EXISTS blobs')
+        self.db.execute('CREATE TABLE IF NOT EXISTS pages ('
+                        'url_key TEXT PRIMARY KEY, url TEXT, digest TEXT, '
+                        'fetched REAL, accessed REAL, etag TEXT, last_modified TEXT)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, size INTEGER)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed)')
+        self.db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self.db.commit()
+
+    def get(self, url):
+        """
+        Retrieve a fresh cached page
+        :param url: The url of the page
+        :return: The raw bytes of the page, None if not cached or expired
+        """
+        key = normalize_url(url)
+        with self.lock:
+            row = self.db.execute('SELECT digest, fetched FROM pages WHERE url_key = ?',
+                                  (key,)).fetchone()
+            if row is None or not self.is_fresh(row[1]):
+                self.stats['misses'] += 1
+                return None
+
+            body = self.read_blob(row[0])
+            if body is None:
+                self.db.execute('DELETE FROM pages WHERE url_key = ?', (key,))
+                self.db.commit()
+                self.stats['misses'] += 1
+                return None
+
+            self.db.execute('UPDATE pages SET accessed = ? WHERE url_key = ?', (time(), key))
+            self.db.commit()
+            self.stats['hits'] += 1
+            return body
+
+    def put(self, url, body, etag=None, last_modified=None):
+        """
+        Store a downloaded page, evicting the least recently used pages if
+        the cache grows past its size limit
+        :param url: The url of the page
+        :param body: The raw bytes of the page
+        :param etag: The ETag header the page was served with, if any
+        :param last_modified: The Last-Modified header the page was served with, if any
+        :return: None
+        """
+        key = normalize_url(url)
+        digest = sha256(body).hexdigest()
+        now = time()
+        with self.lock:
+            if self.db.execute('SELECT 1 FROM blobs WHERE digest = ?', (digest,)).fetchone() is None:
+                size = self.write_blob(digest, body)
+                self.db.execute('INSERT INTO blobs VALUES (?, ?)', (digest, size))
+            self.db.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (key, url, digest, now, now, etag, last_modified))
+            self.evict()
+            self.db.commit()
+
+    def get_validators(self, url):
+        """
+        Retrieve the validators of a cached page, even if the page has expired
+        :param url: The url of the page
+        :return: The ETag and Last-Modified values of the page, None for each if unknown
+        """
+        with self.lock:
+            row = self.db.execute('SELECT etag, last_modified FROM pages WHERE url_key = ?',
+                                  (normalize_url(url),)).fetchone()
+        return row if row is not None else (None, None)
+
+    def touch(self, url):
+        """
+        Mark a cached page as fetched now, after the server confirmed it is unchanged
+        :param url: The url of the page
+        :return: None
+        """
+        now = time()
+        with self.lock:
+            self.db.execute('UPDATE pages SET fetched = ?, accessed = ? WHERE url_key = ?',
+                            (now, now, normalize_url(url)))
+            self.db.commit()
+
+    def is_fresh(self, fetched):
+        """
+        Determine if a page fetched at the given time is still fresh
+        :param fetched: The time the page was fetched
+        :return: If the page has not outlived the cache's time to live
+        """
+        return self.ttl is None or time() - fetched < self.ttl
+
+    def evict(self):
+        """
+        Drop the least recently used pages until the stored bodies fit in max_bytes
+        :return: None
+        """
+        total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Count the urls referring to each body, a body is only freed with its last url
+        sizes = dict(self.db.execute('SELECT digest, size FROM blobs').fetchall())
+        rows = self.db.execute('SELECT url_key, digest FROM pages ORDER BY accessed').fetchall()
+        references = {}
+        for key, digest in rows:
+            references[digest] = references.get(digest, 0) + 1
+
+        evicted = []
+        for key, digest in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            references[digest] -= 1
+            if not references[digest]:
+                total -= sizes.get(digest, 0)
+
+        self.db.executemany('DELETE FROM pages WHERE url_key = ?', evicted)
+        self.stats['evictions'] += len(evicted)
+        self.drop_orphan_blobs()
+
+    def drop_orphan_blobs(self):
+        """
+        Delete stored bodies which no url refers to anymore
+        :return: The number of bytes freed
+        """
+        orphans = self.db.execute('SELECT digest, size FROM blobs WHERE digest NOT IN '
+                                  '(SELECT digest FROM pages)').fetchall()
+        freed = 0
+        for digest, size in orphans:
+            self.db.execute('DELETE FROM blobs WHERE digest = ?', (digest,))
+            try:
+                os.remove(self.blob_path(digest))
+            except FileNotFoundError:
+                pass
+            freed += size
+        return freed
+
+    def blob_path(self, digest):
+        """
+        Obtain the file path of a stored body
+        :param digest: The content digest of the body
+        :return: The path of the compressed body
+        """
+        return os.path.join(self.directory, digest[:2], digest + '.z')
+
+    def write_blob(self, digest, body):
+        """
+        Compress and atomically write a body to disk
+        :param digest: The content digest of the body
+        :param body: The raw bytes of the body
+        :return: The compressed size of the body
+        """
+        path = self.blob_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = zlib.compress(body)
+        with open(path + '.tmp', 'wb') as blob_file:
+            blob_file.write(data)
+        os.replace(path + '.tmp', path)
+        return len(data)
+
+    def read_blob(self, digest):
+        """
+        Read and decompress a body from disk
+        :param digest: The content digest of the body
+        :return: The raw bytes of the body, None if missing or corrupt
+        """
+        try:
+            with open(self.blob_path(digest), 'rb') as blob_file:
+                return zlib.decompress(blob_file.read())
+        except (OSError, zlib.error) as e:
+            logger.warning(f'Unreadable cached page {digest}: {e}')
+            return None
+
+    def get_stats(self):
+        """
+        Retrieve the cache statistics
+        :return: The number of cache hits, misses and evictions
+        """
+        with self.lock:
+            return dict(self.stats)
+
+    def close(self):
+        """
+        Close the cache index
+        :return: None
+        """
+        with self.lock:
+            self.db.close()
+
+
+def normalize_url(url):
+    """
+    Normalize a url so equivalent spellings share one cache entry
+    :param url: The url to be normalized
+    :return: The url with a lowercase scheme and host, no default port,
+    a canonically quoted path, sorted query parameters and no fragment
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme, netloc.rsplit(':', 1)[-1]) in (('http', '80'), ('https', '443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    path = quote(unquote(parts.path or '/'), safe="/:@!$&'()*+,;=-._~")
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, path, query, ''))
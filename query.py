@@ -1,7 +1,8 @@
 import logging.config
-import operator
 import yaml
 
+from topk import TopKCache, top_k
+
 with open('config.yaml', 'r') as f:
     config = yaml.safe_load(f.read())
     logging.config.dictConfig(config)
@@ -10,8 +11,15 @@ logger = logging.getLogger(__name__)
 
 
 class Query:
-    def __init__(self, graph):
+    def __init__(self, graph, aggregates=None):
+        """
+        Initialize the Query object
+        :param graph: The graph to query
+        :param aggregates: Aggregates kept up to date over the graph, read instead of rescanning it if given
+        """
         self.graph = graph
+        self.aggregates = aggregates
+        self.top = TopKCache(graph)
 
     def get_gross(self, movie):
         """
@@ -66,21 +74,13 @@ class Query:
         :param num: The specified number of actors to return, default 10
         :return: List of the top num grossing actors
         """
-        actor_gross = {}
-
-        for vertex in self.graph:
-            if vertex.get_group() == "Actor":
-                actor = vertex.get_key()
-                movies = vertex.get_neighbors()
-                total_gross = 0
-                for movie in movies:
-                    total_gross += vertex.get_weight(movie)
-                actor_gross[actor] = total_gross
+        return self.top.get('top_actors', num, self.find_top_actors)
 
-        sorted_actor_ages = sorted(actor_gross.items(), key=operator.itemgetter(1), reverse=True)
-        top_actors = [(actor, gross) for (actor, gross) in sorted_actor_ages[:num]]
-
-        return top_actors
+    def find_top_actors(self, num):
+        if self.aggregates is not None:
+            return top_k(self.aggregates.get_total_gross().items(), num)
+        return top_k(((vertex.get_key(), sum(vertex.weights))
+                      for vertex in self.graph.get_group_vertices("Actor")), num)
 
     def get_oldest_actors(self, num=10):
         """
@@ -88,18 +88,12 @@ class Query:
         :param num: The specified number of actors to return, default 10
         :return: List of the top num oldest actors
         """
-        actor_ages = {}
-
-        for vertex in self.graph:
-            if vertex.get_group() == "Actor":
-                actor = vertex.get_key()
-                age = vertex.get_value1()
-                actor_ages[actor] = age
+        return self.top.get('oldest_actors', num, self.find_oldest_actors)
 
-        sorted_actor_ages = sorted(actor_ages.items(), key=operator.itemgetter(1), reverse=True)
-        oldest_actors = [(actor,age) for (actor,age) in sorted_actor_ages[:num]]
-
-        return oldest_actors
+    def find_oldest_actors(self, num):
+        # The value index keeps the actors in age order, no heap needed
+        return [(vertex.get_key(), vertex.get_value1())
+                for vertex in self.graph.get_largest("Actor", "value1", num)]
 
     def get_movies_year(self, year):
         """
@@ -107,12 +101,7 @@ class Query:
         :param year: The year the movie should have played
         :return: List of movies who meet the criteria
         """
-        movies = []
-        for vertex in self.graph:
-            if vertex.get_group() == "Movie":
-                movie_year = vertex.get_value2()
-                if movie_year == year:
-                    movies.append(vertex.get_key())
+        movies = [vertex.get_key() for vertex in self.graph.find_vertices("Movie", "value2", year)]
 
         return movies
 
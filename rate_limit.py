@@ -0,0 +1,156 @@
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from threading import Lock
+from time import monotonic, sleep, time
+import logging.config
+import yaml
+
+"""
+Program: rate_limit.py
+
+Per host token bucket rate limiting for the scraper. Each host gets a
+bucket refilled at a steady rate; when a host answers 429 or 5xx its rate
+is halved and any Retry-After delay is honoured, and each successful
+request then slowly raises the rate back up.
+"""
+
+RATE = 5.0
+BURST = 10
+MIN_RATE = 0.2
+RECOVERY = 0.1
+BACKOFF = 5.0
+
+with open('config.yaml', 'r') as f:
+    config = yaml.safe_load(f.read())
+    logging.config.dictConfig(config)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, rate, burst, now):
+        """
+        Initialize a full TokenBucket
+        :param rate: The number of tokens added per second
+        :param burst: The maximum number of tokens the bucket holds
+        :param now: The current time
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+        self.blocked_until = now
+
+    def reserve(self, now):
+        """
+        Take a token, going into debt if the bucket is empty
+        :param now: The current time
+        :return: The number of seconds to wait before the token may be used
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+
+class RateLimiter:
+    def __init__(self, rate=RATE, burst=BURST, min_rate=MIN_RATE, recovery=RECOVERY,
+                 clock=monotonic, wait=sleep):
+        """
+        Initialize the RateLimiter object
+        :param rate: The steady number of requests per second allowed per host
+        :param burst: The number of requests a host may receive at once
+        :param min_rate: The lowest rate a host is slowed down to
+        :param recovery: The rate regained per successful request after a slow-down
+        :param clock: Function returning the current time in seconds
+        :param wait: Function sleeping for a number of seconds
+        """
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.recovery = recovery
+        self.clock = clock
+        self.wait = wait
+        self.buckets = {}
+        self.lock = Lock()
+
+    def get_bucket(self, url):
+        """
+        Obtain the bucket of the url's host, creating it if needed
+        :param url: The url being requested
+        :return: The host's TokenBucket
+        """
+        host = urlsplit(url).netloc.lower()
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.burst, self.clock())
+        return self.buckets[host]
+
+    def acquire(self, url):
+        """
+        Block until a request to the url's host is allowed
+        :param url: The url about to be requested
+        :return: The number of seconds waited
+        """
+        with self.lock:
+            delay = self.get_bucket(url).reserve(self.clock())
+
+        if delay > 0:
+            logger.debug(f'Rate limited for {delay:.2f}s, url:{url}')
+            self.wait(delay)
+        return delay
+
+    def throttle(self, url, retry_after=None):
+        """
+        Slow down requests to a host which answered 429 or 5xx
+        :param url: The url which was refused
+        :param retry_after: The Retry-After header of the response, if any
+        :return: None
+        """
+        delay = parse_retry_after(retry_after)
+        with self.lock:
+            bucket = self.get_bucket(url)
+            bucket.rate = max(self.min_rate, bucket.rate / 2)
+            if delay is None:
+                delay = BACKOFF
+            bucket.blocked_until = max(bucket.blocked_until, self.clock() + delay)
+            logger.warning(f'Throttling {urlsplit(url).netloc} to {bucket.rate:.2f} requests/sec '
+                           f'for {delay:.1f}s')
+
+    def success(self, url):
+        """
+        Speed a host slowed down by throttle back up towards the steady rate
+        :param url: The url which was answered
+        :return: None
+        """
+        with self.lock:
+            bucket = self.get_bucket(url)
+            bucket.rate = min(self.rate, bucket.rate + self.recovery)
+
+    def get_rate(self, url):
+        """
+        Retrieve the current rate of the url's host
+        :param url: The url of the host
+        :return: The number of requests per second currently allowed
+        """
+        with self.lock:
+            return self.get_bucket(url).rate
+
+
+def parse_retry_after(retry_after):
+    """
+    Parse a Retry-After header, given either in seconds or as an HTTP date
+    :param retry_after: The value of the header, if any
+    :return: The number of seconds to wait, None if absent or invalid
+    """
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time())
+    except (TypeError, ValueError):
+        return None
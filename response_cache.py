@@ -0,0 +1,118 @@
+from collections import OrderedDict
+from functools import wraps
+from hashlib import sha1
+from threading import Lock
+
+from flask import Response, request
+
+"""
+Program: response_cache.py
+
+Cache of serialized GET responses for the API. Responses are keyed on the
+route and its normalized query arguments and stored with a precomputed
+ETag, together with the graph version they were computed at; any change to
+the graph bumps its version, which invalidates every cached response.
+"""
+
+MAX_ENTRIES = 512
+
+
+class CachedResponse:
+    __slots__ = ('version', 'body', 'etag', 'mimetype', 'headers')
+
+    def __init__(self, version, body, etag, mimetype, headers):
+        self.version = version
+        self.body = body
+        self.etag = etag
+        self.mimetype = mimetype
+        self.headers = headers
+
+
+class ResponseCache:
+    def __init__(self, graph, max_entries=MAX_ENTRIES):
+        """
+        Initialize the ResponseCache object
+        :param graph: The graph the responses are computed from
+        :param max_entries: The number of responses kept, least recently used are dropped first
+        """
+        self.graph = graph
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def cached(self, view):
+        """
+        Decorate a GET view so its responses are served from the cache while the
+        graph is unchanged, answering 304 when the client already has them
+        :param view: The Flask view function
+        :return: The decorated view function
+        """
+        @wraps(view)
+        def cached_view(*args, **kwargs):
+            key = self.get_key()
+            entry = self.get(key)
+            if entry is None:
+                version = self.graph.version
+                response = view(*args, **kwargs)
+                if not isinstance(response, Response) or response.status_code != 200 or \
+                        response.is_streamed:
+                    return response
+                body = response.get_data()
+                entry = CachedResponse(version, body, sha1(body).hexdigest(), response.mimetype,
+                                       [(name, value) for name, value in response.headers
+                                        if name.startswith('X-')])
+                self.put(key, entry)
+
+            if request.if_none_match.contains(entry.etag):
+                response = Response(status=304)
+            else:
+                response = Response(entry.body, mimetype=entry.mimetype)
+            response.headers.extend(entry.headers)
+            response.set_etag(entry.etag)
+            return response
+
+        return cached_view
+
+    def get_key(self):
+        """
+        Obtain the cache key of the current request
+        :return: The path, the sorted query arguments and the requested mimetype
+        """
+        args = tuple(sorted(request.args.items(multi=True)))
+        return request.path, args, request.accept_mimetypes.best
+
+    def get(self, key):
+        """
+        Retrieve a cached response which is still current
+        :param key: The cache key of the request
+        :return: The CachedResponse, None if absent or computed from an older graph
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.version != self.graph.version:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self):
+        """
+        Retrieve the cache's statistics
+        :return: Dictionary of the number of entries, hits and misses
+        """
+        with self.lock:
+            return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+from functools import wraps
+from threading import Condition, Lock
+
+"""
+Program: rw_lock.py
+
+Reader-writer lock guarding the shared graph. Any number of readers may
+hold the lock together, while a writer holds it alone; once a writer is
+waiting, new readers wait behind it so a steady stream of reads cannot
+starve writes.
+"""
+
+
+class ReadWriteLock:
+    def __init__(self):
+        self.condition = Condition(Lock())
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+
+    def acquire_read(self):
+        with self.condition:
+            while self.writer or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+
+    def release_read(self):
+        with self.condition:
+            self.readers -= 1
+            if not self.readers:
+                self.condition.notify_all()
+
+    def acquire_write(self):
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writer or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writer = True
+
+    def release_write(self):
+        with self.condition:
+            self.writer = False
+            self.condition.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    def reading(self, func):
+        """
+        Decorate a function so it runs holding the lock for reading
+        :param func: The function only reading the shared state
+        :return: The decorated function
+        """
+        @wraps(func)
+        def locked(*args, **kwargs):
+            with self.read_locked():
+                return func(*args, **kwargs)
+        return locked
+
+    def writing(self, func):
+        """
+        Decorate a function so it runs holding the lock for writing
+        :param func: The function changing the shared state
+        :return: The decorated function
+        """
+        @wraps(func)
+        def locked(*args, **kwargs):
+            with self.write_locked():
+                return func(*args, **kwargs)
+        return locked
@@ -1,14 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from urllib.error import URLError, HTTPError
-from urllib.request import urlopen
-from bs4 import BeautifulSoup
+from http_pool import ConnectionPool
+from rate_limit import RateLimiter
+from infobox import extract_fields, get_year
 from word2number import w2n
 from decimal import Decimal
-from random import randint
-from time import sleep
 from graph import Graph
 from queue import Queue
 from time import time
 import logging.config
+import asyncio
 import yaml
 import re
 
@@ -25,6 +26,14 @@ graph structure for queries.
 WIKI_URL = 'https://en.wikipedia.org'
 MOVIE_THRESHOLD = 125
 ACTOR_THRESHOLD = 250
+CONCURRENCY = 8
+
+MAX_RETRIES = 3
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Shared keep-alive connections and per host rate limits, used by every Scraper in the process
+POOL = ConnectionPool()
+LIMITER = RateLimiter()
 ACTOR = "Actor"
 MOVIE = "Movie"
 
@@ -36,19 +45,25 @@ logger = logging.getLogger(__name__)
 
 
 class Scraper:
-    def __init__(self):
+    def __init__(self, cache=None, checkpoint=None):
         """
         Initialize the Scraper object
+        :param cache: The PageCache consulted before downloading a page, if any
+        :param checkpoint: The Checkpoint the crawl is periodically saved to, if any
         """
         self.num_requests = 0
         self.num_movies = 0
         self.num_actors = 0
         self.graph = Graph()
+        self.cache = cache
         self.start_time = time()
         self.movie_queue = Queue()
         self.actor_queue = Queue()
         self.movie_urls = {}
         self.actor_urls = {}
+        self.checkpoint = checkpoint
+        self.delta = []
+        self.pages_since_checkpoint = 0
 
     def scrape(self, url, group=None):
         """
@@ -71,6 +86,7 @@ class Scraper:
             # Stop scraping after we have retrieve enough movie and actor information
             if self.num_movies >= MOVIE_THRESHOLD and self.num_actors >= ACTOR_THRESHOLD:
                 logger.info(f'Scraped {self.num_movies} movie and {self.num_actors} actor pages')
+                self.save_checkpoint([url], group, force=True)
                 break
 
             # Slow web-scraper down
@@ -78,10 +94,10 @@ class Scraper:
 
             # Try to get the raw web-page from the url
             # if error raise then continue to next url
-            raw_page = open_url(url)
+            raw_page = open_url(url, self.cache)
             if raw_page is not None:
-                soup = BeautifulSoup(raw_page, 'html.parser')
-                group, url = self.scrape_handler(group, soup, url)
+                group, url = self.scrape_handler(group, raw_page, url)
+                self.save_checkpoint([url], group)
             else:
                 logger.warning(f'Url:{url} is invalid')
                 url, group = self.get_any_url(group)
@@ -90,20 +106,20 @@ class Scraper:
                     return
                 continue
 
-    def scrape_handler(self, group, soup, url):
+    def scrape_handler(self, group, raw_page, url):
         """
         Determine which url of type of group to scrape next
         :param group: The current type of group of the current url to be scraped
-        :param soup: The raw html representation of the Wikipedia page
+        :param raw_page: The raw bytes of the Wikipedia page
         :param url: The current url we are accessing
         :return: The next url of type of group to scrape next
         """
         if group is ACTOR:
-            self.scrape_actor(soup, url)
+            self.add_actor_record(extract_page(raw_page, ACTOR), url)
             url, group = (self.movie_queue.get(), MOVIE) if not self.movie_queue.empty() \
                 else (self.actor_queue.get(), ACTOR)
         else:
-            self.scrape_movie(soup, url)
+            self.add_movie_record(extract_page(raw_page, MOVIE), url)
             self.scrape_all_actors()
             url, group = (self.actor_queue.get(), ACTOR) if not self.actor_queue.empty() else \
                 (self.movie_queue.get(), MOVIE)
@@ -119,10 +135,295 @@ class Scraper:
 
             # Try to get the raw web-page from the url
             # if error raise then continue to next url
-            raw_page = open_url(url)
+            raw_page = open_url(url, self.cache)
             if raw_page is not None:
-                soup = BeautifulSoup(raw_page, 'html.parser')
-                self.scrape_actor(soup, url)
+                self.add_actor_record(extract_page(raw_page, ACTOR), url)
+            self.save_checkpoint([], None)
+
+    def scrape_concurrent(self, url, group=None, concurrency=CONCURRENCY, processes=None):
+        """
+        Scrape information from Wikipedia with up to concurrency page
+        downloads in flight, till a certain threshold has been met
+        :param url: The url to start scraping from
+        :param group: The type of the page the url is linking to
+        :param concurrency: The maximum number of pages fetched at once
+        :param processes: The number of processes parsing pages, parse on
+        the crawling thread if None
+        :return: None
+        """
+        asyncio.run(self.crawl(url, group, concurrency, processes))
+
+    async def crawl(self, url, group, concurrency, processes=None):
+        """
+        Crawl Wikipedia in batches, alternating between a batch of movie pages
+        and every actor page queued up by those movies
+        :param url: The url to start crawling from
+        :param group: The type of the page the url is linking to
+        :param concurrency: The maximum number of pages fetched at once
+        :param processes: The number of processes parsing pages, parse on
+        the crawling thread if None
+        :return: None
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        parser = ProcessPoolExecutor(max_workers=processes) if processes else None
+        urls = [url] if url is not None else []
+
+        try:
+            while urls and not self.thresholds_met():
+                logger.info(f'{self.num_actors} actors found, {self.num_movies} movies found')
+                await self.crawl_batch(urls, group, semaphore, executor, parser)
+                pages = len(urls)
+                urls, group = self.next_batch(group, concurrency)
+                self.save_checkpoint(urls, group, pages=pages)
+        finally:
+            executor.shutdown(wait=False)
+            if parser is not None:
+                parser.shutdown(cancel_futures=True)
+
+        self.save_checkpoint(urls, group, force=True)
+
+        logger.info(f'Scraped {self.num_movies} movie and {self.num_actors} actor pages')
+        logger.info(f'Connection pool stats: {POOL.get_stats()}')
+        if self.cache is not None:
+            logger.info(f'Page cache stats: {self.cache.get_stats()}')
+
+    async def crawl_batch(self, urls, group, semaphore, executor, parser=None):
+        """
+        Download and parse a batch of pages concurrently and add each page's
+        information to the graph in the order the pages complete
+        :param urls: The urls of the pages to scrape
+        :param group: The type of the pages the urls are linking to
+        :param semaphore: Bounds the number of downloads in flight
+        :param executor: The thread pool running the blocking downloads
+        :param parser: The process pool parsing the pages, if any
+        :return: None
+        """
+        tasks = [asyncio.ensure_future(self.fetch_extract(url, group, semaphore, executor, parser))
+                 for url in urls]
+        try:
+            for task in asyncio.as_completed(tasks):
+                url, record = await task
+
+                # Stop scraping after we have retrieve enough movie and actor information
+                if self.thresholds_met():
+                    break
+
+                if group is ACTOR:
+                    self.add_actor_record(record, url)
+                else:
+                    self.add_movie_record(record, url)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def fetch_extract(self, url, group, semaphore, executor, parser):
+        """
+        Download a page on the thread pool once a download slot is free, then
+        hand the raw page over to be parsed, freeing the slot for the next download
+        :param url: The url to be downloaded
+        :param group: The type of the page the url is linking to
+        :param semaphore: Bounds the number of downloads in flight
+        :param executor: The thread pool running the blocking downloads
+        :param parser: The process pool parsing the pages, if any
+        :return: The url and the information extracted from the page, if any
+        """
+        loop = asyncio.get_running_loop()
+        async with semaphore:
+            self.slow_record_scrape()
+            raw_page = await loop.run_in_executor(executor, open_url, url, self.cache)
+
+        if raw_page is None:
+            logger.warning(f'Url:{url} is invalid')
+            return url, None
+        if group is MOVIE and url in self.movie_urls:
+            return url, None
+
+        if parser is None:
+            return url, extract_page(raw_page, group)
+        return url, await loop.run_in_executor(parser, extract_page, raw_page, group)
+
+    def next_batch(self, group, size):
+        """
+        Determine which urls to crawl next. After a batch of movies every
+        queued actor is crawled, otherwise up to size queued movies are crawled
+        :param group: The type of group of the batch just crawled
+        :param size: The maximum number of movie urls in the next batch
+        :return: The urls to crawl next, the type of group of those urls
+        """
+        if group is MOVIE and not self.actor_queue.empty():
+            return drain_queue(self.actor_queue), ACTOR
+        if not self.movie_queue.empty():
+            return drain_queue(self.movie_queue, size), MOVIE
+        return drain_queue(self.actor_queue), ACTOR
+
+    def thresholds_met(self):
+        """
+        Determine if enough movie and actor information has been scraped
+        :return: If both the movie and actor thresholds have been met
+        """
+        return self.num_movies >= MOVIE_THRESHOLD and self.num_actors >= ACTOR_THRESHOLD
+
+    def save_checkpoint(self, pending, group, pages=1, force=False):
+        """
+        Save the crawl to the checkpoint once every interval scraped pages
+        :param pending: The urls which will be scraped next
+        :param group: The type of group of the pending urls
+        :param pages: The number of pages scraped since the last call
+        :param force: Save even if the interval has not been reached
+        :return: None
+        """
+        if self.checkpoint is None:
+            return
+
+        self.pages_since_checkpoint += pages
+        if not force and self.pages_since_checkpoint < self.checkpoint.interval:
+            return
+
+        state = {
+            'pending': [url for url in pending if url is not None],
+            'group': group,
+            'movie_queue': list(self.movie_queue.queue),
+            'actor_queue': list(self.actor_queue.queue),
+            'movie_urls': self.movie_urls,
+            'actor_urls': self.actor_urls,
+            'num_movies': self.num_movies,
+            'num_actors': self.num_actors,
+            'num_requests': self.num_requests,
+        }
+        self.checkpoint.save(state, self.delta)
+        self.delta = []
+        self.pages_since_checkpoint = 0
+
+    def resume(self):
+        """
+        Restore the frontier, visited urls, counters and graph from the checkpoint
+        :return: The url to continue scraping from, the type of group of the url
+        """
+        state, self.graph = self.checkpoint.load()
+        self.movie_urls = state['movie_urls']
+        self.actor_urls = state['actor_urls']
+        self.num_movies = state['num_movies']
+        self.num_actors = state['num_actors']
+        self.num_requests = state['num_requests']
+        self.delta = []
+        self.pages_since_checkpoint = 0
+
+        # Pending urls go back to the front of their queue
+        group = ACTOR if state['group'] == ACTOR else MOVIE
+        movie_queue = state['movie_queue']
+        actor_queue = state['actor_queue']
+        if group is ACTOR:
+            actor_queue = state['pending'] + actor_queue
+        else:
+            movie_queue = state['pending'] + movie_queue
+        self.movie_queue = fill_queue(movie_queue)
+        self.actor_queue = fill_queue(actor_queue)
+
+        logger.info(f'Resuming with {self.num_actors} actors and {self.num_movies} movies')
+        if not self.actor_queue.empty():
+            return self.actor_queue.get(), ACTOR
+        if not self.movie_queue.empty():
+            return self.movie_queue.get(), MOVIE
+        return None, None
+
+    def refresh(self, concurrency=CONCURRENCY):
+        """
+        Re-visit every movie and actor page already in the graph with conditional
+        requests, and update the vertices and edge weights of the pages which changed
+        :param concurrency: The maximum number of pages revalidated at once
+        :return: The number of vertices updated
+        """
+        if self.cache is None:
+            logger.warning('Refreshing needs the page cache holding the previous pages')
+            return 0
+
+        pages = [(url, MOVIE) for url in self.movie_urls] + [(url, ACTOR) for url in self.actor_urls]
+        logger.info(f'Refreshing {len(pages)} pages')
+
+        updated = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            raw_pages = executor.map(lambda page: revalidate_url(page[0], self.cache), pages)
+            for (url, group), raw_page in zip(pages, raw_pages):
+                self.num_requests += 1
+                # Unchanged pages are not parsed again
+                if raw_page is None:
+                    continue
+                record = extract_page(raw_page, group)
+                if record is None:
+                    continue
+                if group is MOVIE:
+                    changed = self.refresh_movie(self.movie_urls[url], record)
+                else:
+                    changed = self.refresh_actor(self.actor_urls[url], record)
+                updated += changed
+
+        logger.info(f'Refreshed {len(pages)} pages, {updated} vertices updated')
+        return updated
+
+    def refresh_movie(self, title, record):
+        """
+        Update a movie vertex from its re-fetched page, re-weighting its edges
+        if the gross income changed
+        :param title: The title of the movie vertex
+        :param record: The movie record extracted from the page
+        :return: If the vertex changed
+        """
+        movie = self.graph.get_vertex(title)
+        if movie is None or (movie.get_value1(), movie.get_value2()) == (record['gross'], record['year']):
+            return False
+
+        gross_changed = movie.get_value1() != record['gross']
+        movie.set_value1(record['gross'])
+        movie.set_value2(record['year'])
+        self.record_delta({'value': [title, record['gross'], record['year']]})
+
+        if gross_changed:
+            for actor in list(movie.get_neighbors()):
+                age = self.graph.get_vertex(actor).get_value1()
+                self.update_edge(title, actor, int(record['gross'] / age))
+        return True
+
+    def refresh_actor(self, name, record):
+        """
+        Update an actor vertex from its re-fetched page, re-weighting its edges
+        if the age changed
+        :param name: The name of the actor vertex
+        :param record: The actor record extracted from the page
+        :return: If the vertex changed
+        """
+        actor = self.graph.get_vertex(name)
+        if actor is None or actor.get_value1() == record['age']:
+            return False
+
+        actor.set_value1(record['age'])
+        self.record_delta({'value': [name, record['age'], actor.get_value2()]})
+
+        for movie in list(actor.get_neighbors()):
+            gross = self.graph.get_vertex(movie).get_value1()
+            self.update_edge(name, movie, int(gross / record['age']))
+        return True
+
+    def update_edge(self, key1, key2, weight):
+        """
+        Change the weight of an edge if it differs
+        :param key1: The key of one end of the edge
+        :param key2: The key of the other end of the edge
+        :param weight: The new weight of the edge
+        :return: None
+        """
+        if self.graph.get_vertex(key1).get_weight(key2) != weight:
+            self.graph.add_edge(key1, key2, weight)
+            self.record_delta({'edge': [key1, key2, weight]})
+
+    def record_delta(self, record):
+        """
+        Remember a graph change so it is written with the next checkpoint
+        :param record: The vertex or edge record
+        :return: None
+        """
+        if self.checkpoint is not None:
+            self.delta.append(record)
 
     def get_any_url(self, group):
         """
@@ -143,40 +444,36 @@ class Scraper:
 
     def slow_record_scrape(self):
         """
-        Slow down the scraping and record the number of requests thus far
+        Record the number of requests thus far. The scraping itself is
+        slowed down per host by the rate limiter in request_url
         :return:
         """
-        #sleep(randint(1, 2))
         self.num_requests += 1
         elapsed_time = time() - self.start_time
         logger.info(f'Request Number:{self.num_requests} ;'
                     f'Request Frequency:{self.num_requests / elapsed_time} requests/sec')
 
-    def scrape_movie(self, soup, url):
+    def add_movie_record(self, record, url):
         """
-        Obtain the gross income and title from movie's web-page
-        :param soup: The web-page to scrape
+        Add the information extracted from a movie's web-page into the graph
+        and queue up the cast's Wikipedia pages
+        :param record: The gross, title, year and actor urls of the movie, if found
         :param url: The url of the web-page
         :return: None
         """
-        # Check if we've already processed this url before
-        if url in self.movie_urls:
+        if record is None or url in self.movie_urls:
             return
-        gross, title, year = get_movie_info(soup)
-        if gross is not None and title is not None and year is not None:
-            # Retrieve all the urls to the movie cast's Wikipedia page
-            actor_urls = get_actor_urls(soup)
-            self.add_movie(actor_urls, gross, title, url, year)
-            if title in self.graph.get_vertices():
-                for actor_url in actor_urls:
-                    # Make sure not to add already scraped Wikipedia pages into our actor queue
-                    if actor_url not in self.actor_urls:
-                        self.actor_queue.put(actor_url)
-                    # Otherwise, add an edge between the movie and actor
-                    else:
-                        self.add_movie_edge(actor_url, gross, title)
-
-
+        gross, title, year = record['gross'], record['title'], record['year']
+        actor_urls = record['actor_urls']
+        self.add_movie(actor_urls, gross, title, url, year)
+        if title in self.graph.get_vertices():
+            for actor_url in actor_urls:
+                # Make sure not to add already scraped Wikipedia pages into our actor queue
+                if actor_url not in self.actor_urls:
+                    self.actor_queue.put(actor_url)
+                # Otherwise, add an edge between the movie and actor
+                else:
+                    self.add_movie_edge(actor_url, gross, title)
 
     def add_movie(self, actor_urls, gross, title, url, year):
         """
@@ -194,6 +491,7 @@ class Scraper:
             # Store the url with the title of the movie it links to
             self.movie_urls[url] = title
             self.graph.add_vertex(MOVIE, title, gross, year)
+            self.record_delta({'vertex': [MOVIE, title, gross, year]})
             self.num_movies += 1
 
     def add_movie_edge(self, actor_url, gross, title):
@@ -209,31 +507,30 @@ class Scraper:
         actor_age = self.graph.get_vertex(actor).get_value1()
         weight = int(gross / actor_age)
         self.graph.add_edge(title, actor, weight)
+        self.record_delta({'edge': [title, actor, weight]})
 
-    def scrape_actor(self, soup, url):
+    def add_actor_record(self, record, url):
         """
-        Obtain the age and name from actor's web-page
-        :param soup: The raw html representation of the Wikipedia page
+        Add the information extracted from an actor's web-page into the graph
+        and queue up the Wikipedia pages of the films the actor stars in
+        :param record: The age, name and movie urls of the actor, if found
         :param url: The url of the web-page
         :return: None
         """
-        logger.info(f'Actor url:{url}')
-        age, name = get_actor_info(soup)
-        if age is not None and name is not None:
-
-            # Retrieve all the urls to the Wikipedia pages of the films the actor stars in
-            movie_urls = get_movie_urls(soup)
-            # Add the actor into our graph if the graph doesn't already store it
-            # and if we are able to find urls to the films the actor stars in
-            self.add_actor(age, movie_urls, name, url)
-            if name in self.graph.get_vertices():
-                for movie_url in movie_urls:
-                    # Make sure not to add already scraped Wikipedia pages into our movie queue
-                    if movie_url not in self.movie_urls:
-                        self.movie_queue.put(movie_url)
-                    # Otherwise, add an edge between the actor and movie
-                    else:
-                        self.add_actor_edge(age, movie_url, name)
+        if record is None:
+            return
+        age, name, movie_urls = record['age'], record['name'], record['movie_urls']
+        # Add the actor into our graph if the graph doesn't already store it
+        # and if we are able to find urls to the films the actor stars in
+        self.add_actor(age, movie_urls, name, url)
+        if name in self.graph.get_vertices():
+            for movie_url in movie_urls:
+                # Make sure not to add already scraped Wikipedia pages into our movie queue
+                if movie_url not in self.movie_urls:
+                    self.movie_queue.put(movie_url)
+                # Otherwise, add an edge between the actor and movie
+                else:
+                    self.add_actor_edge(age, movie_url, name)
 
     def add_actor(self, age, movie_urls, name, url):
         """
@@ -248,6 +545,7 @@ class Scraper:
             # Store the url with the name of the actor it links to
             self.actor_urls[url] = name
             self.graph.add_vertex(ACTOR, name, age)
+            self.record_delta({'vertex': [ACTOR, name, age]})
             self.num_actors += 1
 
     def add_actor_edge(self, age, movie_url, name):
@@ -262,11 +560,87 @@ class Scraper:
         movie_gross = self.graph.get_vertex(movie).get_value1()
         weight = int(movie_gross / age)
         self.graph.add_edge(name, movie, weight)
+        self.record_delta({'edge': [name, movie, weight]})
 
     def get_graph(self):
         return self.graph
 
 
+def extract_page(raw_page, group):
+    """
+    Extract the information the graph needs from a raw web-page in a single
+    pass. Only plain data is returned so this can run in a worker process
+    :param raw_page: The raw bytes of the Wikipedia page
+    :param group: The type of the page
+    :return: The extracted actor or movie record, if available
+    """
+    fields = extract_fields(raw_page)
+    if group == ACTOR:
+        return actor_record(fields)
+    return movie_record(fields)
+
+
+def actor_record(fields):
+    """
+    Build an actor record from the fields extracted from an actor's web-page
+    :param fields: The fields found by extract_fields
+    :return: The actor record, None if the age or name is missing
+    """
+    name = strip_text(fields['title'])
+    age = strip_text(fields['age'])
+    if name is None or age is None:
+        logger.warning("Not able to get actor information")
+        return None
+
+    movie_urls = fields['filmography_div'] or fields['filmography_table']
+    return {'age': int(re.sub('[^0-9]', '', age)), 'name': name, 'movie_urls': movie_urls}
+
+
+def movie_record(fields):
+    """
+    Build a movie record from the fields extracted from a movie's web-page
+    :param fields: The fields found by extract_fields
+    :return: The movie record, None if the gross income, title or year is missing
+    """
+    title = strip_text(fields['title'])
+    gross = strip_text(fields['box_office'])
+    year = get_year(fields['release_date'])
+    if title is None or gross is None or year is None:
+        logger.warning("Not able to get movie information")
+        return None
+
+    return {'gross': parse_gross(gross), 'title': title, 'year': year,
+            'actor_urls': fields['starring']}
+
+
+def extract_actor(soup):
+    """
+    Extract the age, name and movie urls from an actor's web-page
+    :param soup: The raw html representation of the Wikipedia page
+    :return: The actor record, None if the age or name is missing
+    """
+    age, name = get_actor_info(soup)
+    if age is None or name is None:
+        return None
+
+    # Retrieve all the urls to the Wikipedia pages of the films the actor stars in
+    return {'age': age, 'name': name, 'movie_urls': get_movie_urls(soup)}
+
+
+def extract_movie(soup):
+    """
+    Extract the gross income, title, year and actor urls from a movie's web-page
+    :param soup: The raw html representation of the Wikipedia page
+    :return: The movie record, None if the gross income, title or year is missing
+    """
+    gross, title, year = get_movie_info(soup)
+    if gross is None or title is None or year is None:
+        return None
+
+    # Retrieve all the urls to the movie cast's Wikipedia page
+    return {'gross': gross, 'title': title, 'year': year, 'actor_urls': get_actor_urls(soup)}
+
+
 def get_actor_info(soup):
     """
     Obtain the actor information, age and name, from the web-page
@@ -459,6 +833,15 @@ def strip_tags(var, box):
     return var
 
 
+def strip_text(text):
+    """
+    Strip the surrounding whitespace of an extracted field
+    :param text: The text of the field, if found
+    :return: The stripped text, if the field was found
+    """
+    return text.strip() if text is not None else None
+
+
 def parse_gross(gross_string):
     """
     Parse gross income string into integer
@@ -517,22 +900,105 @@ def remove_non_alphanum(string):
     return ret
 
 
-def open_url(url):
+def drain_queue(queue, limit=None):
+    """
+    Remove urls from the front of a queue
+    :param queue: The queue to be drained
+    :param limit: The maximum number of urls to remove, all if None
+    :return: The urls removed from the queue
+    """
+    urls = []
+    while not queue.empty() and (limit is None or len(urls) < limit):
+        urls.append(queue.get())
+    return urls
+
+
+def fill_queue(urls):
+    """
+    Create a queue holding the given urls in order
+    :param urls: The urls to be queued
+    :return: The filled queue
+    """
+    queue = Queue()
+    for url in urls:
+        queue.put(url)
+    return queue
+
+
+def open_url(url, cache=None):
     """
-    Obtain the raw web-page from the given url
+    Obtain the raw web-page from the given url, from the page cache if it holds
+    a fresh copy, otherwise over a pooled keep-alive connection
     :param url: The url to be opened
-    :return: The raw web-page, if no error raised
+    :param cache: The PageCache to consult and fill, if any
+    :return: The raw bytes of the web-page, if no error raised
     """
-    raw_page = None
+    if cache is not None:
+        raw_page = cache.get(url)
+        if raw_page is not None:
+            logger.info(f'Cache hit:{url}')
+            return raw_page
 
     logger.info(f'Accessing {url}')
-    try:
-        raw_page = urlopen(url)
-    except HTTPError as e:
-        logger.warning(f'HTTPError:{e.code}, url:{url}')
-    except URLError as e:
-        logger.warning(f'URLError:{e.errno}, url:{url}')
-    else:
-        logger.info(f'Successful connection:{url}')
+    response = request_url(url)
+    if response is None:
+        return None
+
+    logger.info(f'Successful connection:{url}')
+    if cache is not None:
+        cache.put(url, response.body, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return response.body
+
+
+def revalidate_url(url, cache):
+    """
+    Ask the server whether a cached web-page changed, using the ETag and
+    Last-Modified validators it was last served with
+    :param url: The url to be revalidated
+    :param cache: The PageCache holding the previous copy of the web-page
+    :return: The raw bytes of the web-page if it changed, None if it did not or on error
+    """
+    headers = {}
+    etag, last_modified = cache.get_validators(url)
+    if etag is not None:
+        headers['If-None-Match'] = etag
+    if last_modified is not None:
+        headers['If-Modified-Since'] = last_modified
 
-    return raw_page
+    logger.info(f'Revalidating {url}')
+    response = request_url(url, headers)
+    if response is None:
+        return None
+
+    if response.status == 304:
+        logger.info(f'Not modified:{url}')
+        cache.touch(url)
+        return None
+
+    cache.put(url, response.body, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return response.body
+
+
+def request_url(url, headers=None):
+    """
+    Request the given url once the host's rate limit allows it, slowing the
+    host down and retrying when it answers 429 or 5xx
+    :param url: The url to be requested
+    :param headers: Any extra request headers
+    :return: The response, None if an error was raised
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        LIMITER.acquire(url)
+        try:
+            response = POOL.request(url, headers)
+        except HTTPError as e:
+            logger.warning(f'HTTPError:{e.code}, url:{url}')
+            if e.code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                return None
+            LIMITER.throttle(url, e.headers.get('Retry-After') if e.headers else None)
+        except URLError as e:
+            logger.warning(f'URLError:{e.reason}, url:{url}')
+            return None
+        else:
+            LIMITER.success(url)
+            return response
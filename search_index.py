@@ -0,0 +1,140 @@
+from bisect import bisect_left, insort
+
+from graph import GraphListener
+
+"""
+Program: search_index.py
+
+Name search index over the keys of a graph. Substring lookups go through an
+inverted index of the keys' trigrams, whose candidates are then verified,
+and prefix lookups through a sorted list of lower-cased keys. Single
+characters and pairs are indexed as well, so queries too short for a
+trigram are still answered from the index. The index subscribes to
+the graph so it follows vertices being added and deleted.
+"""
+
+GRAM = 3
+
+
+class NameIndex(GraphListener):
+    def __init__(self, graph):
+        """
+        Build the index over the graph's current vertices and subscribe to its changes
+        :param graph: The graph whose vertex keys are indexed
+        """
+        self.graph = graph
+        self.grams = {}
+        self.prefixes = []
+        for vertex in graph:
+            self.vertex_added(graph.get_id(vertex.get_key()), vertex)
+        graph.subscribe(self)
+
+    def vertex_added(self, key_id, vertex):
+        name = vertex.get_key().lower()
+        for gram in all_grams(name):
+            self.grams.setdefault(gram, set()).add(key_id)
+        insort(self.prefixes, (name, key_id))
+
+    def vertex_removed(self, key_id, vertex):
+        name = vertex.get_key().lower()
+        for gram in all_grams(name):
+            ids = self.grams.get(gram)
+            if ids is not None:
+                ids.discard(key_id)
+                if not ids:
+                    del self.grams[gram]
+        index = bisect_left(self.prefixes, (name, key_id))
+        if index < len(self.prefixes) and self.prefixes[index] == (name, key_id):
+            del self.prefixes[index]
+
+    def find(self, text, group=None):
+        """
+        Find the vertices whose key contains the text, case sensitive like the name filters
+        :param text: The text the key must contain
+        :param group: The group of vertices, any group if None
+        :return: Set of key ids
+        """
+        return {key_id for key_id in self.candidates(text.lower(), group)
+                if text in self.graph.get_vertex_by_id(key_id).get_key()}
+
+    def candidates(self, text, group=None):
+        """
+        Find the vertices whose lower-cased key contains the lower-cased text
+        :param text: The lower-cased text the key must contain
+        :param group: The group of vertices, any group if None
+        :return: Iterator of key ids
+        """
+        if not text:
+            # Every key contains the empty text, only the group narrows them down
+            key_ids = (key_id for key_id, vertex in self.graph.iter_group(group)) if group is not None \
+                else (self.graph.get_id(vertex.get_key()) for vertex in self.graph)
+        elif len(text) < GRAM:
+            # Short texts are grams of their own
+            key_ids = tuple(self.grams.get(text, ()))
+        else:
+            postings = sorted((self.grams.get(gram, set()) for gram in trigrams(text)), key=len)
+            key_ids = postings[0].intersection(*postings[1:]) if postings[0] else ()
+
+        for key_id in key_ids:
+            vertex = self.graph.get_vertex_by_id(key_id)
+            if vertex is not None and (group is None or vertex.get_group() == group) and \
+                    text in vertex.get_key().lower():
+                yield key_id
+
+    def prefix(self, text, group=None, limit=None):
+        """
+        Find the vertices whose key starts with the text, ignoring case
+        :param text: The start of the key
+        :param group: The group of vertices, any group if None
+        :param limit: The maximum number of key ids to return, unlimited if None
+        :return: List of key ids, in alphabetical order of the keys
+        """
+        text = text.lower()
+        key_ids = []
+        for name, key_id in self.prefixes[bisect_left(self.prefixes, (text,)):]:
+            if not name.startswith(text) or (limit is not None and len(key_ids) == limit):
+                break
+            if group is None or self.graph.get_vertex_by_id(key_id).get_group() == group:
+                key_ids.append(key_id)
+        return key_ids
+
+    def search(self, text, group=None, limit=10):
+        """
+        Autocomplete a name, ranking keys starting with the text first in
+        alphabetical order, then keys with a word starting with the text, then
+        any other key containing it, shorter keys first
+        :param text: The text typed so far
+        :param group: The group of vertices, any group if None
+        :param limit: The maximum number of vertices to return
+        :return: List of the matching vertices
+        """
+        text = text.lower()
+        if not text or limit <= 0:
+            return []
+
+        key_ids = self.prefix(text, group, limit)
+        if len(key_ids) < limit:
+            found = set(key_ids)
+            ranked = []
+            for key_id in self.candidates(text, group):
+                if key_id not in found:
+                    name = self.graph.get_vertex_by_id(key_id).get_key().lower()
+                    rank = 0 if (' ' + text) in name else 1
+                    ranked.append((rank, len(name), name, key_id))
+            ranked.sort()
+            key_ids.extend(key_id for rank, length, name, key_id in ranked[:limit - len(key_ids)])
+
+        return [self.graph.get_vertex_by_id(key_id) for key_id in key_ids]
+
+
+def trigrams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def all_grams(text):
+    """
+    Obtain the grams a key is indexed under
+    :param text: The lower-cased key
+    :return: Set of the key's trigrams, pairs and single characters
+    """
+    return {text[i:i + size] for size in range(1, GRAM + 1) for i in range(len(text) - size + 1)}
@@ -0,0 +1,272 @@
+from array import array
+from bisect import bisect_left
+import logging.config
+import mmap
+import json
+import struct
+import time
+import numpy as np
+import yaml
+import os
+
+from graph import Graph
+from vertex import Vertex
+
+"""
+Program: snapshot.py
+
+Versioned binary snapshot of a Graph. The file holds a header, a string
+table of the keys in key id order followed by the group names, the sorted
+order of the keys for binary search, fixed-width vertex columns (group,
+value kinds, value1, value2) and the adjacency in compressed sparse row
+form. Keeping the key ids means a reloaded graph lists its vertices, and
+pages through them, as before. Every section is 8-byte aligned, so a snapshot
+is read through mmap with NumPy views that share the page cache between
+processes instead of being decoded.
+"""
+
+MAGIC = b'GRPHSNAP'
+VERSION = 2
+# magic, version, flags, vertex, key, group, string and edge counts, string bytes
+HEADER = struct.Struct('<8sIIQQQQQQ')
+INT_WEIGHTS = 1
+
+NO_GROUP = 0xFFFF
+# How a vertex value is held in its 8 byte slot
+INT, FLOAT, JSON = 0, 1, 2
+
+with open('config.yaml', 'r') as f:
+    config = yaml.safe_load(f.read())
+    logging.config.dictConfig(config)
+
+logger = logging.getLogger(__name__)
+
+
+def save_snapshot(graph, filename):
+    """
+    Atomically write a binary snapshot of the graph
+    :param graph: The graph to save
+    :param filename: The snapshot file
+    :return: None
+    """
+    # Every interned key is written, neighbors without a vertex of their own
+    # and deleted vertices included, so positions are the graph's key ids
+    keys = [graph.table.get_key(key_id) for key_id in range(len(graph.table))]
+    vertices = [graph.get_vertex_by_id(key_id) for key_id in range(len(keys))]
+    order = np.array(sorted(range(len(keys)), key=keys.__getitem__), dtype='<u4')
+
+    groups = sorted({vertex.get_group() for vertex in vertices if vertex is not None})
+    group_codes = {group: code for code, group in enumerate(groups)}
+    strings = keys + groups
+
+    group_column = np.full(len(keys), NO_GROUP, dtype='<u2')
+    kinds = np.zeros((len(keys), 2), dtype='u1')
+    values = np.zeros((len(keys), 2), dtype='<i8')
+    offsets = np.zeros(len(keys) + 1, dtype='<u8')
+    neighbors = []
+    weights = []
+    int_weights = True
+
+    for i, vertex in enumerate(vertices):
+        if vertex is not None:
+            group_column[i] = group_codes[vertex.get_group()]
+            for column, value in enumerate((vertex.get_value1(), vertex.get_value2())):
+                kinds[i, column], values[i, column] = encode_value(value, strings)
+            neighbors.extend(vertex.neighbor_ids)
+            weights.extend(vertex.weights)
+            int_weights = int_weights and vertex.weights.typecode == 'q'
+        offsets[i + 1] = len(neighbors)
+
+    encoded = [string.encode('utf-8') for string in strings]
+    string_offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+    np.cumsum([len(string) for string in encoded], out=string_offsets[1:])
+    blob = b''.join(encoded)
+
+    vertex_count = sum(vertex is not None for vertex in vertices)
+    header = HEADER.pack(MAGIC, VERSION, INT_WEIGHTS if int_weights else 0, vertex_count, len(keys),
+                         len(groups), len(encoded), len(neighbors), len(blob))
+    sections = [string_offsets.tobytes(),
+                blob,
+                order.tobytes(),
+                group_column.tobytes(),
+                kinds.tobytes(),
+                values.tobytes(),
+                offsets.tobytes(),
+                np.array(neighbors, dtype='<u4').tobytes(),
+                np.array(weights, dtype='<i8' if int_weights else '<f8').tobytes()]
+
+    with open(filename + '.tmp', 'wb') as snapshot_file:
+        snapshot_file.write(header)
+        for section in sections:
+            snapshot_file.write(section)
+            snapshot_file.write(b'\0' * padding(len(section)))
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(filename + '.tmp', filename)
+    logger.info(f'Saved snapshot of {vertex_count} vertices to {filename}')
+
+
+def encode_value(value, strings):
+    """
+    Encode a vertex value into its kind and 8 byte slot
+    :param value: The vertex value
+    :param strings: The snapshot's string table, extended for values kept as JSON
+    :return: The kind of the value and the integer held in its slot
+    """
+    if isinstance(value, int) and not isinstance(value, bool) and -2 ** 63 <= value < 2 ** 63:
+        return INT, value
+    if isinstance(value, float):
+        return FLOAT, struct.unpack('<q', struct.pack('<d', value))[0]
+    strings.append(json.dumps(value))
+    return JSON, len(strings) - 1
+
+
+def padding(size):
+    return -size % 8
+
+
+class Snapshot:
+    def __init__(self, filename):
+        """
+        Map a snapshot file into memory, without decoding it
+        :param filename: The snapshot file
+        """
+        self.filename = filename
+        with open(filename, 'rb') as snapshot_file:
+            self.map = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, flags, self.vertex_count, self.key_count, group_count, string_count, \
+            edge_count, blob_size = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{filename} is not a graph snapshot')
+        if version != VERSION:
+            raise ValueError(f'{filename} is a version {version} snapshot, expected {VERSION}')
+
+        self.position = HEADER.size
+        self.string_offsets = self.section('<u8', string_count + 1)
+        self.blob = memoryview(self.map)[self.position:self.position + blob_size]
+        self.position += blob_size + padding(blob_size)
+        self.order = self.section('<u4', self.key_count)
+        self.groups = self.section('<u2', self.key_count)
+        self.kinds = self.section('u1', self.key_count * 2).reshape(self.key_count, 2)
+        self.values = self.section('<i8', self.key_count * 2).reshape(self.key_count, 2)
+        self.offsets = self.section('<u8', self.key_count + 1)
+        self.neighbors = self.section('<u4', edge_count)
+        self.weights = self.section('<i8' if flags & INT_WEIGHTS else '<f8', edge_count)
+        self.group_names = [self.get_string(self.key_count + code) for code in range(group_count)]
+
+    def section(self, dtype, count):
+        """
+        Obtain a read-only view of the next section of the file
+        :param dtype: The NumPy type of the section's items
+        :param count: The number of items
+        :return: The NumPy array backed by the mapped file
+        """
+        column = np.frombuffer(self.map, dtype=dtype, count=count, offset=self.position)
+        self.position += column.nbytes + padding(column.nbytes)
+        return column
+
+    def get_string(self, i):
+        return str(self.blob[self.string_offsets[i]:self.string_offsets[i + 1]], 'utf-8')
+
+    def get_key(self, i):
+        return self.get_string(i)
+
+    def find(self, key):
+        """
+        Find the position of a key by binary search over the sorted order of the keys
+        :param key: The key of the vertex
+        :return: The position of the key, None if it is not in the snapshot
+        """
+        i = bisect_left(KeyList(self), key)
+        if i < self.key_count and self.get_key(int(self.order[i])) == key:
+            return int(self.order[i])
+        return None
+
+    def has_vertex(self, i):
+        return self.groups[i] != NO_GROUP
+
+    def get_group(self, i):
+        return self.group_names[self.groups[i]]
+
+    def get_value(self, i, column):
+        """
+        Decode a vertex value
+        :param i: The position of the vertex
+        :param column: 0 for value1, 1 for value2
+        :return: The value
+        """
+        kind = self.kinds[i, column]
+        slot = int(self.values[i, column])
+        if kind == INT:
+            return slot
+        if kind == FLOAT:
+            return struct.unpack('<d', struct.pack('<q', slot))[0]
+        return json.loads(self.get_string(slot))
+
+    def get_neighbors(self, i):
+        """
+        Decode the edges of a vertex
+        :param i: The position of the vertex
+        :return: List of (neighbor key, weight) pairs
+        """
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return [(self.get_key(neighbor), weight) for neighbor, weight in
+                zip(self.neighbors[start:end].tolist(), self.weights[start:end].tolist())]
+
+    def close(self):
+        # The map can only be closed once nothing points into it
+        self.blob.release()
+        self.string_offsets = self.order = self.groups = self.kinds = self.values = None
+        self.offsets = self.neighbors = self.weights = None
+        self.map.close()
+
+
+class KeyList:
+    """
+    Sequence view of a snapshot's keys in sorted order, for bisect
+    """
+    __slots__ = ('snapshot',)
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def __getitem__(self, i):
+        return self.snapshot.get_key(int(self.snapshot.order[i]))
+
+    def __len__(self):
+        return self.snapshot.key_count
+
+
+def load_snapshot(filename):
+    """
+    Build a graph from a binary snapshot
+    :param filename: The snapshot file
+    :return: The graph
+    """
+    start = time.perf_counter()
+    snapshot = Snapshot(filename)
+    graph = Graph()
+    keys = [snapshot.get_key(i) for i in range(snapshot.key_count)]
+    # Interning the keys in position order gives them back their key ids
+    for key in keys:
+        graph.table.intern(key)
+
+    for i, key in enumerate(keys):
+        if not snapshot.has_vertex(i):
+            continue
+        vertex = Vertex(snapshot.get_group(i), key, snapshot.get_value(i, 0), snapshot.get_value(i, 1),
+                        graph.table)
+        start_edge, end_edge = int(snapshot.offsets[i]), int(snapshot.offsets[i + 1])
+        neighbor_ids = array('i', snapshot.neighbors[start_edge:end_edge].astype(np.intc).tobytes())
+        if snapshot.weights.dtype.kind == 'i':
+            weights = array('q', snapshot.weights[start_edge:end_edge].astype(np.int64).tobytes())
+        else:
+            weights = array('d', snapshot.weights[start_edge:end_edge].astype(np.float64).tobytes())
+        vertex.set_edges(neighbor_ids, weights)
+        # Added with its edges, so listeners see the whole vertex at once
+        graph.put_record(i, vertex)
+    snapshot.close()
+
+    logger.info(f'Loaded {graph.count} vertices from {filename} in {time.perf_counter() - start:.3f}s')
+    return graph
@@ -53,6 +53,162 @@ class GraphTestCase(unittest.TestCase):
         for v in g:
             self.assertEqual(type(v), Vertex)
 
+    def test_delete_neighbor(self):
+        """
+        Check that neighbors deleted through the neighbor view are removed from the vertex
+        :return: None
+        """
+        from graph import Graph
+        g = Graph()
+        g.add_vertex("Student", "Bryant Collaguazo", 21)
+        g.add_vertex("Worker", "Edward Collaguazo", 23)
+        g.add_edge("Bryant Collaguazo", "Edward Collaguazo", 1)
+        del g.get_vertex("Edward Collaguazo").get_neighbors()["Bryant Collaguazo"]
+        g.delete_vertex("Bryant Collaguazo")
+
+        self.assertEqual(len(g.get_vertex("Edward Collaguazo").get_neighbors()), 0)
+        self.assertEqual("Bryant Collaguazo" in g.get_vertices(), False)
+        self.assertEqual(g.get_vertex("Bryant Collaguazo"), None)
+
+    def test_save_load(self):
+        """
+        Check that graphs survive a save and load, including graphs saved
+        before vertices stored their neighbors as id arrays
+        :return: None
+        """
+        import json
+        import jsonpickle
+        from graph import Graph
+        g = Graph()
+        g.add_vertex("Movie", "Glory (1989 film)", 26828365, 1989)
+        g.add_vertex("Actor", "Morgan Freeman", 81)
+        g.add_edge("Glory (1989 film)", "Morgan Freeman", 26828365 / 81)
+        g = jsonpickle.decode(jsonpickle.encode(g))
+        self.assertEqual(g.get_vertex("Morgan Freeman").get_weight("Glory (1989 film)"), 26828365 / 81)
+
+        legacy = {"py/object": "graph.Graph", "vertices": {
+            "Glory (1989 film)": {"py/object": "vertex.Vertex", "group": "Movie", "key": "Glory (1989 film)",
+                                  "neighbors": {"Morgan Freeman": 331214}, "value1": 26828365, "value2": 1989},
+            "Morgan Freeman": {"py/object": "vertex.Vertex", "group": "Actor", "key": "Morgan Freeman",
+                               "neighbors": {"Glory (1989 film)": 331214}, "value1": 81, "value2": -1}}}
+        g = jsonpickle.decode(json.dumps(legacy))
+        self.assertEqual(len(g.get_vertices()), 2)
+        self.assertEqual(g.get_vertex("Morgan Freeman").get_weight("Glory (1989 film)"), 331214)
+        self.assertEqual(list(g.get_vertex("Glory (1989 film)").get_neighbors()), ["Morgan Freeman"])
+
+    def test_freeze(self):
+        """
+        Check that the frozen snapshot matches the graph and is rebuilt after changes
+        :return: None
+        """
+        from graph import Graph
+        g = Graph()
+        g.add_vertex("Movie", "Se7en", 327311859, 1995)
+        g.add_vertex("Movie", "Unforgiven", 159157447, 1992)
+        g.add_vertex("Actor", "Morgan Freeman", 81)
+        g.add_edge("Se7en", "Morgan Freeman", 4040887)
+        g.add_edge("Unforgiven", "Morgan Freeman", 1964906)
+
+        frozen = g.freeze()
+        self.assertEqual(g.freeze() is frozen, True)
+        self.assertEqual(frozen.get_neighbors("Morgan Freeman"), {"Se7en": 4040887, "Unforgiven": 1964906})
+        self.assertEqual(frozen.degrees().tolist(), [1, 1, 2])
+        movies = frozen.select("Movie", "value2", 1990, 1994)
+        self.assertEqual([frozen.get_key(i) for i in movies], ["Unforgiven"])
+
+        g.get_vertex("Se7en").set_value2(1993)
+        self.assertEqual(frozen.is_current(g), False)
+        movies = g.freeze().select("Movie", "value2", 1990, 1994)
+        self.assertEqual(len(movies), 2)
+
+        # The movies still list the deleted actor, but the snapshot has no position for it
+        g.add_vertex("Actor", "Clint Eastwood", 88)
+        g.add_edge("Unforgiven", "Clint Eastwood", 1)
+        g.delete_vertex("Morgan Freeman")
+        frozen = g.freeze()
+        self.assertEqual(frozen.get_neighbors("Unforgiven"), {"Clint Eastwood": 1})
+        self.assertEqual(frozen.get_neighbors("Se7en"), {})
+        self.assertEqual(frozen.degrees().tolist(), [0, 1, 1])
+
+    def test_secondary_indexes(self):
+        """
+        Check that the group and value indexes follow adds, deletes and value updates
+        :return: None
+        """
+        from graph import Graph
+        g = Graph()
+        g.add_vertex("Actor", "Morgan Freeman", 81, 4040887)
+        g.add_vertex("Actor", "Sissy Spacek", 69, 1964906)
+        g.add_vertex("Actor", "Clint Eastwood", 88, 1964906)
+        g.add_vertex("Movie", "Unforgiven", 159157447, 1992)
+
+        self.assertEqual([v.get_key() for v in g.get_group_vertices("Actor")],
+                         ["Morgan Freeman", "Sissy Spacek", "Clint Eastwood"])
+        self.assertEqual([v.get_key() for v in g.find_vertices("Actor", "value2", 1964906)],
+                         ["Sissy Spacek", "Clint Eastwood"])
+        self.assertEqual([v.get_key() for v in g.find_vertices_range("Actor", "value1", 70, 90)],
+                         ["Morgan Freeman", "Clint Eastwood"])
+        self.assertEqual([v.get_key() for v in g.get_largest("Actor", "value1", 2)],
+                         ["Clint Eastwood", "Morgan Freeman"])
+
+        g.get_vertex("Sissy Spacek").set_value1(95)
+        g.delete_vertex("Clint Eastwood")
+        self.assertEqual([v.get_key() for v in g.get_largest("Actor", "value1", 5)],
+                         ["Sissy Spacek", "Morgan Freeman"])
+        self.assertEqual(g.find_vertices("Actor", "value1", 69), [])
+        self.assertEqual(len(g.get_group_vertices("Actor")), 2)
+
+        # Removing from the index before it was sorted for a query
+        g = Graph()
+        for name, age in [("A", 5), ("B", 3), ("C", 9), ("D", 1)]:
+            g.add_vertex("Actor", name, age)
+        g.delete_vertex("B")
+        self.assertEqual([v.get_key() for v in g.find_vertices_range("Actor", "value1", 2)], ["A", "C"])
+
+    def test_delete_vertices(self):
+        """
+        Check that deleting vertices removes their edges and bumps the version once per transaction
+        :return: None
+        """
+        from graph import Graph
+        g = Graph()
+        g.add_vertex("Actor", "Morgan Freeman", 81)
+        g.add_vertex("Movie", "Se7en", 327311859, 1995)
+        g.add_vertex("Movie", "Unforgiven", 159157447, 1992)
+        g.add_vertex("Movie", "Invictus", 122233971, 2009)
+        for movie in ("Se7en", "Unforgiven", "Invictus"):
+            g.add_edge(movie, "Morgan Freeman", 1)
+
+        version = g.version
+        with g.transaction():
+            g.delete_vertices(["Se7en", "Unforgiven"])
+            g.get_vertex("Invictus").set_value1(122233972)
+        self.assertEqual(g.version, version + 1)
+        self.assertEqual(list(g.get_vertex("Morgan Freeman").get_neighbors()), ["Invictus"])
+        self.assertEqual(g.get_vertex("Se7en"), None)
+
+
+class ParseTestCase(unittest.TestCase):
+    def test_parse_chunks(self):
+        """
+        Check that the streaming loader builds the same graph whatever the chunk size
+        :return: None
+        """
+        import json
+        from utils import parse
+        graph = parse('data.json')
+        small_chunks = parse('data.json', chunk_size=7)
+        with open('data.json') as data_file:
+            actors, movies = json.load(data_file)
+
+        self.assertEqual(len(graph.get_group_vertices('Actor')), len(actors))
+        self.assertEqual(len(graph.get_group_vertices('Movie')), len(movies))
+        for vertex in graph:
+            other = small_chunks.get_vertex(vertex.get_key(), vertex.get_group())
+            self.assertEqual((other.get_value1(), other.get_value2()),
+                             (vertex.get_value1(), vertex.get_value2()))
+            self.assertEqual(dict(other.get_neighbors()), dict(vertex.get_neighbors()))
+
 
 class VertexTestCase(unittest.TestCase):
     def test_get_attributes(self):
@@ -80,6 +236,25 @@ class VertexTestCase(unittest.TestCase):
 
         self.assertEqual("Edward Collaguazo" in neighbors, True)
 
+    def test_hub_neighbors(self):
+        """
+        Check that neighbor lookups stay right as a vertex with many neighbors changes
+        :return: None
+        """
+        from vertex import Vertex
+        v = Vertex("Movie", "Hub", 1, 1)
+        for i in range(20000):
+            v.add_neighbor(str(i), i)
+        v.add_neighbor("7", 70)
+        del v.get_neighbors()["3"]
+        v.remove_neighbor_ids({v.table.get_id("5")})
+        v.add_neighbor("3", 30)
+
+        self.assertEqual(len(v.get_neighbors()), 19999)
+        self.assertEqual((v.get_weight("7"), v.get_weight("8"), v.get_weight("3")), (70, 8, 30))
+        self.assertEqual("5" in v.get_neighbors(), False)
+        self.assertEqual(list(v.get_neighbors())[-1], "3")
+
 
 class QueryTestCase(unittest.TestCase):
     def test_get_gross(self):
@@ -107,3 +282,57 @@ class QueryTestCase(unittest.TestCase):
 
         self.assertEqual("Avengers: Infinity War" in movies, True)
         self.assertEqual("Iron Man" in movies, True)
+
+    def test_get_oldest_actors(self):
+        """
+        Check if the oldest actors are found, leaving out movies
+        :return: None
+        """
+        from graph import Graph
+        from query import Query
+        g = Graph()
+        q = Query(g)
+        g.add_vertex("Actor", "Robert Downey Jr.", 53)
+        g.add_vertex("Actor", "Morgan Freeman", 81)
+        g.add_vertex("Actor", "Sissy Spacek", 69)
+        g.add_vertex("Movie", "Se7en", 327311859, 1995)
+        g.add_vertex("Movie", "Iron Man", 1048000000, 2008)
+
+        self.assertEqual(q.get_oldest_actors(2), [("Morgan Freeman", 81), ("Sissy Spacek", 69)])
+        self.assertEqual(q.get_movies_year(2008), ["Iron Man"])
+
+    def test_get_top_actors(self):
+        """
+        Check if the top grossing actors are selected like a sort and cached until the graph changes
+        :return: None
+        """
+        from graph import Graph
+        from query import Query
+        from topk import top_k
+        items = [("a", 3), ("b", 7), ("c", 3), ("d", 1), ("e", 7), ("f", 3)]
+        for num in range(8):
+            self.assertEqual(top_k(iter(items), num),
+                             sorted(items, key=lambda item: item[1], reverse=True)[:num])
+
+        g = Graph()
+        q = Query(g)
+        computed = []
+        find_top_actors = q.find_top_actors
+
+        def counting_find_top_actors(num):
+            computed.append(num)
+            return find_top_actors(num)
+
+        q.find_top_actors = counting_find_top_actors
+        g.add_vertex("Actor", "Morgan Freeman", 81)
+        g.add_vertex("Actor", "Sissy Spacek", 69)
+        g.add_vertex("Movie", "Se7en", 327311859, 1995)
+        g.add_edge("Se7en", "Morgan Freeman", 4040887)
+        self.assertEqual(q.get_top_actors(1), [("Morgan Freeman", 4040887)])
+        # Cached until the graph changes
+        self.assertEqual(q.get_top_actors(1), [("Morgan Freeman", 4040887)])
+        self.assertEqual(computed, [1])
+        g.add_edge("Se7en", "Sissy Spacek", 5000000)
+        self.assertEqual(q.get_top_actors(1), [("Sissy Spacek", 5000000)])
+        self.assertEqual(computed, [1, 1])
+        self.assertEqual(q.get_top_actors(2), [("Sissy Spacek", 5000000), ("Morgan Freeman", 4040887)])
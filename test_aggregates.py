@@ -0,0 +1,75 @@
+import unittest
+from utils import parse
+from analyze import Analyze
+from query import Query
+from aggregates import Aggregates
+
+
+class AggregatesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.graph = parse('data.json')
+        self.aggregates = Aggregates(self.graph)
+
+    def assertRecomputed(self):
+        """
+        Check that the maintained aggregates match aggregates computed from scratch
+        :return: None
+        """
+        analyzer = Analyze(self.graph)
+        self.assertEqual(self.aggregates.get_connections(), analyzer.get_hub_actors()[0])
+        self.assertEqual(self.aggregates.get_gross_age(), analyzer.get_gross_age()[0])
+        self.assertEqual(self.aggregates.get_total_gross(),
+                         {vertex.get_key(): sum(vertex.weights)
+                          for vertex in self.graph.get_group_vertices("Actor")})
+
+    def test_mutations(self):
+        self.assertRecomputed()
+        actors = [vertex.get_key() for vertex in self.graph.get_group_vertices("Actor")]
+        movies = [vertex.get_key() for vertex in self.graph.get_group_vertices("Movie")]
+
+        self.graph.add_vertex("Actor", "Sissy Spacek", 69, 1964906)
+        self.graph.add_vertex("Movie", "Carrie", 1976, 33800000)
+        for actor in ["Sissy Spacek"] + actors[:3]:
+            self.graph.add_edge("Carrie", actor, 5)
+        self.graph.add_edge("Carrie", actors[0], 7)
+        self.graph.get_vertex(actors[1]).set_value1(12)
+        self.graph.get_vertex(actors[2]).set_value2(1000)
+        self.graph.get_vertex("Carrie").remove_neighbor(actors[2])
+        self.assertRecomputed()
+
+        self.graph.delete_vertices([actors[0], movies[0], movies[1]])
+        self.graph.add_vertex("Movie", "Carrie", 1976, 1)
+        self.assertRecomputed()
+
+    def test_deleted_actor(self):
+        self.graph.add_vertex("Actor", "Sissy Spacek", 69, 1964906)
+        self.graph.add_vertex("Actor", "Piper Laurie", 95, 2000000)
+        self.graph.add_vertex("Movie", "Carrie", 1976, 33800000)
+        self.graph.add_edge("Carrie", "Sissy Spacek", 5)
+        self.graph.add_edge("Carrie", "Piper Laurie", 5)
+        self.assertEqual(self.aggregates.get_connections()["Sissy Spacek"], 1)
+
+        # Carrie still lists the deleted actor, who no longer counts
+        self.graph.delete_vertex("Piper Laurie")
+        self.assertEqual(self.aggregates.get_connections()["Sissy Spacek"], 0)
+        self.assertNotIn("Piper Laurie", self.aggregates.get_connections())
+        self.assertRecomputed()
+
+        self.graph.add_vertex("Actor", "Piper Laurie", 95, 2000000)
+        self.assertEqual(self.aggregates.get_connections()["Piper Laurie"], 1)
+        self.assertRecomputed()
+
+        self.graph.get_vertex("Carrie").remove_neighbor("Piper Laurie")
+        self.graph.delete_vertex("Carrie")
+        self.assertNotIn("Sissy Spacek", self.aggregates.get_connections())
+        self.assertRecomputed()
+
+    def test_readers(self):
+        analyzer = Analyze(self.graph, self.aggregates)
+        self.assertEqual(analyzer.get_hub_actors(), Analyze(self.graph).get_hub_actors())
+        self.assertEqual(Query(self.graph, self.aggregates).get_top_actors(3),
+                         Query(self.graph).get_top_actors(3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,8 +8,21 @@ class MyTestCase(unittest.TestCase):
         self.graph = parse('data.json')
         self.analyzer = Analyze(self.graph)
 
+    def count_connections(self):
+        from utils import get_coactor_count, get_actor_num_connections
+        actor_connections = {}
+        for vertex in self.graph:
+            if vertex.get_group() == "Movie":
+                get_coactor_count(actor_connections, vertex.get_neighbors())
+        actor_num_connections = {}
+        get_actor_num_connections(actor_connections, actor_num_connections)
+        return actor_num_connections
+
     def test_outcome(self):
         actor_connections, num = self.analyzer.get_hub_actors()
         self.assertEqual(num, 10)
+        self.assertEqual(actor_connections, self.count_connections())
+        top = self.analyzer.get_top_hub_actors(3)
+        self.assertEqual(top, sorted(actor_connections.items(), key=lambda item: -item[1])[:3])
         age_gross, num = self.analyzer.get_gross_age()
         self.assertEqual(num, 10)
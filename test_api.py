@@ -1,5 +1,7 @@
 import unittest
-from app import app
+from app import app, graph
+from analyze import Analyze
+from query import Query
 import json
 
 
@@ -54,6 +56,139 @@ class TestAPI(unittest.TestCase):
         response = self.app.get("/movies/The Life of Bryant Collaguazo")
         self.assertEqual(response.status_code, 404)
 
+    def test_get_pages(self):
+        """
+        Test that filter results can be paged through with a cursor and streamed
+        :return:
+        """
+        response = self.app.get("/actors?name=Bruce Willis")
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEqual(sorted(data['Bruce Willis']), ['age', 'gross', 'name'])
+
+        response = self.app.get("/movies?year=1980&limit=1&fields=year")
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEqual(list(data.values()), [{'year': 1980}])
+        cursor = response.headers['X-Next-Cursor']
+
+        response = self.app.get(f"/movies?year=1980&cursor={cursor}&format=ndjson")
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertNotIn(list(data)[0], [line['name'] for line in lines])
+        self.assertTrue(all(line['year'] == 1980 for line in lines))
+
+    def test_get_ranges(self):
+        """
+        Test that range filters are combined with AND by default and OR on request
+        :return:
+        """
+        response = self.app.get("/movies?year_from=2000&year_to=2010&gross_min=100000000")
+        data = json.loads(response.get_data(as_text=True))
+        self.assertTrue(data)
+        for movie in data.values():
+            self.assertTrue(2000 <= movie['year'] <= 2010 and movie['gross'] >= 100000000)
+
+        response = self.app.get("/actors?age_min=90&age_max=95&gross_max=0&match=any")
+        data = json.loads(response.get_data(as_text=True))
+        self.assertTrue(data)
+        for actor in data.values():
+            self.assertTrue(90 <= actor['age'] <= 95 or actor['gross'] <= 0)
+
+        response = self.app.get("/movies?year_from=2000&match=some")
+        self.assertEqual(response.status_code, 400)
+
+    def test_search(self):
+        """
+        Test that names are autocompleted with prefix matches ranked first
+        :return:
+        """
+        response = self.app.get("/search?q=bruce w&limit=3")
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEqual(data[0], {'name': 'Bruce Willis', 'group': 'Actor'})
+        self.assertTrue(len(data) <= 3)
+
+        response = self.app.get("/search?q=die hard&group=Movie")
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEqual(data[0]['name'], 'Die Hard')
+        self.assertTrue(all('die hard' in movie['name'].lower() for movie in data))
+
+        response = self.app.get("/search?q=")
+        self.assertEqual(response.status_code, 400)
+
+        # Too short for a trigram, but still answered from the index
+        from app import graph, names
+        expected = {graph.get_id(vertex.get_key()) for vertex in graph.get_group_vertices('Actor')
+                    if 'Wi' in vertex.get_key()}
+        self.assertEqual(names.find('Wi', 'Actor'), expected)
+        self.assertTrue(len(expected) > 0)
+        response = self.app.get("/search?q=wi&group=Actor&limit=50")
+        data = json.loads(response.get_data(as_text=True))
+        self.assertTrue(all('wi' in actor['name'].lower() for actor in data))
+
+    def test_analytics(self):
+        """
+        Test that the analytics endpoints answer from aggregates matching a full rescan
+        :return:
+        """
+        connections = Analyze(graph).get_hub_actors()[0]
+        response = self.app.get("/analytics/hub_actors?limit=5")
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEqual(len(data), 5)
+        self.assertTrue(all(actor['connections'] == connections[actor['name']] for actor in data))
+        self.assertEqual([actor['connections'] for actor in data],
+                         sorted(connections.values(), reverse=True)[:5])
+
+        response = self.app.get("/analytics/gross_age?limit=3")
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEqual([(age['age'], age['gross']) for age in data],
+                         sorted(Analyze(graph).get_gross_age()[0].items(),
+                                key=lambda item: item[1], reverse=True)[:3])
+
+        response = self.app.get("/analytics/top_actors?limit=3")
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEqual([(actor['name'], actor['gross']) for actor in data],
+                         Query(graph).get_top_actors(3))
+
+        response = self.app.get("/analytics/top_actors?limit=0")
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_cached(self):
+        """
+        Test that unchanged responses are answered 304 until the graph changes
+        :return:
+        """
+        response = self.app.get("/actors/Bruce Willis")
+        etag = response.headers['ETag']
+
+        response = self.app.get("/actors/Bruce Willis", headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        self.app.put('/api/a/actors/Bruce Willis', data=json.dumps({'gross': 562709190}),
+                     headers=self.headers)
+        response = self.app.get("/actors/Bruce Willis", headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEqual(data['Bruce Willis']['gross'], 562709190)
+
+    def test_get_wrong_group(self):
+        """
+        Test that looking an entity up under the wrong group is not found
+        :return:
+        """
+        response = self.app.get("/actors/The Verdict")
+        self.assertEqual(response.status_code, 404)
+
+        response = self.app.get("/movies/Bruce Willis")
+        self.assertEqual(response.status_code, 404)
+
+        response = self.app.put('/api/a/movies/Bruce Willis',
+                                data=json.dumps({'year': 2005}),
+                                headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+        response = self.app.delete('/api/a/actors/The Verdict')
+        self.assertEqual(response.status_code, 404)
+
     def test_put_valid(self):
         """
         Test that valid PUT requests are processed correctly
@@ -144,6 +279,75 @@ class TestAPI(unittest.TestCase):
                                  headers=self.headers)
         self.assertEqual(response.status_code, 400)
 
+        data = {'name': 5, 'age': 100, 'gross': 100}
+        response = self.app.post('/api/a/actors/',
+                                 data=json.dumps(data),
+                                 headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch(self):
+        """
+        Test that a batch of operations is applied with a result per operation
+        :return:
+        """
+        operations = [{'op': 'create', 'group': 'Actor', 'name': 'Edward Collaguazo', 'age': 30},
+                      {'op': 'update', 'group': 'Actor', 'name': 'Edward Collaguazo', 'gross': 10},
+                      {'op': 'update', 'group': 'Movie', 'name': 'The Life of Edward Collaguazo'},
+                      {'op': 'delete', 'group': 'Movie', 'name': 'Hudson Hawk'},
+                      {'op': 'delete', 'group': 'Movie', 'name': 'Sunset'}]
+        response = self.app.post('/api/a/batch', data=json.dumps(operations), headers=self.headers)
+        results = json.loads(response.get_data(as_text=True))['results']
+        self.assertEqual([result['status'] for result in results], [201, 200, 404, 200, 200])
+        self.assertEqual(results[1]['result'], {'name': 'Edward Collaguazo', 'age': 30, 'gross': 10})
+
+        response = self.app.get("/movies/Hudson Hawk")
+        self.assertEqual(response.status_code, 404)
+        response = self.app.get("/actors?name=Bruce Willis")
+        self.assertTrue('Bruce Willis' in json.loads(response.get_data(as_text=True)))
+
+        lines = '\n'.join(json.dumps(operation) for operation in
+                          [{'op': 'delete', 'group': 'Actor', 'name': 'Edward Collaguazo'},
+                           {'op': 'rename', 'group': 'Actor', 'name': 'Bruce Willis'}])
+        response = self.app.post('/api/a/batch', data=lines,
+                                 headers={'Content-Type': 'application/x-ndjson'})
+        results = json.loads(response.get_data(as_text=True))['results']
+        self.assertEqual([result['status'] for result in results], [200, 400])
+
+        response = self.app.post('/api/a/batch', data=json.dumps({'op': 'create'}), headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+        # Malformed names fail their own operation only
+        operations = [{'op': 'create', 'group': 'Actor', 'name': 'Sissy Spacek', 'age': 69},
+                      {'op': 'create', 'group': 'Actor', 'name': ['x']},
+                      {'op': 'delete', 'group': 'Actor', 'name': {'x': 1}}]
+        response = self.app.post('/api/a/batch', data=json.dumps(operations), headers=self.headers)
+        results = json.loads(response.get_data(as_text=True))['results']
+        self.assertEqual([result['status'] for result in results], [201, 400, 400])
+
+        # A name can only be deleted once per run of deletes
+        operations = [{'op': 'delete', 'group': 'Actor', 'name': 'Sissy Spacek'}] * 2
+        response = self.app.post('/api/a/batch', data=json.dumps(operations), headers=self.headers)
+        results = json.loads(response.get_data(as_text=True))['results']
+        self.assertEqual([result['status'] for result in results], [200, 400])
+
+    def test_log_failure(self):
+        """
+        Test that a failed mutation log write raises, which is a 500 outside testing, and releases the lock
+        :return:
+        """
+        from unittest import mock
+        log = mock.Mock()
+        log.append.side_effect = OSError('No space left on device')
+        with mock.patch('app.mutations', log):
+            data = {'name': 'Edward Collaguazo Jr.', 'age': 1, 'gross': 1}
+            with self.assertRaises(OSError):
+                self.app.post('/api/a/actors/', data=json.dumps(data), headers=self.headers)
+
+        response = self.app.get('/actors/Bruce Willis')
+        self.assertEqual(response.status_code, 200)
+        response = self.app.delete('/api/a/actors/Edward Collaguazo Jr.')
+        self.assertEqual(response.status_code, 200)
+
     def test_delete_valid(self):
         """
         Test that valid DELETE requests are processed correctly
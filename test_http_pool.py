@@ -0,0 +1,75 @@
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Thread
+from urllib.error import HTTPError
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/redirect':
+            self.send_response(301)
+            self.send_header('Location', '/page')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif self.path == '/page':
+            body = b'<h1>page</h1>'
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class ConnectionPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_reuse_connection(self):
+        """
+        Check that consecutive requests to a host share one keep-alive connection
+        :return: None
+        """
+        from http_pool import ConnectionPool
+        pool = ConnectionPool(max_per_host=2)
+        for _ in range(3):
+            self.assertEqual(pool.request(self.url + '/page').body, b'<h1>page</h1>')
+        pool.close()
+
+        stats = pool.get_stats()
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['new_connections'], 1)
+        self.assertEqual(stats['hits'], 2)
+
+    def test_redirect_and_error(self):
+        """
+        Check that redirects are followed and error statuses raise HTTPError
+        :return: None
+        """
+        from http_pool import ConnectionPool
+        pool = ConnectionPool()
+        response = pool.request(self.url + '/redirect')
+        self.assertEqual(response.url, self.url + '/page')
+        self.assertEqual(response.body, b'<h1>page</h1>')
+
+        with self.assertRaises(HTTPError) as context:
+            pool.request(self.url + '/missing')
+        self.assertEqual(context.exception.code, 404)
+        pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
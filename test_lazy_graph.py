@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+
+class LazyGraphTestCase(unittest.TestCase):
+    def setUp(self):
+        from graph import Graph
+        from snapshot import save_snapshot
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'graph.snap')
+        graph = Graph()
+        graph.add_vertex("Movie", "Se7en", 327311859, 1995)
+        graph.add_vertex("Movie", "Unforgiven", 159157447, 1992)
+        graph.add_vertex("Actor", "Morgan Freeman", 81)
+        graph.add_vertex("Actor", "Clint Eastwood", 88)
+        graph.add_edge("Se7en", "Morgan Freeman", 4040887)
+        graph.add_edge("Unforgiven", "Morgan Freeman", 1964906)
+        graph.add_edge("Unforgiven", "Clint Eastwood", 1808154)
+        save_snapshot(graph, self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_lookup_on_demand(self):
+        """
+        Check that only the vertices looked up are decoded, and that the cache is bounded
+        :return: None
+        """
+        from lazy_graph import LazyGraph
+        graph = LazyGraph(self.path, cache_size=2)
+        self.assertEqual(len(graph.cache), 0)
+
+        vertex = graph.get_vertex("Morgan Freeman")
+        self.assertEqual(len(graph.cache), 1)
+        self.assertEqual(dict(vertex.get_neighbors()), {"Se7en": 4040887, "Unforgiven": 1964906})
+        self.assertEqual(graph.get_vertex("Morgan Freeman") is vertex, True)
+        self.assertEqual(graph.get_vertex("Morgan Freeman", "Movie"), None)
+        self.assertEqual(graph.get_vertex("Heat"), None)
+
+        self.assertEqual(len(list(graph)), 4)
+        self.assertEqual(len(graph.cache), 2)
+        self.assertEqual("Se7en" in graph.get_vertices(), True)
+
+        # Changes would be lost when the vertex is evicted, so they are refused
+        self.assertRaises(TypeError, vertex.set_value1, 82)
+        self.assertRaises(TypeError, vertex.get_neighbors().__setitem__, "Heat", 1)
+        self.assertRaises(TypeError, vertex.get_neighbors().__delitem__, "Se7en")
+        self.assertEqual(vertex.get_value1(), 81)
+        graph.close()
+
+    def test_query(self):
+        """
+        Check that queries run against a lazy graph like against a loaded one
+        :return: None
+        """
+        from lazy_graph import LazyGraph
+        from query import Query
+        graph = LazyGraph(self.path)
+        query = Query(graph)
+
+        self.assertEqual(query.get_oldest_actors(1), [("Clint Eastwood", 88)])
+        self.assertEqual(query.get_movies_year(1992), ["Unforgiven"])
+        self.assertEqual(sorted(query.get_actors("Unforgiven")), ["Clint Eastwood", "Morgan Freeman"])
+        self.assertEqual(query.get_gross("Se7en"), 327311859)
+        graph.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+DATA = [{'Morgan Freeman': {'json_class': 'Actor', 'name': 'Morgan Freeman', 'age': 81,
+                            'total_gross': 4040887, 'movies': ['Se7en']}},
+        {'Se7en': {'json_class': 'Movie', 'name': 'Se7en', 'wiki_page': '', 'box_office': 327311859,
+                   'year': 1995, 'actors': ['Morgan Freeman']}}]
+
+
+class MutationLogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.data_path = os.path.join(self.directory.name, 'data.json')
+        with open(self.data_path, 'w') as data_file:
+            json.dump(DATA, data_file)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_replay(self):
+        """
+        Check that logged mutations are replayed over the data file after a restart
+        :return: None
+        """
+        from mutation_log import MutationLog
+        log_directory = os.path.join(self.directory.name, 'log')
+        log = MutationLog(log_directory)
+        log.load(self.data_path)
+        log.sync(log.append([{'op': 'create', 'group': 'Actor', 'name': 'Sissy Spacek',
+                              'value1': 69, 'value2': 1964906}]))
+        log.sync(log.append([{'op': 'update', 'group': 'Actor', 'name': 'Morgan Freeman',
+                              'value1': 82, 'value2': 4040887},
+                             {'op': 'delete', 'names': ['Se7en']}]))
+        log.close()
+
+        log = MutationLog(log_directory)
+        graph = log.load(self.data_path)
+        log.close()
+        self.assertEqual(graph.get_vertex('Sissy Spacek', 'Actor').get_value1(), 69)
+        self.assertEqual(graph.get_vertex('Morgan Freeman').get_value1(), 82)
+        self.assertEqual(graph.get_vertex('Se7en'), None)
+        self.assertEqual(len(graph.get_vertex('Morgan Freeman').get_neighbors()), 0)
+
+    def test_torn_tail(self):
+        """
+        Check that a line torn by a crash is cut off, so later appends survive a restart
+        :return: None
+        """
+        from mutation_log import MutationLog
+        log_directory = os.path.join(self.directory.name, 'log')
+        log = MutationLog(log_directory)
+        log.load(self.data_path)
+        log.sync(log.append([{'op': 'create', 'group': 'Actor', 'name': 'A1', 'value1': 1, 'value2': 1}]))
+        log.close()
+        with open(log.log_path, 'a') as log_file:
+            log_file.write('[{"op": "create", "gro')
+
+        log = MutationLog(log_directory)
+        log.load(self.data_path)
+        log.sync(log.append([{'op': 'create', 'group': 'Actor', 'name': 'A2', 'value1': 2, 'value2': 2}]))
+        log.close()
+
+        log = MutationLog(log_directory)
+        graph = log.load(self.data_path)
+        log.close()
+        self.assertEqual(graph.get_vertex('A1').get_value1(), 1)
+        self.assertEqual(graph.get_vertex('A2').get_value1(), 2)
+        self.assertEqual(log.lines, 2)
+
+    def test_compact(self):
+        """
+        Check that compaction snapshots the graph and empties the log
+        :return: None
+        """
+        from mutation_log import MutationLog, apply_mutation
+        log_directory = os.path.join(self.directory.name, 'log')
+        log = MutationLog(log_directory, compact_every=2)
+        graph = log.load(self.data_path)
+        for age in (82, 83):
+            mutation = {'op': 'update', 'group': 'Actor', 'name': 'Morgan Freeman',
+                        'value1': age, 'value2': 4040887}
+            apply_mutation(graph, mutation)
+            log.append([mutation])
+        self.assertEqual(log.should_compact(), True)
+        log.compact(graph)
+        log.close()
+
+        self.assertEqual(os.path.getsize(log.log_path), 0)
+        log = MutationLog(log_directory)
+        graph = log.load(self.data_path)
+        log.close()
+        self.assertEqual(graph.get_vertex('Morgan Freeman').get_value1(), 83)
+        self.assertEqual(list(graph.get_vertex('Se7en').get_neighbors()), ['Morgan Freeman'])
+        # The weight is still the one derived from the age when the data was first loaded
+        self.assertEqual(graph.get_vertex('Se7en').get_weight('Morgan Freeman'), 327311859 / 81)
+
+    def test_group_commit(self):
+        """
+        Check that concurrent writers share fsyncs instead of syncing once each
+        :return: None
+        """
+        from mutation_log import MutationLog
+        log = MutationLog(os.path.join(self.directory.name, 'log'))
+        fsync = os.fsync
+        started = threading.Event()
+
+        def slow_fsync(fd):
+            started.set()
+            threading.Event().wait(0.05)
+            fsync(fd)
+
+        def write(name):
+            log.sync(log.append([{'op': 'delete', 'names': [name]}]))
+
+        with mock.patch('os.fsync', side_effect=slow_fsync) as patched:
+            first = threading.Thread(target=write, args=('first',))
+            first.start()
+            started.wait()
+            writers = [threading.Thread(target=write, args=(str(i),)) for i in range(8)]
+            for writer in writers:
+                writer.start()
+            for writer in [first] + writers:
+                writer.join()
+            self.assertEqual(patched.call_count <= 3, True)
+        log.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import tempfile
+
+
+class PageCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_get_put(self):
+        """
+        Check that stored pages are returned for equivalent urls
+        :return: None
+        """
+        from page_cache import PageCache
+        cache = PageCache(self.directory.name)
+        self.assertEqual(cache.get('https://en.wikipedia.org/wiki/Morgan_Freeman'), None)
+
+        cache.put('https://en.wikipedia.org/wiki/Morgan_Freeman', b'<h1>Morgan Freeman</h1>')
+        self.assertEqual(cache.get('HTTPS://en.wikipedia.org:443/wiki/Morgan_Freeman#Career'),
+                         b'<h1>Morgan Freeman</h1>')
+        self.assertEqual(cache.get_stats()['hits'], 1)
+        cache.close()
+
+    def test_ttl(self):
+        """
+        Check that expired pages are not returned
+        :return: None
+        """
+        from page_cache import PageCache
+        cache = PageCache(self.directory.name, ttl=-1)
+        cache.put('https://en.wikipedia.org/wiki/Heat_(1995_film)', b'<h1>Heat</h1>')
+        self.assertEqual(cache.get('https://en.wikipedia.org/wiki/Heat_(1995_film)'), None)
+        cache.close()
+
+    def test_lru_eviction(self):
+        """
+        Check that the least recently used pages are evicted once over the size limit
+        :return: None
+        """
+        import os
+        from page_cache import PageCache
+        # Random bodies do not compress, so only two of them fit
+        cache = PageCache(self.directory.name, max_bytes=2100)
+        first, second, third = os.urandom(1000), os.urandom(1000), os.urandom(1000)
+        cache.put('https://en.wikipedia.org/wiki/A', first)
+        cache.put('https://en.wikipedia.org/wiki/B', second)
+        cache.get('https://en.wikipedia.org/wiki/A')
+        cache.put('https://en.wikipedia.org/wiki/C', third)
+
+        self.assertEqual(cache.get('https://en.wikipedia.org/wiki/A'), first)
+        self.assertEqual(cache.get('https://en.wikipedia.org/wiki/B'), None)
+        self.assertEqual(cache.get('https://en.wikipedia.org/wiki/C'), third)
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+        cache.close()
+
+    def test_shared_body_eviction(self):
+        """
+        Check that a body shared by several urls is only freed once all of them are evicted
+        :return: None
+        """
+        import os
+        from page_cache import PageCache
+        cache = PageCache(self.directory.name, max_bytes=2100)
+        first, second, third = os.urandom(1000), os.urandom(1000), os.urandom(1000)
+        cache.put('https://en.wikipedia.org/wiki/B', second)
+        cache.put('https://en.wikipedia.org/wiki/Redirect_to_B', second)
+        cache.put('https://en.wikipedia.org/wiki/A', first)
+        cache.put('https://en.wikipedia.org/wiki/C', third)
+
+        self.assertEqual(cache.get('https://en.wikipedia.org/wiki/Redirect_to_B'), None)
+        self.assertEqual(cache.get('https://en.wikipedia.org/wiki/A'), first)
+        self.assertEqual(cache.get('https://en.wikipedia.org/wiki/C'), third)
+        self.assertEqual(cache.get_stats()['evictions'], 2)
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
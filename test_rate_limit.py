@@ -0,0 +1,79 @@
+import unittest
+from unittest import mock
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.waits = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.waits.append(seconds)
+        self.now += seconds
+
+
+class RateLimiterTestCase(unittest.TestCase):
+    def test_token_bucket(self):
+        """
+        Check that requests beyond the burst are spaced out at the steady rate
+        :return: None
+        """
+        from rate_limit import RateLimiter
+        clock = FakeClock()
+        limiter = RateLimiter(rate=2, burst=2, clock=clock.time, wait=clock.sleep)
+        for _ in range(4):
+            limiter.acquire('https://en.wikipedia.org/wiki/Heat_(1995_film)')
+
+        self.assertEqual(clock.waits, [0.5, 0.5])
+
+        # Other hosts have their own bucket
+        self.assertEqual(limiter.acquire('https://www.boxofficemojo.com/'), 0)
+
+    def test_throttle(self):
+        """
+        Check that a refused host is blocked for Retry-After, slowed down, then recovers
+        :return: None
+        """
+        from rate_limit import RateLimiter
+        clock = FakeClock()
+        limiter = RateLimiter(rate=4, burst=4, recovery=1, clock=clock.time, wait=clock.sleep)
+        url = 'https://en.wikipedia.org/wiki/Morgan_Freeman'
+
+        limiter.throttle(url, '3')
+        self.assertEqual(limiter.get_rate(url), 2)
+        self.assertEqual(limiter.acquire(url), 3)
+
+        limiter.success(url)
+        limiter.success(url)
+        limiter.success(url)
+        self.assertEqual(limiter.get_rate(url), 4)
+
+    def test_request_url_retry(self):
+        """
+        Check that 429 responses are retried after backing off
+        :return: None
+        """
+        from urllib.error import HTTPError
+        from rate_limit import RateLimiter
+        import scraper
+        clock = FakeClock()
+        limiter = RateLimiter(clock=clock.time, wait=clock.sleep)
+        refused = HTTPError('https://en.wikipedia.org/wiki/Se7en', 429, 'Too Many Requests',
+                            {'Retry-After': '2'}, None)
+        response = mock.Mock(status=200, body=b'<h1>Se7en</h1>')
+
+        with mock.patch('scraper.LIMITER', limiter), \
+                mock.patch('scraper.POOL.request', side_effect=[refused, response]):
+            self.assertEqual(scraper.request_url('https://en.wikipedia.org/wiki/Se7en'), response)
+        self.assertEqual(clock.waits, [2])
+
+        with mock.patch('scraper.LIMITER', limiter), \
+                mock.patch('scraper.POOL.request', side_effect=[refused] * 5):
+            self.assertEqual(scraper.request_url('https://en.wikipedia.org/wiki/Se7en'), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
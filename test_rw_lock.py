@@ -0,0 +1,106 @@
+import threading
+import unittest
+
+
+class ReadWriteLockTestCase(unittest.TestCase):
+    def test_readers_share(self):
+        """
+        Check that several readers hold the lock together while a writer waits for them
+        :return: None
+        """
+        from rw_lock import ReadWriteLock
+        lock = ReadWriteLock()
+        lock.acquire_read()
+        lock.acquire_read()
+        self.assertEqual(lock.readers, 2)
+
+        written = threading.Event()
+
+        def write():
+            with lock.write_locked():
+                written.set()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        self.assertEqual(written.wait(0.1), False)
+
+        lock.release_read()
+        lock.release_read()
+        writer.join(1)
+        self.assertEqual(written.is_set(), True)
+
+    def test_waiting_writer_blocks_readers(self):
+        """
+        Check that new readers queue behind a waiting writer
+        :return: None
+        """
+        from rw_lock import ReadWriteLock
+        lock = ReadWriteLock()
+        order = []
+        lock.acquire_read()
+
+        def write():
+            with lock.write_locked():
+                order.append('write')
+
+        def read():
+            with lock.read_locked():
+                order.append('read')
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        while not lock.waiting_writers:
+            pass
+        reader = threading.Thread(target=read)
+        reader.start()
+
+        lock.release_read()
+        writer.join(1)
+        reader.join(1)
+        self.assertEqual(order, ['write', 'read'])
+
+    def test_concurrent_mutation(self):
+        """
+        Check that readers never see a vertex half deleted while writers delete vertices
+        :return: None
+        """
+        from graph import Graph
+        from rw_lock import ReadWriteLock
+        lock = ReadWriteLock()
+        g = Graph()
+        g.add_vertex("Actor", "Morgan Freeman", 81)
+        for i in range(200):
+            g.add_vertex("Movie", f"Movie {i}", 1000, 1995)
+            g.add_edge(f"Movie {i}", "Morgan Freeman", i)
+        errors = []
+
+        @lock.writing
+        def delete_movie(title):
+            g.get_vertex(title).get_neighbors().clear()
+            del g.get_vertex("Morgan Freeman").get_neighbors()[title]
+            g.delete_vertex(title)
+
+        @lock.reading
+        def check():
+            for movie in g.get_vertex("Morgan Freeman").get_neighbors():
+                if g.get_vertex(movie) is None:
+                    errors.append(movie)
+
+        def read():
+            for _ in range(200):
+                check()
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for i in range(200):
+            delete_movie(f"Movie {i}")
+        for reader in readers:
+            reader.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(g.get_vertex("Morgan Freeman").get_neighbors()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+import unittest
+from unittest import mock
+
+ACTOR_PAGE = '<html><body><h1 class="firstHeading">{name}</h1>' \
+             '<span class="noprint ForceAgeToShow">(age {age})</span>' \
+             '<div class="div-col columns column-width">{links}</div></body></html>'
+MOVIE_PAGE = '<html><body><h1 class="firstHeading">{title}</h1><table class="infobox">' \
+             '<tr><th>Starring</th><td>{links}</td></tr>' \
+             '<tr><th>Release date</th><td><div><ul><li>May 1, {year}</li></ul></div></td></tr>' \
+             '<tr><th>Box office</th><td>${gross}</td></tr></table></body></html>'
+
+
+def link(page):
+    return f'<a href="/wiki/{page}">{page}</a>'
+
+
+def wiki(page):
+    return 'https://en.wikipedia.org/wiki/' + page
+
+
+PAGES = {
+    wiki('Actor_A'): ACTOR_PAGE.format(name='Actor A', age=50,
+                                       links=link('Movie_1') + link('Movie_2')),
+    wiki('Actor_B'): ACTOR_PAGE.format(name='Actor B', age=40, links=link('Movie_1')),
+    wiki('Actor_C'): ACTOR_PAGE.format(name='Actor C', age=25, links=link('Movie_2')),
+    wiki('Movie_1'): MOVIE_PAGE.format(title='Movie 1', year=2001, gross=5000000,
+                                       links=link('Actor_A') + link('Actor_B')),
+    wiki('Movie_2'): MOVIE_PAGE.format(title='Movie 2', year=2010, gross=7500000,
+                                       links=link('Actor_A') + link('Actor_C')),
+}
+
+
+def fake_open_url(url, cache=None):
+    page = PAGES.get(url)
+    return page.encode() if page is not None else None
+
+
+class ScraperTestCase(unittest.TestCase):
+    def check_graph(self, graph):
+        self.assertEqual(set(graph.get_vertices()),
+                         {'Actor A', 'Actor B', 'Actor C', 'Movie 1', 'Movie 2'})
+        self.assertEqual(graph.get_vertex('Movie 1').get_value1(), 5000000)
+        self.assertEqual(graph.get_vertex('Movie 2').get_value2(), 2010)
+        self.assertEqual(graph.get_vertex('Actor C').get_value1(), 25)
+        self.assertEqual(graph.get_vertex('Actor A').get_weight('Movie 1'), 100000)
+        self.assertEqual(graph.get_vertex('Actor A').get_weight('Movie 2'), 150000)
+        self.assertEqual(graph.get_vertex('Actor B').get_weight('Movie 1'), 125000)
+        self.assertEqual(graph.get_vertex('Movie 2').get_weight('Actor C'), 300000)
+
+    def test_scrape_concurrent(self):
+        """
+        Check that the concurrent crawl follows movie and actor links
+        :return: None
+        """
+        from scraper import Scraper
+        with mock.patch('scraper.open_url', side_effect=fake_open_url):
+            scraper = Scraper()
+            scraper.scrape_concurrent(wiki('Actor_A'), 'Actor', concurrency=4)
+
+        self.check_graph(scraper.get_graph())
+        self.assertEqual(scraper.num_movies, 2)
+        self.assertEqual(scraper.num_actors, 3)
+
+    def test_scrape_concurrent_threshold(self):
+        """
+        Check that the concurrent crawl stops once the thresholds are met
+        :return: None
+        """
+        from scraper import Scraper
+        with mock.patch('scraper.open_url', side_effect=fake_open_url), \
+                mock.patch('scraper.MOVIE_THRESHOLD', 1), \
+                mock.patch('scraper.ACTOR_THRESHOLD', 1):
+            scraper = Scraper()
+            scraper.scrape_concurrent(wiki('Actor_A'), 'Actor', concurrency=1)
+
+        self.assertEqual(scraper.num_actors, 1)
+        self.assertEqual(scraper.num_movies, 1)
+
+    def test_scrape_concurrent_processes(self):
+        """
+        Check that parsing pages in worker processes builds the same graph
+        :return: None
+        """
+        from scraper import Scraper
+        with mock.patch('scraper.open_url', side_effect=fake_open_url):
+            scraper = Scraper()
+            scraper.scrape_concurrent(wiki('Actor_A'), 'Actor', concurrency=4, processes=2)
+
+        self.check_graph(scraper.get_graph())
+
+    def test_extract_page(self):
+        """
+        Check that the single pass extractor finds the same information
+        as the BeautifulSoup extraction functions on the saved fixture pages
+        :return: None
+        """
+        from benchmark import benchmark
+        rows = benchmark(repeat=1)
+        self.assertEqual(len(rows), 3)
+        for name, _, _, match in rows:
+            self.assertTrue(match, name)
+
+    def test_resume(self):
+        """
+        Check that a crawl resumed from a checkpoint finishes the graph
+        without fetching the pages scraped before the checkpoint
+        :return: None
+        """
+        import tempfile
+        from checkpoint import Checkpoint
+        from scraper import Scraper
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch('scraper.open_url', side_effect=fake_open_url), \
+                    mock.patch('scraper.MOVIE_THRESHOLD', 1), \
+                    mock.patch('scraper.ACTOR_THRESHOLD', 1):
+                scraper = Scraper(checkpoint=Checkpoint(directory, interval=1))
+                scraper.scrape_concurrent(wiki('Actor_A'), 'Actor', concurrency=1)
+
+            with mock.patch('scraper.open_url', side_effect=fake_open_url) as fetch:
+                scraper = Scraper(checkpoint=Checkpoint(directory, interval=1))
+                url, group = scraper.resume()
+                scraper.scrape_concurrent(url, group, concurrency=4)
+
+        self.check_graph(scraper.get_graph())
+        fetched = [call.args[0] for call in fetch.call_args_list]
+        self.assertNotIn(wiki('Actor_A'), fetched)
+        self.assertNotIn(wiki('Movie_1'), fetched)
+
+    def test_refresh(self):
+        """
+        Check that a refresh only re-parses changed pages and re-weights their edges
+        :return: None
+        """
+        import tempfile
+        from hashlib import md5
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        from threading import Thread
+        from page_cache import PageCache
+        from scraper import Scraper
+        pages = {'/actor': PAGES[wiki('Actor_A')], '/movie': PAGES[wiki('Movie_1')]}
+        not_modified = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                body = pages[self.path].encode()
+                etag = '"' + md5(body).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    not_modified.append(self.path)
+                    self.send_response(304)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_port}'
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                scraper = Scraper(cache=PageCache(directory))
+                scraper.movie_urls = {url + '/movie': 'Movie 1'}
+                scraper.actor_urls = {url + '/actor': 'Actor A'}
+                graph = scraper.get_graph()
+                graph.add_vertex('Movie', 'Movie 1', 5000000, 2001)
+                graph.add_vertex('Actor', 'Actor A', 50)
+                graph.add_edge('Movie 1', 'Actor A', 100000)
+
+                self.assertEqual(scraper.refresh(), 0)
+                pages['/actor'] = ACTOR_PAGE.format(name='Actor A', age=40, links=link('Movie_1'))
+                self.assertEqual(scraper.refresh(), 1)
+                scraper.cache.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(not_modified, ['/movie'])
+        self.assertEqual(graph.get_vertex('Actor A').get_value1(), 40)
+        self.assertEqual(graph.get_vertex('Movie 1').get_weight('Actor A'), 125000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import struct
+import tempfile
+import unittest
+
+
+class SnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        from graph import Graph
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'graph.snap')
+        self.graph = Graph()
+        self.graph.add_vertex("Movie", "Se7en", 327311859, 1995)
+        self.graph.add_vertex("Movie", "Unforgiven", 159157447.5, "1992")
+        self.graph.add_vertex("Actor", "Morgan Freeman", 81)
+        self.graph.add_edge("Se7en", "Morgan Freeman", 4040887)
+        self.graph.add_edge("Unforgiven", "Morgan Freeman", 1964906)
+        # A neighbor which was never scraped into a vertex of its own
+        self.graph.get_vertex("Se7en").add_neighbor("Brad Pitt", 12)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        """
+        Check that a graph loaded from its snapshot matches the saved graph
+        :return: None
+        """
+        from snapshot import save_snapshot, load_snapshot
+        save_snapshot(self.graph, self.path)
+        graph = load_snapshot(self.path)
+
+        self.assertEqual(len(graph.get_vertices()), 3)
+        for vertex in self.graph:
+            loaded = graph.get_vertex(vertex.get_key(), vertex.get_group())
+            self.assertEqual((loaded.get_value1(), loaded.get_value2()),
+                             (vertex.get_value1(), vertex.get_value2()))
+            self.assertEqual(dict(loaded.get_neighbors()), dict(vertex.get_neighbors()))
+        self.assertEqual(graph.get_vertex("Brad Pitt"), None)
+        self.assertEqual([v.get_key() for v in graph.find_vertices("Movie", "value2", 1995)], ["Se7en"])
+
+    def test_key_ids(self):
+        """
+        Check that a graph loaded from its snapshot keeps its key ids and vertex order
+        :return: None
+        """
+        from snapshot import save_snapshot, load_snapshot
+        self.graph.delete_vertex("Se7en")
+        save_snapshot(self.graph, self.path)
+        graph = load_snapshot(self.path)
+
+        for key in ["Se7en", "Unforgiven", "Morgan Freeman", "Brad Pitt"]:
+            self.assertEqual(graph.table.get_id(key), self.graph.table.get_id(key))
+        self.assertEqual([vertex.get_key() for vertex in graph], ["Unforgiven", "Morgan Freeman"])
+        self.assertEqual(list(graph.iter_group("Actor")), [(2, graph.get_vertex("Morgan Freeman"))])
+
+    def test_mapped_lookup(self):
+        """
+        Check that a mapped snapshot finds vertices by binary search and rejects other versions
+        :return: None
+        """
+        from snapshot import save_snapshot, Snapshot, HEADER
+        save_snapshot(self.graph, self.path)
+        snapshot = Snapshot(self.path)
+        i = snapshot.find("Morgan Freeman")
+        self.assertEqual(snapshot.get_group(i), "Actor")
+        self.assertEqual(snapshot.get_value(i, 0), 81)
+        self.assertEqual(sorted(snapshot.get_neighbors(i)), [("Se7en", 4040887), ("Unforgiven", 1964906)])
+        self.assertEqual(snapshot.find("Heat"), None)
+        self.assertEqual(snapshot.has_vertex(snapshot.find("Brad Pitt")), False)
+        snapshot.close()
+
+        with open(self.path, 'r+b') as snapshot_file:
+            snapshot_file.seek(8)
+            snapshot_file.write(struct.pack('<I', 99))
+        self.assertRaises(ValueError, Snapshot, self.path)
+        self.assertEqual(HEADER.size % 8, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
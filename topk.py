@@ -0,0 +1,85 @@
+from heapq import heappush, heapreplace
+import operator
+
+"""
+Program: topk.py
+
+Top-k selection with a bounded min-heap, so the num largest of n items cost
+O(n log num) instead of a full sort, and items can be pushed as they are
+produced. Results are ordered like sorted(..., reverse=True)[:num], ties
+keeping their input order. TopKCache keeps results until the graph changes.
+"""
+
+
+class TopK:
+    def __init__(self, num, key=operator.itemgetter(1)):
+        """
+        Initialize the TopK object
+        :param num: The number of items to keep
+        :param key: Function giving the value items are compared by
+        """
+        self.num = max(num, 0)
+        self.key = key
+        # Min-heap of (value, -sequence, item), the smallest kept item on top and
+        # the latest of equal items before the earlier ones
+        self.heap = []
+        self.sequence = 0
+
+    def push(self, item):
+        entry = (self.key(item), -self.sequence, item)
+        self.sequence += 1
+        if len(self.heap) < self.num:
+            heappush(self.heap, entry)
+        elif self.heap and entry[:2] > self.heap[0][:2]:
+            heapreplace(self.heap, entry)
+
+    def extend(self, items):
+        for item in items:
+            self.push(item)
+        return self
+
+    def items(self):
+        """
+        Get the kept items
+        :return: List of at most num items, largest first
+        """
+        return [entry[2] for entry in sorted(self.heap, key=operator.itemgetter(0, 1), reverse=True)]
+
+
+def top_k(items, num, key=operator.itemgetter(1)):
+    """
+    Select the num largest items of an iterable in a single pass
+    :param items: Iterable of items, such as the (key, value) pairs of a dictionary
+    :param num: The number of items to return
+    :param key: Function giving the value items are compared by
+    :return: List of at most num items, largest first
+    """
+    return TopK(num, key).extend(items).items()
+
+
+class TopKCache:
+    def __init__(self, graph):
+        """
+        Initialize the TopKCache object
+        :param graph: The graph the cached results are computed from
+        """
+        self.graph = graph
+        self.version = None
+        self.results = {}
+
+    def get(self, name, num, compute):
+        """
+        Retrieve a top-k result, computing it only if the graph changed since it was cached
+        :param name: The name of the query
+        :param num: The number of items asked for
+        :param compute: Function of num computing the result
+        :return: The result
+        """
+        if self.version != self.graph.version:
+            self.version = self.graph.version
+            self.results = {}
+        result = self.results.get((name, num))
+        if result is None:
+            result = self.results[(name, num)] = compute(num)
+        # Callers get their own list, so changing it cannot corrupt the cache
+        return list(result)
@@ -1,11 +1,16 @@
 import logging.config
-import operator
+import json
+import time
+import os
 
 import jsonpickle
 import yaml
 from matplotlib import pyplot as plt
 
 from graph import Graph
+from lazy_graph import LazyGraph
+from snapshot import load_snapshot, save_snapshot
+from topk import top_k
 
 with open('config.yaml', 'r') as f:
     config = yaml.safe_load(f.read())
@@ -13,6 +18,9 @@ with open('config.yaml', 'r') as f:
 
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 1 << 16
+SNAPSHOT_SUFFIX = '.snap'
+
 
 def save(filename, obj):
     """
@@ -45,29 +53,152 @@ def load(filename):
     return data
 
 
-def parse(filename):
+def load_graph(filename, loader, lazy=False):
+    """
+    Load a graph from its binary snapshot if it is newer than the data file,
+    otherwise load the data file and write the snapshot for the next start
+    :param filename: The data file of the graph
+    :param loader: The function loading the data file, such as load or parse
+    :param lazy: If a read-only LazyGraph decoding vertices on demand is returned
+    :return: The graph
     """
-    Parse the data in 'filename' to our graph data_structure
+    snapshot_path = os.path.splitext(filename)[0] + SNAPSHOT_SUFFIX
+    if os.path.exists(snapshot_path) and os.path.getmtime(snapshot_path) >= os.path.getmtime(filename):
+        try:
+            return LazyGraph(snapshot_path) if lazy else load_snapshot(snapshot_path)
+        except (OSError, ValueError) as error:
+            logger.warning(f'Ignoring unreadable snapshot {snapshot_path}: {error}')
+
+    graph = loader(filename)
+    try:
+        save_snapshot(graph, snapshot_path)
+    except OSError as error:
+        logger.warning(f'Could not write snapshot {snapshot_path}: {error}')
+        return graph
+    return LazyGraph(snapshot_path) if lazy else graph
+
+
+def parse(filename, chunk_size=CHUNK_SIZE):
+    """
+    Parse the data in 'filename' to our graph data_structure, reading the file
+    once and adding each actor and movie to the graph as soon as it is read
     :param filename: The JSON file to load
+    :param chunk_size: The number of characters read from the file at a time
     :return: The graph representation of the data from the JSON file
     """
+    start = time.perf_counter()
     graph = Graph()
-    actor_data = load(filename)[0]
-    movie_data = load(filename)[1]
 
-    for key, value in actor_data.items():
-        age, group, movies, name, total_gross = value.values()
-        graph.add_vertex(group, key, age, total_gross)
+    # Fields are read by name, the order they are saved in differs between scrapes
+    for section, key, value in iter_records(filename, chunk_size):
+        if value['json_class'] == 'Actor':
+            graph.add_vertex('Actor', key, value['age'], value['total_gross'])
+            continue
+
+        gross = value['box_office']
+        # Snapshots of the mutation log keep the weights, data.json has them derived
+        weights = value.get('weights', {})
+        # A movie seen for the first time has no edges yet, so they are appended without lookups
+        new = graph.get_id(key) is None
+        graph.add_vertex(value['json_class'], key, value['year'], gross)
+        for actor in dict.fromkeys(value['actors']):
+            actor_vertex = graph.get_vertex(actor, 'Actor')
+            if actor_vertex is not None:
+                age = actor_vertex.get_value1()
+                graph.add_edge(key, actor, weights[actor] if actor in weights else gross/age if age else 0, new)
+
+    logger.info(f'Parsed {graph.count} vertices from {filename} in {time.perf_counter() - start:.3f}s')
+    return graph
 
-    for key, value in movie_data.items():
-        actors, gross, group, title, url, year = value.values()
-        graph.add_vertex(group, key, year, gross)
-        for actor in actors:
-            if actor in graph.get_vertices():
-                age = graph.get_vertex(actor).get_value1()
-                graph.add_edge(title, actor, gross/age)
 
-    return graph
+def iter_records(filename, chunk_size=CHUNK_SIZE):
+    """
+    Stream the records of a JSON file holding a list of objects, such as the
+    actor and movie objects of data.json, without decoding the whole file
+    :param filename: The JSON file to read
+    :param chunk_size: The number of characters read from the file at a time
+    :return: Iterator of (index of the object in the list, key, value) tuples
+    """
+    decoder = json.JSONDecoder()
+    with open(filename, 'r') as data_file:
+        reader = ChunkReader(data_file, chunk_size)
+        reader.expect('[')
+        section = 0
+        while reader.peek() != ']':
+            if section:
+                reader.expect(',')
+            reader.expect('{')
+            first = True
+            while reader.peek() != '}':
+                if not first:
+                    reader.expect(',')
+                first = False
+                key = reader.decode(decoder)
+                reader.expect(':')
+                yield section, key, reader.decode(decoder)
+            reader.expect('}')
+            section += 1
+        reader.expect(']')
+
+
+class ChunkReader:
+    def __init__(self, file, chunk_size):
+        """
+        Initialize the ChunkReader object, a window over a text file which is
+        read in chunks as values are decoded from it
+        :param file: The open text file
+        :param chunk_size: The number of characters read at a time
+        """
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size=None):
+        # Drop what was already decoded, so the buffer stays around one value in size
+        chunk = self.file.read(size or self.chunk_size)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+        return not self.eof
+
+    def peek(self):
+        """
+        Skip whitespace and look at the next character
+        :return: The next character, '' at the end of the file
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f'Expected {char!r} at {self.buffer[self.pos:self.pos + 20]!r}')
+        self.pos += 1
+
+    def decode(self, decoder):
+        """
+        Decode the next JSON value, reading more of the file until it is complete
+        :param decoder: The JSON decoder
+        :return: The decoded value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Grow the buffer geometrically, so a large value is not re-decoded once per chunk
+                if not self.fill(max(self.chunk_size, len(self.buffer) - self.pos)):
+                    raise
+                continue
+            # A number may continue in the next chunk
+            if end == len(self.buffer) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
 
 
 def analyze_plot(data_dict, num, xlabel="", ylabel="", title=""):
@@ -80,10 +211,10 @@ def analyze_plot(data_dict, num, xlabel="", ylabel="", title=""):
     :param title: The plot's title
     :return:
     """
-    data_dict = dict(sorted(data_dict.items(), key=operator.itemgetter(1), reverse=True))
-    x = list(data_dict.keys())
-    y = list(data_dict.values())
-    plt.bar(x[:num], y[:num])
+    top = top_k(data_dict.items(), num)
+    x = [key for key, value in top]
+    y = [value for key, value in top]
+    plt.bar(x, y)
     plt.xticks(rotation=90)
     plt.xlabel(xlabel)
     plt.ylabel(ylabel)
@@ -1,39 +1,265 @@
+from collections.abc import MutableMapping
+from array import array
+
+# Degree from which a vertex keeps a map of its neighbors' positions, below it
+# a scan of the id array is fast enough and saves the map's memory
+SLOT_MAP_DEGREE = 32
+
+
+class KeyTable:
+    """
+    Interns vertex keys as small integer ids, so adjacency lists can store
+    ids instead of references to key strings
+    """
+    __slots__ = ('ids', 'keys')
+
+    def __init__(self):
+        self.ids = {}
+        self.keys = []
+
+    def intern(self, key):
+        key_id = self.ids.get(key)
+        if key_id is None:
+            key_id = len(self.keys)
+            self.ids[key] = key_id
+            self.keys.append(key)
+        return key_id
+
+    def get_id(self, key):
+        return self.ids.get(key)
+
+    def get_key(self, key_id):
+        return self.keys[key_id]
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class Neighbors(MutableMapping):
+    """
+    Dictionary view of a vertex's neighbors and edge weights, backed by the
+    vertex's id and weight arrays
+    """
+    __slots__ = ('vertex',)
+
+    def __init__(self, vertex):
+        self.vertex = vertex
+
+    def __getitem__(self, neighbor):
+        return self.vertex.get_weight(neighbor)
+
+    def __setitem__(self, neighbor, weight):
+        self.vertex.add_neighbor(neighbor, weight)
+
+    def __delitem__(self, neighbor):
+        self.vertex.remove_neighbor(neighbor)
+
+    def __contains__(self, neighbor):
+        return self.vertex.find(neighbor) is not None
+
+    def __iter__(self):
+        get_key = self.vertex.table.get_key
+        return (get_key(neighbor_id) for neighbor_id in self.vertex.neighbor_ids)
+
+    def __len__(self):
+        return len(self.vertex.neighbor_ids)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
 
 
 class Vertex:
-    def __init__(self, group, key, value1, value2):
+    __slots__ = ('group', 'key', 'value1', 'value2', 'table', 'neighbor_ids', 'weights', 'slots', 'graph')
+
+    def __init__(self, group, key, value1, value2, table=None):
         self.group = group
         self.key = key
         self.value1 = value1
         self.value2 = value2
-        self.neighbors = {}
+        self.table = table if table is not None else KeyTable()
+        self.neighbor_ids = array('i')
+        self.weights = array('q')
+        # Position of every neighbor id in the arrays, only kept for high degree vertices
+        self.slots = None
+        # The graph holding this vertex, told about every change
+        self.graph = None
+
+    def changed(self):
+        if self.graph is not None:
+            self.graph.changed()
 
     def add_neighbor(self, neighbor, weight):
-        self.neighbors[neighbor] = weight
+        neighbor_id = self.table.intern(neighbor)
+        self.add_neighbor_id(neighbor_id, weight)
+
+    def add_neighbor_id(self, neighbor_id, weight):
+        index = self.find_id(neighbor_id)
+        if index is None:
+            self.append_neighbor_id(neighbor_id, weight)
+            return
+
+        if self.weights.typecode == 'q' and not isinstance(weight, int):
+            self.weights = array('d', self.weights)
+        old_weight = self.weights[index]
+        self.weights[index] = weight
+        self.changed()
+        if self.graph is not None:
+            self.graph.edge_changed(self, neighbor_id, old_weight, weight)
+
+    def append_neighbor_id(self, neighbor_id, weight):
+        """
+        Add an edge to a neighbor the caller knows is not one yet, without looking it up
+        :param neighbor_id: The key id of the new neighbor
+        :param weight: The weight of the edge
+        :return: None
+        """
+        # Integer weights are stored as 64 bit ints until the first float weight
+        if self.weights.typecode == 'q' and not isinstance(weight, int):
+            self.weights = array('d', self.weights)
+        if self.slots is not None:
+            self.slots[neighbor_id] = len(self.neighbor_ids)
+        self.neighbor_ids.append(neighbor_id)
+        self.weights.append(weight)
+        self.changed()
+        if self.graph is not None:
+            self.graph.edge_changed(self, neighbor_id, None, weight)
+
+    def remove_neighbor(self, neighbor):
+        index = self.find(neighbor)
+        if index is None:
+            raise KeyError(neighbor)
+        neighbor_id = self.neighbor_ids.pop(index)
+        old_weight = self.weights.pop(index)
+        # The later neighbors moved down a position
+        self.slots = None
+        self.changed()
+        if self.graph is not None:
+            self.graph.edge_changed(self, neighbor_id, old_weight, None)
+
+    def remove_neighbor_ids(self, neighbor_ids):
+        """
+        Remove the edges to several neighbors in a single pass over the arrays
+        :param neighbor_ids: Set of the key ids of the neighbors to remove
+        :return: None
+        """
+        kept = [index for index, neighbor_id in enumerate(self.neighbor_ids)
+                if neighbor_id not in neighbor_ids]
+        if len(kept) == len(self.neighbor_ids):
+            return
+        removed = [(neighbor_id, weight) for neighbor_id, weight in zip(self.neighbor_ids, self.weights)
+                   if neighbor_id in neighbor_ids]
+        self.set_edges(array('i', (self.neighbor_ids[index] for index in kept)),
+                       array(self.weights.typecode, (self.weights[index] for index in kept)))
+        self.changed()
+        if self.graph is not None:
+            for neighbor_id, weight in removed:
+                self.graph.edge_changed(self, neighbor_id, weight, None)
+
+    def set_edges(self, neighbor_ids, weights):
+        """
+        Replace the vertex's edges, without telling the graph
+        :param neighbor_ids: Array of the key ids of the neighbors
+        :param weights: Array of the edge weights, in the same order
+        :return: None
+        """
+        self.neighbor_ids = neighbor_ids
+        self.weights = weights
+        self.slots = None
+
+    def find_id(self, neighbor_id):
+        """
+        Find the position of a neighbor in the arrays, by scanning the ids of a
+        low degree vertex and through the slot map of a high degree one
+        :param neighbor_id: The key id of the neighbor
+        :return: The position, None if it is not a neighbor
+        """
+        if self.slots is None:
+            if len(self.neighbor_ids) < SLOT_MAP_DEGREE:
+                try:
+                    return self.neighbor_ids.index(neighbor_id)
+                except ValueError:
+                    return None
+            self.slots = {neighbor_id: index for index, neighbor_id in enumerate(self.neighbor_ids)}
+        return self.slots.get(neighbor_id)
+
+    def find(self, neighbor):
+        neighbor_id = self.table.get_id(neighbor)
+        if neighbor_id is None:
+            return None
+        return self.find_id(neighbor_id)
 
     def get_neighbors(self):
-        return self.neighbors
+        return Neighbors(self)
+
+    @property
+    def neighbors(self):
+        return Neighbors(self)
+
+    @neighbors.setter
+    def neighbors(self, neighbors):
+        # Used when decoding graphs saved before vertices stored id arrays
+        self.table = KeyTable()
+        self.set_edges(array('i'), array('q'))
+        self.graph = None
+        for neighbor, weight in neighbors.items():
+            self.add_neighbor(neighbor, weight)
+
+    def move_to(self, table):
+        """
+        Re-intern this vertex's neighbors into another key table
+        :param table: The key table of the graph the vertex is moved into
+        :return: None
+        """
+        if table is self.table:
+            return
+        get_key = self.table.get_key
+        self.set_edges(array('i', (table.intern(get_key(neighbor_id)) for neighbor_id in self.neighbor_ids)),
+                       self.weights)
+        self.table = table
 
     def get_key(self):
         return self.key
 
     def set_key(self, key):
         self.key = key
+        self.changed()
 
     def get_value1(self):
         return self.value1
 
     def set_value1(self, value1):
+        old_value = self.value1
         self.value1 = value1
+        self.changed()
+        if self.graph is not None:
+            self.graph.value_changed(self, 'value1', old_value)
 
     def get_value2(self):
         return self.value2
 
     def set_value2(self, value2):
+        old_value = self.value2
         self.value2 = value2
+        self.changed()
+        if self.graph is not None:
+            self.graph.value_changed(self, 'value2', old_value)
 
     def get_group(self):
         return self.group
 
     def get_weight(self, neighbor):
-        return self.neighbors[neighbor]
+        index = self.find(neighbor)
+        if index is None:
+            raise KeyError(neighbor)
+        return self.weights[index]
+
+    def __getstate__(self):
+        return {'group': self.group, 'key': self.key, 'neighbors': dict(self.get_neighbors().items()),
+                'value1': self.value1, 'value2': self.value2}
+
+    def __setstate__(self, state):
+        self.group = state['group']
+        self.key = state['key']
+        self.value1 = state['value1']
+        self.value2 = state['value2']
+        self.neighbors = state['neighbors']